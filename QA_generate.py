@@ -1,8 +1,8 @@
 # 从 final_dataseet 构造 QA 数据集
 import pandas as pd
 import json
-import ast
 import random
+from field_parser import load_field
 
 # 定义问题模板
 QA_TEMPLATES = {
@@ -45,8 +45,8 @@ def parse_array_field(value):
     if isinstance(value, str):
         if value.startswith('[') and value.endswith(']'):
             try:
-                return ast.literal_eval(value)
-            except:
+                return load_field(value)
+            except ValueError:
                 return value.split('\n')
         return [value]
     return list(value)
@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+import time
+
+'''
+    相关资讯文章的持久化缓存（SQLite）
+    以文章链接为键保存解析后的正文，多个项目引用同一篇文章时只需下载、解析一次，
+    重新运行二次爬取时已缓存的文章也不会再次请求
+'''
+
+
+class ArticleCache:
+    """文章链接 -> 正文 的持久化缓存，线程安全"""
+
+    def __init__(self, path='article_cache.sqlite3'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS articles ('
+            'url TEXT PRIMARY KEY, content TEXT NOT NULL, fetched_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute('SELECT content FROM articles WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, urls):
+        """批量查询，返回 {url: 正文}，只包含已缓存的链接"""
+        found = {}
+        urls = list(urls)
+        with self._lock:
+            # SQLite 单条语句的参数数量有限，分批查询
+            for start in range(0, len(urls), 500):
+                batch = urls[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT url, content FROM articles WHERE url IN ({placeholders})', batch
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put(self, url, content):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO articles (url, content, fetched_at) VALUES (?, ?, ?)',
+                (url, content, time.time())
+            )
+            self._conn.commit()
+
+    def __contains__(self, url):
+        return self.get(url) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
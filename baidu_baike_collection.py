@@ -7,13 +7,22 @@ import logging
 import csv
 from urllib.parse import quote
 import os
-from fake_useragent import UserAgent
+from concurrent.futures import ProcessPoolExecutor
+from baike_selectors import SelectorRegistry, get_registry
+from fetch_client import get_client, decode_response
+from response_cache import CacheMiss, is_offline
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-cache_path = "fake_useragent_0.1.11.json"
+# 百度百科请求头（User-Agent 由请求客户端从 UA 池中随机选择）
+BAIKE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
+    'Referer': 'https://www.baidu.com/',
+    "cookie": 'BAIDUID_BFESS=EA6DD46FA63803B13EC0F91F1BA140EE:FG=1; MCITY=-131%3A; jsdk-uuid=dd76eb04-dad2-410f-9d54-3bbfa4cbbfca; BAIDU_WISE_UID=wapp_1725622131279_885; __bid_n=192db11f3bd20166ef26a1; H_PS_PSSID=60278_61027_61091_60853_61130_61127_61141_61107_61216_61207_61211_61213_61208; H_WISE_SIDS=60278_61027_61091_60853_61130_61127_61141_61107_61216_61207_61211_61213_61208; H_WISE_SIDS_BFESS=60278_61027_61091_60853_61130_61127_61141_61107_61216_61207_61211_61213_61208; uc_login_unique=7ff7e01b7e8249edaa8e6b57d15cc0f7; uc_recom_mark=cmVjb21tYXJrXzUzNjM5OTU1; ZFY=2RiwFS:Aw:B1v4TZrHDfFLuHohdnMGNgGE08:B3SQompFM:C; BDUSS=lVwZlllVGlMQkMxalRqVTdrR3p-YlBsWjZNNDNNMHpUWFFuUHVPenB6bm5-eDVvRVFBQUFBJCQAAAAAAQAAAAEAAAD07yCWcGVuZ3hpbnl1ZXIxMjMAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAOdy92fncvdnV; BDUSS_BFESS=lVwZlllVGlMQkMxalRqVTdrR3p-YlBsWjZNNDNNMHpUWFFuUHVPenB6bm5-eDVvRVFBQUFBJCQAAAAAAQAAAAEAAAD07yCWcGVuZ3hpbnl1ZXIxMjMAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAOdy92fncvdnV; RT="z=1&dm=baidu.com&si=741efacd-10f1-402a-a86a-c2390c43ce4d&ss=m9b2aiq5&sl=7&tt=h5y&bcn=https%3A%2F%2Ffclog.baidu.com%2Flog%2Fweirwood%3Ftype%3Dperf&ld=aqlt&ul=bbmq&hd=bbph"; baikeVisitId=0db95556-4c47-48bc-bbf9-0f97cd08d5ae; ab_sr=1.0.1_ZDAyMmY1MzdkNmY4NDZhZDExNzQ1YjY2MTc5YTdlYjY0NmM4ZDMzNmQ1NDg1MjFjNjc5YTYzNzcxOWMzYzUxZGM5YWUyY2VlZTU0YzMxYjE3MzM4YWU0M2FmMDdmNjFmZTdmNGY2N2I2MWQ3Nzg5ZTkxMTNhMzBlNjc5NzAwMjNjZGZlNTYyNmZhMWVjNmU2YmZkMjY3ZDE5Yjg0ODFiZDBhMmM2MDYzZTJhYmNmMDYzZjY2ZDBkNGVjNmQ1MTVl'
+}
 
 def remove_references(text):
     """
@@ -24,54 +33,35 @@ def remove_references(text):
     cleaned_text = pattern.sub('', text)
     return cleaned_text.rstrip()
 
-def extract_content_from_html(url=None, html_content=None):
+def fetch_baike_html(url, max_retries=None):
+    """
+    用普通 HTTP 请求获取百科页面并返回解码后的文本（限速、重试、UA 轮换和响应缓存均由共享的请求客户端负责），
+    最终失败时抛出异常
+    """
+    response = get_client().get(url, headers=BAIKE_HEADERS, max_retries=max_retries, logger=logger)
+    return decode_response(response)
+
+def extract_content_from_html(url=None, html_content=None, legacy=False):
     """
     从URL或HTML内容中提取内容，策略如下：
     1. 如果找到至少两个一级标题，则提取第一个和第二个一级标题之间的内容
     2. 如果只找到一个一级标题，则提取所有段落内容
     3. 检查并提取"传承人物"二级标题的内容
+    默认使用只遍历一次文档树的 extract_sections，legacy=True 时使用原先的逐项查找实现（用于对比）
     """
     result = {"历史渊源":"", "传承人物": "", "相关介绍": "", "错误信息": ""}
 
-    # 如果提供了URL，则从URL获取HTML内容
+    # 如果提供了URL，则通过共享的请求客户端获取HTML内容
     if url and not html_content:
-        REQUEST_CONFIG = {
-            'base_delay': 5,
-            'random_delay': 5,
-            'max_retries': 3
-        }
-        for attempt in range(REQUEST_CONFIG["max_retries"]):
-            try:
-                delay = REQUEST_CONFIG['base_delay'] + random.uniform(0, REQUEST_CONFIG['random_delay'])
-                time.sleep(delay)
-
-                # 伪造请求头
-                ua = UserAgent(
-                    use_cache_server=False,  # 禁用在线获取
-                    cache=True,  # 启用本地缓存
-                    path=cache_path  # 指定缓存路径
-                )
-
-                headers = {
-                    'User-Agent': ua.random,
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
-                    'Referer': 'https://www.baidu.com/',
-                    "cookie": 'BAIDUID_BFESS=EA6DD46FA63803B13EC0F91F1BA140EE:FG=1; MCITY=-131%3A; jsdk-uuid=dd76eb04-dad2-410f-9d54-3bbfa4cbbfca; BAIDU_WISE_UID=wapp_1725622131279_885; __bid_n=192db11f3bd20166ef26a1; H_PS_PSSID=60278_61027_61091_60853_61130_61127_61141_61107_61216_61207_61211_61213_61208; H_WISE_SIDS=60278_61027_61091_60853_61130_61127_61141_61107_61216_61207_61211_61213_61208; H_WISE_SIDS_BFESS=60278_61027_61091_60853_61130_61127_61141_61107_61216_61207_61211_61213_61208; uc_login_unique=7ff7e01b7e8249edaa8e6b57d15cc0f7; uc_recom_mark=cmVjb21tYXJrXzUzNjM5OTU1; ZFY=2RiwFS:Aw:B1v4TZrHDfFLuHohdnMGNgGE08:B3SQompFM:C; BDUSS=lVwZlllVGlMQkMxalRqVTdrR3p-YlBsWjZNNDNNMHpUWFFuUHVPenB6bm5-eDVvRVFBQUFBJCQAAAAAAQAAAAEAAAD07yCWcGVuZ3hpbnl1ZXIxMjMAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAOdy92fncvdnV; BDUSS_BFESS=lVwZlllVGlMQkMxalRqVTdrR3p-YlBsWjZNNDNNMHpUWFFuUHVPenB6bm5-eDVvRVFBQUFBJCQAAAAAAQAAAAEAAAD07yCWcGVuZ3hpbnl1ZXIxMjMAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAOdy92fncvdnV; RT="z=1&dm=baidu.com&si=741efacd-10f1-402a-a86a-c2390c43ce4d&ss=m9b2aiq5&sl=7&tt=h5y&bcn=https%3A%2F%2Ffclog.baidu.com%2Flog%2Fweirwood%3Ftype%3Dperf&ld=aqlt&ul=bbmq&hd=bbph"; baikeVisitId=0db95556-4c47-48bc-bbf9-0f97cd08d5ae; ab_sr=1.0.1_ZDAyMmY1MzdkNmY4NDZhZDExNzQ1YjY2MTc5YTdlYjY0NmM4ZDMzNmQ1NDg1MjFjNjc5YTYzNzcxOWMzYzUxZGM5YWUyY2VlZTU0YzMxYjE3MzM4YWU0M2FmMDdmNjFmZTdmNGY2N2I2MWQ3Nzg5ZTkxMTNhMzBlNjc5NzAwMjNjZGZlNTYyNmZhMWVjNmU2YmZkMjY3ZDE5Yjg0ODFiZDBhMmM2MDYzZTJhYmNmMDYzZjY2ZDBkNGVjNmQ1MTVl'
-                }
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                response.encoding = response.apparent_encoding
-                html_content = response.text
-                break
-
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"第 {attempt+1} 次尝试失败: {str(e)}")
-                if attempt == REQUEST_CONFIG["max_retries"] - 1:
-                    logger.error(f"URL {url} 重试{REQUEST_CONFIG['max_retries']}次后失败")
-                    result["错误信息"] = f"请求最终失败: {str(e)}"
-                    return result
-                time.sleep(2 ** attempt)  # 指数退避等待
+        try:
+            html_content = fetch_baike_html(url)
+        except CacheMiss as e:
+            result["错误信息"] = str(e)
+            return result
+        except requests.exceptions.RequestException as e:
+            logger.error(f"URL {url} 重试{get_client().retry_policy(url).max_retries}次后失败")
+            result["错误信息"] = f"请求最终失败: {str(e)}"
+            return result
     
     if html_content and os.path.exists(html_content):
         try:
@@ -82,7 +72,12 @@ def extract_content_from_html(url=None, html_content=None):
     
     # 使用BeautifulSoup解析HTML
     soup = BeautifulSoup(html_content, 'html.parser')
+    if legacy:
+        return extract_sections_legacy(soup, result)
+    return extract_sections(soup, result)
 
+def extract_sections_legacy(soup, result):
+    """原先的提取实现：每一部分各自在整棵文档树上查找"""
     try:
         summary_section = soup.find('div', class_="lemmaSummary_kUDz3 J-summary")
         if summary_section:
@@ -303,6 +298,210 @@ def process_element(element):
     
     return result
 
+# 单次遍历提取器使用的 class 签名：带哈希的 class 用角色名表示（见 baike_selectors），
+# 与旧实现中 class_="..." 的完整 class 字符串匹配相对应
+SUMMARY_SIGNATURE = ('lemmaSummary', 'J-summary')
+SUMMARY_PARA_SIGNATURE = ('para', 'summary', 'MARK_MODULE')
+LEVEL1_TITLE_SIGNATURE = ('paraTitle', 'level-1')
+CONTENT_PARA_SIGNATURE = ('para', 'content', 'MARK_MODULE')
+HERITAGE_KEYWORD = "传承人"  # "传承人物"包含"传承人"，只需检查后者
+
+def index_baike_page(soup, registry):
+    """
+    遍历一次文档中的 div，按 class 归类出摘要、一级标题、正文段落和"传承人物"二级标题，
+    各项与旧实现中对应的 find/find_all 结果相同（均按文档顺序）
+    """
+    page = {'registry': registry, 'summary': None, 'level1_titles': [], 'content_paras': [], 'heritage_title': None}
+    for tag in soup.find_all('div'):
+        classes = tag.get('class')
+        if not classes:
+            continue
+        signature = registry.signature(classes)
+        if signature == LEVEL1_TITLE_SIGNATURE:
+            page['level1_titles'].append(tag)
+        elif signature == CONTENT_PARA_SIGNATURE:
+            page['content_paras'].append(tag)
+        elif signature == SUMMARY_SIGNATURE and page['summary'] is None:
+            page['summary'] = tag
+        if (page['heritage_title'] is None and 'paraTitle' in signature and 'level-2' in signature
+                and HERITAGE_KEYWORD in tag.get_text()):
+            page['heritage_title'] = tag
+    return page
+
+def render_element(element, registry):
+    """与 process_element 输出相同，段落中的文本和脚注在一次遍历中收集"""
+    if element.name is None:
+        # 文本节点交给旧实现处理，保证结果（包括异常）完全一致
+        return process_element(element)
+
+    # 旧实现中二级标题分支的条件永远不成立（class 是列表），二级标题不输出，这里保持一致
+    if element.name == 'div' and registry.has_role(element.get('class', []), 'para'):
+        texts = []
+        sups = []
+        for tag in element.descendants:
+            if tag.name is None:
+                continue
+            if tag.name == 'sup':
+                sups.append(tag)
+            if registry.has_role(tag.get('class', []), 'text'):
+                texts.append(tag.get_text())
+        para_text = ''.join(texts)
+
+        # 添加脚注引用（已在文本中出现的不重复添加）
+        for sup in sups:
+            ref = sup.get_text().strip()
+            if ref not in para_text:
+                para_text += f" [{ref}]"
+        return f"{para_text}\n\n" if para_text.strip() else ""
+
+    img = element.find('img')
+    if img:
+        return f"![{img.get('alt', '图片')}]({img.get('src', '')})\n\n"
+    return ""
+
+def render_section(title, is_end, registry):
+    """
+    小型状态机：从标题之后的兄弟节点开始逐个输出，遇到 is_end(节点) 为真的节点时结束
+    """
+    parts = []
+    node = title.next_sibling
+    while node and not is_end(node):
+        parts.append(render_element(node, registry))
+        node = node.next_sibling
+    return ''.join(parts)
+
+def find_bold_span(element, registry):
+    return element.find(lambda tag: tag.name == 'span' and registry.has_role(tag.get('class', []), 'bold'))
+
+def render_heritage_by_title(page):
+    """与 extract_by_title 相同：目录检查不影响结果，只需找到"传承人物"二级标题"""
+    title = page['heritage_title']
+    if title is None:
+        return ""
+    registry = page['registry']
+    parts = []
+    node = title.next_sibling
+    while node:
+        if node.name == 'div':
+            classes = node.get('class', [])
+            # 遇到另一个标题则停止提取
+            if registry.has_role(classes, 'paraTitle'):
+                break
+            if registry.has_role(classes, 'para'):
+                parts.append(render_element(node, registry))
+        node = node.next_sibling
+    return ''.join(parts)
+
+def render_heritage_by_paragraph(page):
+    """与 extract_by_paragraph 相同：从加粗的"传承人物"段落之后开始，到下一个加粗段落或字数<=4的段落为止"""
+    registry = page['registry']
+    for para in page['content_paras']:
+        bold_text = find_bold_span(para, registry)
+        if not (bold_text and HERITAGE_KEYWORD in bold_text.get_text()):
+            continue
+        parts = []
+        node = para.next_sibling
+        while node:
+            if node.name == 'div' and registry.has_role(node.get('class', []), 'para'):
+                if find_bold_span(node, registry) or len(node.get_text().strip()) <= 4:
+                    break
+                parts.append(render_element(node, registry))
+            node = node.next_sibling
+        return ''.join(parts)
+    return ""
+
+def extract_sections(soup, result, registry=None):
+    """
+    单次遍历文档树建立索引，再分别输出摘要、历史渊源和传承人物，结果与 extract_sections_legacy 相同。
+    class 名通过选择器注册表匹配；用已知变体解析不出任何内容、且页面中有按前缀识别出的未知变体时
+    （通常是百科改版更换了哈希），改为按前缀匹配重新解析
+    """
+    registry = registry or get_registry()
+    extract_sections_with(soup, result, registry)
+    if not (result["相关介绍"] or result["历史渊源"] or result["传承人物"]) and registry.strict:
+        unknown = registry.unknown_variants(soup)
+        if unknown:
+            logger.warning(f"页面中有未登记的 class 变体 {unknown}，按前缀匹配重新解析，"
+                           f"可用 learn_selectors 登记")
+            extract_sections_with(soup, result, registry.loose())
+    return result
+
+def extract_sections_with(soup, result, registry):
+    """用指定的选择器注册表提取各部分内容"""
+    page = index_baike_page(soup, registry)
+
+    summary = page['summary']
+    if summary is not None:
+        summary_parts = []
+        for para in summary.find_all('div', class_=True):
+            if registry.signature(para['class']) != SUMMARY_PARA_SIGNATURE:
+                continue
+            spans = para.find_all(lambda tag: registry.has_role(tag.get('class', []), 'text'))
+            if spans:
+                summary_parts.append("".join(span.get_text(strip=True) for span in spans) + "\n\n")
+        result["相关介绍"] = remove_references("".join(summary_parts).strip())
+
+    heritage_people_section = render_heritage_by_title(page) or render_heritage_by_paragraph(page)
+
+    h1_elements = page['level1_titles']
+    history_title = None
+    for h1 in h1_elements:
+        h2 = h1.find('h2')
+        if h2 and "历史渊源" in h2.get_text():
+            history_title = h1
+            break
+
+    if history_title:
+        def is_level1_title(node):
+            classes = node.get('class', []) if node.name == 'div' else []
+            return registry.has_role(classes, 'paraTitle') and registry.has_role(classes, 'level-1')
+        extracted_text = render_section(history_title, is_level1_title, registry)
+    elif len(h1_elements) >= 2:
+        # 与旧实现一样用 == 判断是否到达第二个一级标题
+        second_h1 = h1_elements[1]
+        extracted_text = render_section(h1_elements[0], lambda node: node == second_h1, registry)
+    else:
+        parts = []
+        if len(h1_elements) == 1:
+            h2 = h1_elements[0].find('h2')
+            parts.append(f"# {h2.get_text() if h2 else ''}\n\n")
+        parts.extend(render_element(element, registry) for element in page['content_paras'])
+        extracted_text = ''.join(parts)
+
+    result["历史渊源"] = remove_references(extracted_text)
+    if heritage_people_section and extracted_text:
+        result["传承人物"] = remove_references(heritage_people_section)
+    return result
+
+def learn_selectors(labelled_pages, registry=None, save=True):
+    """
+    从人工标注的页面学习新的 class 哈希变体。labelled_pages 为 [(html, 期望结果)]，
+    期望结果是包含 相关介绍/历史渊源/传承人物 中部分字段的字典。
+    对每个页面，把其中按前缀识别出的未知 class 临时当作新变体解析，结果与标注一致才登记；
+    返回 (新增的变体 {角色: set}, 结果与标注不一致的页面序号列表)
+    """
+    registry = registry or get_registry()
+    learned = {}
+    mismatched = []
+    for idx, (html_content, expected) in enumerate(labelled_pages):
+        soup = BeautifulSoup(html_content, 'html.parser')
+        candidates = registry.unknown_variants(soup)
+        trial = SelectorRegistry(path=None)
+        trial.add_variants(registry.variants)
+        trial.add_variants(candidates)
+        result = extract_sections_with(soup, {"历史渊源": "", "传承人物": "", "相关介绍": "", "错误信息": ""}, trial)
+        if all(result.get(field, "") == value for field, value in expected.items()):
+            for role, classes in candidates.items():
+                learned.setdefault(role, set()).update(classes)
+        else:
+            mismatched.append(idx)
+
+    if registry.add_variants(learned):
+        logger.info(f"学习到新的 class 变体: {learned}，注册表版本 {registry.version}")
+        if save:
+            registry.save()
+    return learned, mismatched
+
 def process_ich_csv(input_file='非遗项目_web.csv', output_file='非遗项目_百科数据补充.csv'):
     try:
         # 读取已存在的输出文件（如果有）
@@ -362,26 +561,88 @@ def process_ich_csv(input_file='非遗项目_web.csv', output_file='非遗项目
                         "爬取状态": "成功" if not result.get("错误信息") else "失败",
                     }
                     cnt += 1
-                    time.sleep(random.uniform(4, 8)) # 每爬 1 条暂停一会，防止被检测
                 
                 writer.writerow(new_row)
 
-                if cnt % 50 == 0 and cnt > 0:
+                # 请求间隔由 fetch_client 按 REQUEST_CONFIG['baike.baidu.com'] 限速，这里只在每 50 条后长时间休息一次
+                if cnt % 50 == 0 and cnt > 0 and not is_offline():
                     time.sleep(random.uniform(60, 300))
                 
     except Exception as e:
         logger.error(f"CSV处理失败: {str(e)}")
 
-# 在原有函数后新增以下函数
-def process_local_html_to_csv(web_csv='非遗项目_web.csv', output_csv='百度百科.csv', html_dir='baidu_html_files'):
-    """处理本地HTML文件并生成带状态的新CSV"""
+# 本地 HTML 批量解析的配置：workers 为进程数（1 表示在当前进程中逐个解析），
+# chunksize 为每次分发给一个进程的文件数，report_every 为每解析多少个文件报告一次进度
+PARSE_CONFIG = {
+    'workers': os.cpu_count() or 1,
+    'chunksize': 16,
+    'report_every': 200
+}
+
+def parse_local_html(task):
+    """解析单个本地 HTML 文件，返回要写入 CSV 的一行；在子进程中执行，参数与返回值均可序列化"""
+    project_name, html_path = task
+    if not os.path.exists(html_path):
+        logger.warning(f"HTML文件不存在: {html_path}")
+        return {
+            '项目名称': project_name,
+            '相关介绍': '',
+            '历史渊源': '',
+            '传承人物': '',
+            'status': 'Failed'
+        }
+
+    result = {}
+    status = 'Success'
+    
+    try:
+        result = extract_content_from_html(html_content=html_path)
+        
+        # 只有全部为空时状态才为失败
+        if not result.get("相关介绍") and not result.get("历史渊源") and not result.get("传承人物"):
+            status = 'Failed'
+            
+    except Exception as e:
+        logger.error(f"解析失败: {project_name} - {str(e)}")
+        status = 'Failed'
+        result = {
+            "相关介绍": "",
+            "历史渊源": "",
+            "传承人物": "",
+            "错误信息": str(e)
+        }
+
+    return {
+        '项目名称': project_name,
+        '相关介绍': result.get('相关介绍', ''),
+        '历史渊源': result.get('历史渊源', ''),
+        '传承人物': result.get('传承人物', ''),
+        'status': status
+    }
+
+def process_local_html_to_csv(web_csv='非遗项目_web.csv', output_csv='百度百科.csv', html_dir='baidu_html_files',
+                              workers=None, chunksize=None):
+    """
+    处理本地HTML文件并生成带状态的新CSV。
+    workers > 1 时用进程池并行解析，文件按 chunksize 分块分发，结果按输入顺序流式写入同一个 CSV
+    """
+    workers = workers or PARSE_CONFIG['workers']
+    chunksize = chunksize or PARSE_CONFIG['chunksize']
     try:
         with open(web_csv, 'r', encoding='utf-8-sig') as infile, \
              open(output_csv, 'w', encoding='utf-8-sig', newline='') as outfile:
 
             reader = csv.DictReader(infile)
-            all_rows = list(reader)
-            total_count = len(all_rows)
+            tasks = []
+            for row in reader:
+                project_name = row.get('项目名称', '').strip()
+                if project_name == "斯":
+                    project_name = "格萨（斯）尔"
+                if not project_name:
+                    continue
+                # 生成HTML文件名
+                tasks.append((project_name, os.path.join(html_dir, f"{project_name}.html")))
+            total_count = len(tasks)
 
             writer = csv.DictWriter(
                 outfile,
@@ -390,56 +651,29 @@ def process_local_html_to_csv(web_csv='非遗项目_web.csv', output_csv='百度
             )
             writer.writeheader()
 
-            # for idx, row in enumerate(reader, 1):
-            for idx, row in enumerate(all_rows):
-
-                project_name = row.get('项目名称', '').strip()
-                if project_name == "斯":
-                    project_name = "格萨（斯）尔"
-                if not project_name:
-                    continue
-                # 生成HTML文件名
-                html_path = os.path.join(html_dir, f"{project_name}.html")
-                if not os.path.exists(html_path):
-                    logger.warning(f"HTML文件不存在: {html_path}")
-                    writer.writerow({
-                        '项目名称': project_name,
-                        '相关介绍': '',
-                        '历史渊源': '',
-                        '传承人物': '',
-                        'status': 'Failed'
-                    })
-                    continue
-                
-                result = {}
-                status = 'Success'
-                
-                try:
-                    logger.info(f"正在解析 {project_name} ({idx}/{total_count})")
-                    result = extract_content_from_html(html_content=html_path)
-                    
-                    # 只有全部为空时状态才为失败
-                    if not result.get("相关介绍") and not result.get("历史渊源") and not result.get("传承人物"):
-                        status = 'Failed'
-                        
-                except Exception as e:
-                    logger.error(f"解析失败: {project_name} - {str(e)}")
-                    status = 'Failed'
-                    result = {
-                        "相关介绍": "",
-                        "历史渊源": "",
-                        "传承人物": "",
-                        "错误信息": str(e)
-                    }
+            logger.info(f"开始解析 {total_count} 个HTML文件，进程数: {workers}")
+            start_time = time.time()
+            failed = 0
+            executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+            try:
+                # executor.map 按输入顺序返回结果，子进程解析完一块就可以开始写入
+                rows = executor.map(parse_local_html, tasks, chunksize=chunksize) if executor \
+                    else map(parse_local_html, tasks)
+                for idx, out_row in enumerate(rows, 1):
+                    writer.writerow(out_row)
+                    failed += out_row['status'] == 'Failed'
+                    if idx % PARSE_CONFIG['report_every'] == 0 or idx == total_count:
+                        elapsed = time.time() - start_time
+                        rate = idx / elapsed if elapsed > 0 else 0.0
+                        eta = (total_count - idx) / rate if rate > 0 else 0.0
+                        logger.info(f"已解析 {idx}/{total_count}，{rate:.1f} 个/秒，预计剩余 {eta:.0f} 秒")
+            finally:
+                if executor:
+                    executor.shutdown()
 
-                # 写入结果
-                writer.writerow({
-                    '项目名称': project_name,
-                    '相关介绍': result.get('相关介绍', ''),
-                    '历史渊源': result.get('历史渊源', ''),
-                    '传承人物': result.get('传承人物', ''),
-                    'status': status
-                })
+            elapsed = time.time() - start_time
+            logger.info(f"解析完成: 共 {total_count} 个，失败 {failed} 个，耗时 {elapsed:.1f} 秒，"
+                        f"平均 {total_count / elapsed if elapsed > 0 else 0.0:.1f} 个/秒（{workers} 个进程）")
 
     except Exception as e:
         logger.error(f"CSV处理失败: {str(e)}")
@@ -1,105 +1,113 @@
+import argparse
+import asyncio
+import csv
+import os
 import pandas as pd
-import requests
 from tqdm import tqdm
-import time
-import json
-import os
+from deepseek_client import DeepSeekClient, MAX_LENGTH, stream_ordered
+from summary_cache import SummaryCache
+from deepseek_batch import BatchClient, finish_batch_pass
+from text_cleaner import TextCleaner
+
+'''
+    百度百科数据清洗：用 DeepSeek 总结过长的"相关介绍"和"历史渊源"字段
+    两列文本先整列经过 text_cleaner 的本地清洗，清洗后仍超过 MAX_LENGTH 的才请求总结；
+    多行数据通过 deepseek_client 并发请求，结果按原顺序逐行写入输出文件
+    输入为 bert_similarity.py 的检查结果，判定为"不匹配"（或已被剔除）的词条不参与清洗，也不会进入后续的合并
+'''
+
+# 只处理历史渊源和相关介绍字段
+FIELDS_TO_PROCESS = ['相关介绍', '历史渊源']
+
+# bert_similarity.py 写入的列，清洗后的输出中不再保留
+CHECK_COLUMNS = ['status', '相似度', '匹配状态']
+
+
+def drop_rejected(df):
+    """去掉相似度检查判定为不匹配（匹配状态 == 不匹配）或已剔除（status == Rejected）的行，以及检查用的列"""
+    rejected = pd.Series(False, index=df.index)
+    if 'status' in df.columns:
+        rejected |= df['status'] == 'Rejected'
+    if '匹配状态' in df.columns:
+        rejected |= df['匹配状态'] == '不匹配'
+    if rejected.any():
+        print(f"跳过 {rejected.sum()} 行相似度检查判定为不匹配的百科词条")
+    return df[~rejected].drop(columns=[column for column in CHECK_COLUMNS if column in df.columns])
+
 
-# 配置 DeepSeek API
-DEEPSEEK_API_KEY = os.getenv("DeepSeek_API_KEY")  # 替换为你的 DeepSeek API Key
-DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
-MAX_LENGTH = 1096  # 判断是否需要压缩的阈值
-MAX_TOKENS = 1024   # 压缩后的最大字符数
-
-# 设置请求头
-HEADERS = {
-    "Content-Type": "application/json",
-    "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-}
-
-# 摘要提示词
-REQUEST_BODY_TEMPLATE = {
-    "model": "deepseek-reasoner",
-    "messages": [
-        {
-            "role": "user",
-            "content": ""
-        }
-    ],
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "max_tokens": MAX_TOKENS
-}
-
-SUMMARIZE_PROMPT = "请用中文对以下内容进行专业、准确的总结，保留关键信息，并确保总字数不超过1024个字符（注意，你只需要输出总结后的内容，不要输出任何无关文字）：\n\n"
-
-def summarize_text(text: str, retries=3, delay=5) -> str:
+async def summarize_text(client, cleaner, text):
     if not isinstance(text, str) or len(text.strip()) == 0:
         return text
 
-    if len(text) <= MAX_LENGTH:
+    text, over_budget = cleaner.within_budget(text)
+    if not over_budget:
         return text
 
-    payload = REQUEST_BODY_TEMPLATE.copy()
-    payload["messages"][0]["content"] = SUMMARIZE_PROMPT + text[:4096]  # 添加长度限制
-    timeout = 0
-
-    for attempt in range(retries):
-        timeout += 180
-        try:
-            response = requests.post(DEEPSEEK_API_URL, headers=HEADERS, json=payload, timeout=timeout)
-            
-            # 检查HTTP状态码
-            if response.status_code != 200:
-                print(f"HTTP Error {response.status_code}: {response.text}")
-                continue
-                
-            result = response.json()
-            
-            # 检查API响应结构
-            if 'choices' not in result or len(result['choices']) == 0:
-                print(f"Invalid API response: {result}")
-                continue
-                
-            print(result['choices'][0]['message']['content'].strip())
-            return result['choices'][0]['message']['content'].strip()
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed on attempt {attempt + 1}: {e}")
-            time.sleep(delay * (attempt + 1))  # 指数退避
-        except KeyError as e:
-            print(f"Key error in response: {e}")
-            break
-    print(text[:MAX_TOKENS])
-    return text[:MAX_TOKENS]  # 失败时返回截断文本
+    return await client.summarize_auto(text)
 
 # 处理数组字段的函数
-def process_array_field(arr):
+async def process_array_field(client, cleaner, arr):
     if not isinstance(arr, list):
         return arr
-    return [summarize_text(item) if isinstance(item, str) else item for item in arr]
+    # summarize_text 对非字符串元素原样返回
+    return list(await asyncio.gather(*[summarize_text(client, cleaner, item) for item in arr]))
+
+async def process_row(client, cleaner, row):
+    fields = [field for field in FIELDS_TO_PROCESS if field in row]
+    summaries = await asyncio.gather(*[summarize_text(client, cleaner, row[field]) for field in fields])
+    row.update(zip(fields, summaries))
+    return row
+
+async def process_rows(input_file, output_file, concurrency=None, cache=None, client=None, cleaner=None):
+    df = drop_rejected(pd.read_csv(input_file, dtype=str).fillna(''))
+
+    # 需要总结的字段整列一次清洗
+    cleaner = cleaner or TextCleaner(MAX_LENGTH)
+    fields = [field for field in FIELDS_TO_PROCESS if field in df.columns]
+    if fields:
+        cleaner.prepare(pd.concat([df[field] for field in fields]))
+
+    with open(output_file, 'w', encoding='utf-8-sig', newline='') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=list(df.columns), lineterminator='\n')  # 与原先 to_csv 的输出一致
+        writer.writeheader()
+
+        async with client or DeepSeekClient(concurrency=concurrency, cache=cache) as client:
+            progress = tqdm(total=len(df), desc="Processing Rows")
+
+            def write_row(row):
+                writer.writerow(row)
+                progress.update(1)
+
+            await stream_ordered(df.to_dict('records'), lambda row: process_row(client, cleaner, row), write_row,
+                                 window=client.config['row_window'])
+            progress.close()
+    return client.stats
 
 # 主函数：处理 CSV 文件
-def process_csv(input_file="百度百科.csv", output_file="百度百科_clean.csv"):
-    df = pd.read_csv(input_file)
-    # 去除 status 字段
-    if 'status' in df.columns:
-        df.drop(columns=['status'], inplace=True)
-
-    # 只处理历史渊源和相关介绍字段
-    fields_to_process = ['相关介绍', '历史渊源']
-    
-    # 进度条处理
-    for idx, row in tqdm(df.iterrows(), total=len(df), desc="Processing Rows"):
-        for field in fields_to_process:
-            if field in df.columns:
-                value = row[field]
-                df.at[idx, field] = summarize_text(value)
-
-    # 保存结果
-    df.to_csv(output_file, index=False, encoding='utf-8-sig')
-    print(f"✅ 处理完成，已保存至 {output_file}")
+def process_csv(input_file="百度百科_checked.csv", output_file="百度百科_clean.csv", concurrency=None, batch=False):
+    if not os.path.isfile(input_file):
+        print(f"找不到 {input_file}，请先运行 bert_similarity.py 检查百科词条与官网描述是否匹配")
+        return
+    cache = SummaryCache()
+    cleaner = TextCleaner(MAX_LENGTH)
+    if batch:
+        # 批处理模式：结果先写入临时文件，所有总结都有结果时才替换输出文件
+        client = BatchClient(cache=cache)
+        partial_file = f'{output_file}.partial'
+        stats = asyncio.run(process_rows(input_file, partial_file, client=client, cleaner=cleaner))
+        finish_batch_pass(client, output_file, partial_file)
+    else:
+        stats = asyncio.run(process_rows(input_file, output_file, concurrency, cache, cleaner=cleaner))
+        print(f"✅ 处理完成，已保存至 {output_file}")
+    print(cleaner.report())
+    print(f"API 请求统计: {stats}")
+    print(f"总结缓存: 命中 {cache.stats['hits']} 次，未命中 {cache.stats['misses']} 次，"
+          f"命中率 {cache.hit_rate():.1%}，新写入 {cache.stats['stored']} 条")
+    cache.close()
 
 # 执行
 if __name__ == "__main__":
-    process_csv()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='百度百科数据清洗')
+    parser.add_argument('--batch', action='store_true', help='离线批处理模式，见 deepseek_batch.py')
+    args = parser.parse_args()
+    process_csv(batch=args.batch)
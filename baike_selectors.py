@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import threading
+import time
+
+'''
+    百度百科页面的 CSS class 选择器注册表
+    百科的 class 名由稳定前缀加构建时生成的哈希组成（如 para_wIHuD、text_XlFoe），每次改版哈希都会变化。
+    注册表按"角色"管理这些 class：
+    - 每个角色有一个稳定前缀和已知的哈希变体列表，保存在 baike_selectors.json 中，每次学习到新变体时版本号加一
+    - 默认只认已知变体；loose() 返回同时按"前缀 + 5 位哈希"识别未知变体的副本，
+      用于发现改版后的新变体，以及已知变体解析不出任何内容时的兜底
+    - 结合少量人工标注的页面可以自动学习新变体（见 baidu_baike_collection.learn_selectors），
+      之后缓存中的旧页面和新页面都能直接重新解析，无需重新爬取
+'''
+
+SELECTOR_PATH = 'baike_selectors.json'
+
+# 角色 -> 稳定前缀，角色名即前缀去掉末尾的下划线
+ROLE_PREFIXES = {
+    'lemmaSummary': 'lemmaSummary_',
+    'summary': 'summary_',
+    'para': 'para_',
+    'content': 'content_',
+    'text': 'text_',
+    'bold': 'bold_',
+    'paraTitle': 'paraTitle_',
+    'level-1': 'level-1_',
+    'level-2': 'level-2_',
+    'catalogWrapper': 'catalogWrapper_',
+}
+
+# 抓取 baike_dataset 时页面使用的 class
+BUILTIN_VARIANTS = {
+    'lemmaSummary': ['lemmaSummary_kUDz3'],
+    'summary': ['summary_GlHcs'],
+    'para': ['para_wIHuD'],
+    'content': ['content_BCpkO'],
+    'text': ['text_XlFoe'],
+    'bold': ['bold_AfpN_'],
+    'paraTitle': ['paraTitle_HIxYn'],
+    'level-1': ['level-1_ogcKG'],
+    'level-2': ['level-2_uo4pB'],
+    'catalogWrapper': ['catalogWrapper_p_9NE'],
+}
+
+# 构建工具生成的哈希：5 个字符，且至少包含一个大写字母、数字、下划线或连字符（排除 intro 这类普通单词）
+HASH_PATTERN = re.compile(r'(?=.*[A-Z0-9_-])[A-Za-z0-9_-]{5}')
+
+
+class SelectorRegistry:
+    """class 名 -> 角色 的映射，线程安全；strict 为 False 时也按前缀识别未知变体"""
+
+    def __init__(self, path=SELECTOR_PATH, strict=True):
+        self.path = path
+        self.strict = strict
+        self.version = 0
+        self.variants = {role: list(classes) for role, classes in BUILTIN_VARIANTS.items()}
+        self._lock = threading.Lock()
+        self._loose = None
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.version = data.get('version', 0)
+            for role, classes in data.get('variants', {}).items():
+                known = self.variants.setdefault(role, [])
+                known.extend(c for c in classes if c not in known)
+        self._rebuild()
+
+    def _rebuild(self):
+        self._known = {cls: role for role, classes in self.variants.items() for cls in classes}
+        # class 名 -> 角色（None 表示不是带哈希的 class）的查询缓存
+        self._cache = dict(self._known)
+        # 同一个 class 名可能同时满足多个前缀（如 para_ 和 paraTitle_ 不会冲突，但按前缀长度从长到短匹配更稳妥）
+        self._prefixes = sorted(ROLE_PREFIXES.items(), key=lambda item: -len(item[1]))
+
+    def guess_role(self, cls):
+        """只按前缀和哈希形态判断 class 的角色，不查已知变体"""
+        for role, prefix in self._prefixes:
+            if cls.startswith(prefix) and HASH_PATTERN.fullmatch(cls[len(prefix):]):
+                return role
+        return None
+
+    def role_of(self, cls):
+        """返回 class 名对应的角色，普通 class（如 MARK_MODULE）返回 None"""
+        role = self._cache.get(cls, False)
+        if role is False:
+            role = None if self.strict else self.guess_role(cls)
+            self._cache[cls] = role
+        return role
+
+    def signature(self, classes):
+        """把 class 列表中带哈希的 class 替换为角色名，例如 ['para_wIHuD', 'MARK_MODULE'] -> ('para', 'MARK_MODULE')"""
+        return tuple(self.role_of(cls) or cls for cls in classes)
+
+    def has_role(self, classes, role):
+        return any(self.role_of(cls) == role for cls in classes)
+
+    def unknown_variants(self, soup):
+        """页面中按前缀识别出、但还不在已知变体中的 class，返回 {角色: set(class)}"""
+        found = {}
+        for tag in soup.find_all(class_=True):
+            for cls in tag.get('class', []):
+                if cls in self._known:
+                    continue
+                role = self.guess_role(cls)
+                if role:
+                    found.setdefault(role, set()).add(cls)
+        return found
+
+    def add_variants(self, new_variants):
+        """登记新的哈希变体，返回实际新增的数量；调用 save() 才会写入文件"""
+        added = 0
+        with self._lock:
+            for role, classes in new_variants.items():
+                known = self.variants.setdefault(role, [])
+                for cls in sorted(classes):
+                    if cls not in known:
+                        known.append(cls)
+                        added += 1
+            if added:
+                self.version += 1
+                self._rebuild()
+                self._loose = None
+        return added
+
+    def loose(self):
+        """同样的已知变体，但也按前缀识别未知变体的注册表"""
+        if not self.strict:
+            return self
+        if self._loose is None:
+            loose = SelectorRegistry(path=None, strict=False)
+            loose.add_variants(self.variants)
+            loose.version = self.version
+            self._loose = loose
+        return self._loose
+
+    def save(self, path=None):
+        path = path or self.path
+        data = {
+            'version': self.version,
+            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'prefixes': ROLE_PREFIXES,
+            'variants': self.variants
+        }
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_registry():
+    """进程内共享的默认注册表（每个解析子进程各自加载一次）"""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = SelectorRegistry()
+        return _default_registry
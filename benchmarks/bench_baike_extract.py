@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from baidu_baike_collection import extract_sections, extract_sections_legacy
+
+'''
+    百度百科词条提取基准测试
+    用法: python benchmarks/bench_baike_extract.py [百科 HTML 目录，默认 baike_dataset]
+    页面只解析一次，分别统计：
+    - 解析耗时（每页）
+    - 旧实现（多次全树查找）的提取耗时
+    - 单次遍历实现的提取耗时
+    并逐页检查两种实现的输出是否一致
+'''
+
+REPEAT = 3
+
+
+def empty_result():
+    return {"历史渊源": "", "传承人物": "", "相关介绍": "", "错误信息": ""}
+
+
+def load_pages(html_dir):
+    pages = []
+    for name in sorted(os.listdir(html_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(html_dir, name), 'r', encoding='utf-8') as f:
+                pages.append((name, f.read()))
+    return pages
+
+
+def run_extractor(extractor, soup):
+    try:
+        return extractor(soup, empty_result())
+    except Exception as e:
+        # 旧实现遇到部分页面会抛出异常，这里把异常类型也作为输出比较
+        return ('error', type(e).__name__)
+
+
+def best_of(func, repeat=REPEAT):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(html_dir):
+    pages = load_pages(html_dir)
+    if not pages:
+        print(f"{html_dir} 中没有 HTML 文件")
+        return
+    n = len(pages)
+    print(f"共 {n} 个页面，每项取 {REPEAT} 次运行中的最好成绩\n")
+
+    start = time.perf_counter()
+    soups = [BeautifulSoup(html, 'html.parser') for _, html in pages]
+    parse_time = time.perf_counter() - start
+
+    legacy_time = best_of(lambda: [run_extractor(extract_sections_legacy, soup) for soup in soups])
+    single_pass_time = best_of(lambda: [run_extractor(extract_sections, soup) for soup in soups])
+
+    print(f"{'解析/页(ms)':>14}{'旧实现提取/页(ms)':>22}{'单次遍历提取/页(ms)':>24}{'提取加速':>10}")
+    print(f"{parse_time / n * 1000:>14.2f}{legacy_time / n * 1000:>22.2f}"
+          f"{single_pass_time / n * 1000:>24.2f}{legacy_time / single_pass_time:>10.2f}x")
+
+    diff = [name for (name, _), soup in zip(pages, soups)
+            if run_extractor(extract_sections_legacy, soup) != run_extractor(extract_sections, soup)]
+    status = '一致' if not diff else f"{len(diff)} 个页面不一致: {diff[:5]}"
+    print(f"\n两种实现的提取结果: {status}")
+
+
+if __name__ == '__main__':
+    # 基准测试只关心耗时，屏蔽提取过程中的日志
+    logging.getLogger('baidu_baike_collection').setLevel(logging.CRITICAL)
+    run(sys.argv[1] if len(sys.argv) > 1 else 'baike_dataset')
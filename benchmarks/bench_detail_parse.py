@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import logging
+from bs4 import builder_registry
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from raw_data_item_enrich import parse_html, extract_inheritors_info
+from fetch_client import decode_response
+from response_cache import get_default_cache
+
+'''
+    非遗官网详情页解析基准测试
+    用法: python benchmarks/bench_detail_parse.py [保存的详情页 HTML 目录]
+    不指定目录时从响应缓存（http_cache，raw_data_item_enrich.py 爬取时写入）回放已缓存的详情页，不访问网络。
+    对每个已安装的解析后端分别统计：
+    - 单次解析耗时（每页）
+    - 旧流程（每个字段各自解析一次，共 3 次）的耗时
+    - 单次解析 + 全部字段提取的耗时
+    并检查不同后端提取出的字段是否一致；未安装的后端直接跳过，不会退回 html.parser 计时
+'''
+
+BACKENDS = ['html.parser', 'lxml']
+REPEAT = 3
+DETAIL_URL_PATTERN = '%/project_details/%'
+
+
+def load_pages(html_dir):
+    pages = []
+    for name in sorted(os.listdir(html_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(html_dir, name), 'r', encoding='utf-8') as f:
+                pages.append((name, f.read()))
+    return pages
+
+
+def load_cached_pages(pattern=DETAIL_URL_PATTERN):
+    """从响应缓存中读取详情页，忽略有效期"""
+    cache = get_default_cache()
+    pages = []
+    for url in cache.urls(pattern):
+        response = cache.get(url, max_age=float('inf'))
+        if response is not None and response.status_code == 200:
+            pages.append((url, decode_response(response)))
+    return pages
+
+
+def best_of(func, repeat=REPEAT):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(html_dir=None):
+    pages = load_pages(html_dir) if html_dir else load_cached_pages()
+    if not pages:
+        print(f"{html_dir} 中没有 HTML 文件" if html_dir else "响应缓存中没有详情页，请先运行 raw_data_item_enrich.py")
+        return
+    print(f"共 {len(pages)} 个页面，每项取 {REPEAT} 次运行中的最好成绩\n")
+    print(f"{'后端':<12}{'解析/页(ms)':>14}{'旧流程3次解析/页(ms)':>24}{'单次解析+提取/页(ms)':>24}")
+
+    outputs = {}
+    for backend in BACKENDS:
+        # parse_html 在后端缺失时会退回 html.parser，这里先确认后端确实已安装
+        if builder_registry.lookup(backend) is None:
+            print(f"{backend:<12}未安装，跳过")
+            continue
+
+        parse_time = best_of(lambda: [parse_html(html, backend) for _, html in pages])
+        legacy_time = best_of(lambda: [[parse_html(html, backend) for _ in range(3)] for _, html in pages])
+        extract_time = best_of(lambda: [extract_inheritors_info(html, backend) for _, html in pages])
+        outputs[backend] = [extract_inheritors_info(html, backend) for _, html in pages]
+
+        n = len(pages)
+        print(f"{backend:<12}{parse_time / n * 1000:>14.2f}{legacy_time / n * 1000:>24.2f}{extract_time / n * 1000:>24.2f}")
+
+    if len(outputs) > 1:
+        reference_backend, reference = next(iter(outputs.items()))
+        for backend, result in list(outputs.items())[1:]:
+            diff = [name for (name, _), a, b in zip(pages, reference, result) if a != b]
+            status = '一致' if not diff else f"{len(diff)} 个页面不一致: {diff[:5]}"
+            print(f"{backend} 与 {reference_backend} 的提取结果: {status}")
+
+
+if __name__ == '__main__':
+    # 基准测试只关心耗时，屏蔽提取过程中的日志
+    logging.getLogger('raw_data_item_enrich').setLevel(logging.WARNING)
+    run(sys.argv[1] if len(sys.argv) > 1 else None)
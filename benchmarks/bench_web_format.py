@@ -0,0 +1,300 @@
+import csv
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from field_parser import _load, parse_field
+from web_data_process import format_columns, read_table, to_records
+
+'''
+    非遗项目_web 整理（不含 API 总结）的基准测试与一致性检查
+    用法: python benchmarks/bench_web_format.py [非遗项目_web.csv]
+    - 原始实现：仓库最初版本 web_data_process.py 中的 process_region / process_description /
+      process_person_info / process_articles 和 main 的逐行循环，原样复制在下面，
+      只把 summarize_text 换成原样返回（不请求 API）
+    - 现在的实现：web_data_process.read_table + format_columns + to_records
+    输出两种实现的耗时，并逐行比较整理结果（比较取值，不比较写出格式：原先 CSV 中的列表是 str(list)，
+    现在写成 JSON）。不一致的行分为两类：该行某个字段原先按单引号替换解析失败、现在由 field_parser 解析成功
+    （预期的改动），以及其他不一致（需要检查）
+'''
+
+REPEAT = 3
+PARSED_COLUMNS = ['申报地区或单位', '官网描述', '传承人信息', '相关文章']
+
+
+# ---------------- 原始实现（原样复制，summarize_text 除外） ----------------
+
+special_item = [
+    "孟姜女传说", "格萨（斯）尔", "江格尔", "苏东坡传说", "蒙古包营造技艺", "瑶族服饰", "苗族鼓藏节", "蒙古族服饰",
+    "藏族服饰",  "上海港码头号子", "古琴艺术", "大铜器", "蒙古族四胡音乐", "长江峡江号子", "土家族撒叶儿嗬", "苗族芦笙舞",
+    "萨吾尔登", "二人台", "淮北梆子戏", "茂腔", "豫剧", "黄梅戏", "岳家拳", "蒙古族搏克",
+    "螳螂拳", "蒙古族刺绣", "麦秆剪贴", "乐亭大鼓", "含岔曲", "山东落子", "西河大鼓", "鼓盆歌"
+]
+
+# -1去除开头，1去除结尾
+flag = [
+    1, 1, 1, 1, 1, 1, 1, 1,
+    1, -1, 1, 1, 1, 1, 1, 1,
+    1, 1, 1, 1, 1, 1, 1, 1,
+    1, 1, 1, 1, 1, 1, 1, 1
+]
+
+def summarize_text(type: str, text: str, retries=3, delay=5) -> str:
+    # 基准测试不请求 API，原样返回
+    return text
+
+def process_region(region_str):
+    """处理申报地区或单位字段"""
+    try:
+        regions = json.loads(region_str.replace("'", '"'))
+        if isinstance(regions, list):
+            return '、'.join(regions), len(regions)
+        return region_str, 1
+    except (json.JSONDecodeError, TypeError):
+        return region_str, 1
+
+def process_description(project_name, desc_str):
+    """处理官网描述字段，确保数组元素为字符串，过滤空字符串和单引号"""
+    try:
+        if project_name in special_item:
+            if flag[special_item.index(project_name)] == -1:
+                desc_str = desc_str.replace('nan, ', '') 
+            else:
+                desc_str = desc_str.replace(', nan', '')
+        # 替换单引号为双引号并尝试解析JSON
+        desc_data = json.loads(desc_str.replace("'", '"'))
+        if isinstance(desc_data, list):
+            filtered = [
+                item for item in desc_data
+                if isinstance(item, str)
+            ]
+            # API 总结
+            filtered = [summarize_text("官网描述", item) for item in filtered]
+            if len(filtered) == 1:
+                return filtered[0]
+            elif len(filtered) > 1:
+                return filtered
+            else:
+                return ''
+        elif isinstance(desc_data, str):
+            return desc_data.strip()
+        else:
+            return ''
+    except (json.JSONDecodeError, TypeError):
+        # 如果解析失败，返回原始字符串或空
+        return desc_str if isinstance(desc_str, str) else ''
+    
+def process_person_info(person_data, region_str, regions_count):
+    """处理传承人信息字段，返回传承人列表"""
+    processed_people = []
+    
+    if regions_count == 1:
+        # 单地区处理方式
+        for person in person_data:
+            if not isinstance(person, dict):
+                continue
+            
+            # 提取字段（过滤空值）
+            fields = []
+            name = person.get('name', '')
+            gender = person.get('gender', '')
+            ethnicity = person.get('ethnicity', '')
+            birth_date = person.get('birth_date', '')
+            
+            if not name:  # 如果姓名为空，跳过
+                continue
+            
+            # 构建有效字段列表
+            fields.append(name)
+            if gender:
+                fields.append(gender)
+            if ethnicity:
+                fields.append(ethnicity)
+            
+            # 籍贯字段
+            if region_str:
+                fields.append(f"籍贯：{region_str}")
+            
+            # 出生日期字段
+            if birth_date:
+                fields.append(f"出生日期：{birth_date}")
+            
+            # 拼接结果（用中文逗号分隔）
+            processed_people.append("，".join(fields))
+    else:
+        # 多地区处理方式
+        for entry in person_data:
+            if not isinstance(entry, dict) or 'position' not in entry:
+                continue
+            position = entry['position']
+            people_list = entry.get('person', [])
+            
+            for person in people_list:
+                if not isinstance(person, dict):
+                    continue
+                
+                # 提取字段（过滤空值）
+                fields = []
+                name = person.get('name', '')
+                gender = person.get('gender', '')
+                ethnicity = person.get('ethnicity', '')
+                birth_date = person.get('birth_date', '')
+                
+                if not name:
+                    continue
+                
+                # 构建有效字段列表
+                fields.append(name)
+                if gender:
+                    fields.append(gender)
+                if ethnicity:
+                    fields.append(ethnicity)
+                
+                # 籍贯字段（从position获取）
+                if position:
+                    fields.append(f"籍贯：{position}")
+                
+                # 出生日期字段
+                if birth_date:
+                    fields.append(f"出生日期：{birth_date}")
+                
+                # 拼接结果（用中文逗号分隔）
+                processed_people.append("，".join(fields))
+    
+    return processed_people
+
+def process_articles(articles_str):
+    """处理相关文章字段，确保数组元素为字典"""
+    try:
+        articles = json.loads(articles_str.replace("'", '"'))
+        if not isinstance(articles, list):
+            articles = [articles]
+        if len(articles) == 0:
+            return ''
+        processed = []
+        for article in articles:
+            if isinstance(article, dict):
+                title = article.get('title', '')
+                content = article.get('content', '')
+                if title or content:  # 只有标题或内容不为空才保留
+                    processed.append(f"{title}\n{content}")
+        processed = [summarize_text("相关文章", item) for item in processed]
+        return processed
+    except (json.JSONDecodeError, TypeError):
+        return ''
+
+def original_main(input_file):
+    # main() 的逐行循环，写入 CSV 改为收集到列表
+    rows = []
+    with open(input_file, 'r', encoding='utf-8') as infile:
+
+        reader = csv.DictReader(infile)
+
+        for row in reader:
+            # 处理申报地区或单位
+            region_str, regions_count = process_region(row['申报地区或单位'])
+            row['申报地区或单位'] = region_str
+
+            # 处理传承人信息
+            try:
+                person_data = json.loads(row['传承人信息'].replace("'", '"')) if row['传承人信息'] else []
+            except json.JSONDecodeError:
+                person_data = []
+                
+            processed_people = process_person_info(person_data, region_str, regions_count)
+
+            if row["项目名称"] == "斯":
+                row["项目名称"] = "格萨（斯）尔"
+
+            # 处理官网描述（新增）
+            row['官网描述'] = process_description(row["项目名称"], row['官网描述'])
+
+            # 处理相关文章（新增）
+            row['相关文章'] = process_articles(row['相关文章'])
+
+            # 处理传承人信息：单个不加序号，多个分行加序号
+            if processed_people:
+                if len(processed_people) > 1:
+                    processed_people = [f"{i+1}. {person}" for i, person in enumerate(processed_people)]
+                    row['传承人信息'] = '\n'.join(processed_people)
+                else:
+                    row['传承人信息'] = processed_people[0]
+                rows.append(row)
+            else:
+                row['传承人信息'] = ''
+                rows.append(row)
+    return rows
+
+# ---------------- 原始实现结束 ----------------
+
+
+def current(input_file):
+    """现在的实现；官网描述按 process_row 的规则合并（只有一段时保存字符串）"""
+    rows = to_records(format_columns(read_table(input_file)))
+    for row in rows:
+        descriptions = row['官网描述']
+        if isinstance(descriptions, list) and len(descriptions) <= 1:
+            row['官网描述'] = descriptions[0] if descriptions else ''
+    return rows
+
+
+def quote_swap(text):
+    """原先的解析方式：单引号替换为双引号后按 JSON 解析"""
+    try:
+        return json.loads(text.replace("'", '"'))
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+def best_of(func, repeat=REPEAT):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        _load.cache_clear()  # 每次都从空缓存开始，只计入同一次运行内的重复取值
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def recovered_by_parser(raw_row):
+    """该行是否有字段原先解析失败、现在由 field_parser 解析成功"""
+    return any(raw_row[column] and quote_swap(raw_row[column]) is None and parse_field(raw_row[column]) is not None
+               for column in PARSED_COLUMNS)
+
+
+def run(input_file):
+    if not os.path.exists(input_file):
+        print(f"找不到 {input_file}")
+        return
+    original_time, original_rows = best_of(lambda: original_main(input_file))
+    current_time, current_rows = best_of(lambda: current(input_file))
+    print(f"共 {len(original_rows)} 行，每项取 {REPEAT} 次运行中的最好成绩")
+    print(f"{'原始实现（逐行）':<16}{original_time * 1000:>10.1f} ms")
+    print(f"{'现在的实现（按列）':<16}{current_time * 1000:>10.1f} ms")
+
+    with open(input_file, 'r', encoding='utf-8') as f:
+        raw_rows = list(csv.DictReader(f))
+    if len(original_rows) != len(current_rows):
+        print(f"行数不一致: {len(original_rows)} != {len(current_rows)}")
+        return
+    diff = [i for i, (a, b) in enumerate(zip(original_rows, current_rows)) if a != b]
+    recovered = [i for i in diff if recovered_by_parser(raw_rows[i])]
+    unexpected = [i for i in diff if i not in set(recovered)]
+    print(f"整理结果一致 {len(original_rows) - len(diff)} 行；"
+          f"因 field_parser 解析出原先无法解析的字段而不同 {len(recovered)} 行；"
+          f"其他不一致 {len(unexpected)} 行{': ' + str(unexpected[:10]) if unexpected else ''}\n")
+
+    print(f"{'字段':<10}{'单引号替换(ms)':>16}{'field_parser(ms)':>18}{'仅 field_parser 能解析':>24}")
+    for column in PARSED_COLUMNS:
+        values = [row[column] for row in raw_rows]
+        swap_time, swapped = best_of(lambda: [quote_swap(value) for value in values])
+        parser_time, parsed = best_of(lambda: [parse_field(value) for value in values])
+        count = sum(a is None and b is not None for a, b in zip(swapped, parsed))
+        print(f"{column:<10}{swap_time * 1000:>16.1f}{parser_time * 1000:>18.1f}{count:>24}")
+
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else '非遗项目_web.csv')
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import torch
+from transformers import AutoModel, AutoTokenizer, BertConfig, BertModel, BertTokenizer
+from field_parser import parse_field
+
+'''
+    百度百科页面的语义消歧：用 bert-base-chinese 计算百科摘要与非遗官网描述的语义相似度，
+    相似度过低的页面（例如按名称"斯"搜到的同名词条）被标记为存疑或不匹配
+    - 在 CPU 上批量计算句向量（最后一层隐状态按 attention mask 取平均，再做 L2 归一化），
+      按文本长度排序后分批，减少 padding 的浪费
+    - 句向量以 (模型, 最大长度, 文本) 的哈希为键缓存在 SQLite 中，重复运行只计算新文本
+    - 阈值默认由本次运行中不相关配对的相似度分布确定，而不是固定数值
+    - 结果写入单独的输出文件，由 baidu_data_process.py 读取并跳过"不匹配"的行；
+      reject=True 时另外清空不匹配行的百科字段，清空前的内容另存一份
+    - tiny=True 时使用随机初始化的小模型，不需要下载权重，用于离线测试整个流程
+'''
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SIMILARITY_CONFIG = {
+    'model_dir': os.path.join('bert-base-chinese', 'tiansz', 'bert-base-chinese'),  # model_download.py 的下载位置
+    'batch_size': 32,
+    'max_length': 256,
+    'num_threads': None,        # torch 使用的 CPU 线程数，None 表示使用默认值
+    # 未经微调、按均值池化的 bert-base-chinese 句向量，不相关的中文文本之间相似度也常在 0.8 以上，
+    # 固定阈值没有意义。阈值为 None 时按本次运行的基线分布确定：每条百科文本与错开若干行的
+    # 其他项目官网描述配对，得到"不相关文本"的相似度分布，再取其分位数（见 calibrate_thresholds）
+    'flag_threshold': None,     # 低于该值标记为"存疑"；None 表示取基线的 flag_quantile 分位数
+    'reject_threshold': None,   # 低于该值判定为"不匹配"；None 表示取基线的 reject_quantile 分位数
+    'flag_quantile': 0.95,      # 不比 95% 的不相关配对更相似，说明与官网描述的关联不明显
+    'reject_quantile': 0.5,     # 比一半的不相关配对还低，基本可以判定为同名的其他词条
+    'baseline_shifts': 5,       # 每条文本取几个错开的配对作为基线
+    'cache_path': 'embedding_cache.sqlite3'
+}
+
+# 百科数据中改过名的项目 -> 官网项目名称（见 process_local_html_to_csv）
+PROJECT_NAME_ALIASES = {'格萨（斯）尔': '斯'}
+
+BAIKE_FIELDS = ['相关介绍', '历史渊源', '传承人物']
+
+
+class EmbeddingCache:
+    """文本哈希 -> 句向量（float32）的持久化缓存，线程安全"""
+
+    def __init__(self, path=SIMILARITY_CONFIG['cache_path']):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)')
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """批量查询，返回 {key: 向量}，只包含已缓存的键"""
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            # SQLite 单条语句的参数数量有限，分批查询
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', batch
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)',
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def build_tiny_model(seed=0, hidden_size=32):
+    """随机初始化的两层小 BERT，词表为常用汉字、ASCII 字符和特殊符号，供离线测试使用"""
+    chars = [chr(code) for code in range(0x4E00, 0x9FA6)] + [chr(code) for code in range(0x21, 0x7F)]
+    vocab = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + chars
+    vocab_dir = tempfile.mkdtemp(prefix='tiny_bert_')
+    vocab_file = os.path.join(vocab_dir, 'vocab.txt')
+    with open(vocab_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(vocab))
+    tokenizer = BertTokenizer(vocab_file)
+
+    torch.manual_seed(seed)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=hidden_size, num_hidden_layers=2,
+                        num_attention_heads=2, intermediate_size=hidden_size * 2, max_position_embeddings=512)
+    return tokenizer, BertModel(config)
+
+
+class TextEncoder:
+    """批量计算归一化句向量，并通过 EmbeddingCache 复用已计算的结果"""
+
+    def __init__(self, model_dir=None, tiny=False, batch_size=None, max_length=None, cache=None):
+        if SIMILARITY_CONFIG['num_threads']:
+            torch.set_num_threads(SIMILARITY_CONFIG['num_threads'])
+        if tiny:
+            self.tokenizer, self.model = build_tiny_model()
+            self.model_id = 'tiny-random-bert'
+        else:
+            model_dir = model_dir or SIMILARITY_CONFIG['model_dir']
+            self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+            self.model = AutoModel.from_pretrained(model_dir)
+            self.model_id = os.path.basename(os.path.normpath(model_dir))
+        self.model.eval()
+        self.batch_size = batch_size or SIMILARITY_CONFIG['batch_size']
+        self.max_length = max_length or SIMILARITY_CONFIG['max_length']
+        self.cache = cache
+        self.computed = 0
+
+    def cache_key(self, text):
+        return hashlib.sha256(f"{self.model_id}\0{self.max_length}\0{text}".encode('utf-8')).hexdigest()
+
+    def _embed_batch(self, texts):
+        tokens = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                return_tensors='pt')
+        with torch.inference_mode():
+            hidden = self.model(**tokens).last_hidden_state
+        mask = tokens['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        return torch.nn.functional.normalize(pooled, dim=1).numpy().astype(np.float32)
+
+    def encode(self, texts):
+        """返回形状为 (len(texts), 维度) 的句向量矩阵，相同文本只计算一次"""
+        texts = list(texts)
+        keys = [self.cache_key(text) for text in texts]
+        vectors = self.cache.get_many(set(keys)) if self.cache is not None else {}
+
+        # 未缓存的文本去重后按长度排序，使同一批次的长度接近
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        pending = sorted(missing.items(), key=lambda item: len(item[1]))
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            embedded = self._embed_batch([text for _, text in batch])
+            new_items = [(key, vector) for (key, _), vector in zip(batch, embedded)]
+            vectors.update(new_items)
+            if self.cache is not None:
+                self.cache.put_many(new_items)
+            self.computed += len(batch)
+            logger.info(f"已计算 {min(start + self.batch_size, len(pending))}/{len(pending)} 条文本的句向量")
+
+        if not texts:
+            return np.zeros((0, self.model.config.hidden_size), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+
+def score_pairs(encoder, left, right, baseline_shifts=0):
+    """
+    逐对计算余弦相似度，任一侧为空文本时结果为 NaN。
+    返回 (相似度, 基线)：基线为 left[i] 与错开 1..baseline_shifts 行、内容不同的 right 配对的相似度
+    """
+    left = [text.strip() for text in left]
+    right = [text.strip() for text in right]
+    valid = [i for i, (a, b) in enumerate(zip(left, right)) if a and b]
+    scores = np.full(len(left), np.nan)
+    baseline = np.zeros(0)
+    if valid:
+        a = encoder.encode([left[i] for i in valid])
+        b = encoder.encode([right[i] for i in valid])
+        # 句向量已归一化，点积即余弦相似度
+        scores[valid] = np.einsum('ij,ij->i', a, b)
+        texts = np.array([right[i] for i in valid], dtype=object)
+        shifted = []
+        for shift in range(1, min(baseline_shifts, len(valid) - 1) + 1):
+            different = texts != np.roll(texts, -shift)
+            shifted.append(np.einsum('ij,ij->i', a, np.roll(b, -shift, axis=0))[different])
+        if shifted:
+            baseline = np.concatenate(shifted)
+    return scores, baseline
+
+
+def calibrate_thresholds(baseline, flag_threshold=None, reject_threshold=None):
+    """没有显式给出的阈值取基线相似度的分位数；基线为空时不做判定（阈值为 -inf）"""
+    flag_threshold = SIMILARITY_CONFIG['flag_threshold'] if flag_threshold is None else flag_threshold
+    reject_threshold = SIMILARITY_CONFIG['reject_threshold'] if reject_threshold is None else reject_threshold
+    if len(baseline) == 0 and (flag_threshold is None or reject_threshold is None):
+        logger.warning("有效配对太少，无法估计基线分布，不做匹配判定")
+        return -np.inf, -np.inf
+    if flag_threshold is None:
+        flag_threshold = float(np.quantile(baseline, SIMILARITY_CONFIG['flag_quantile']))
+    if reject_threshold is None:
+        reject_threshold = float(np.quantile(baseline, SIMILARITY_CONFIG['reject_quantile']))
+    return flag_threshold, min(reject_threshold, flag_threshold)
+
+
+def description_text(value):
+    """官网描述在合并后的 CSV 中是 JSON 字符串或字符串数组（旧文件中为 Python 列表字面量），这里统一还原为纯文本"""
+    if not isinstance(value, str) or not value.strip():
+        return ''
+    parsed = parse_field(value)
+    if parsed is None:
+        return value
+    if isinstance(parsed, list):
+        return '\n'.join(str(item) for item in parsed)
+    return str(parsed)
+
+
+def match_status(scores, flag_threshold, reject_threshold):
+    return np.select(
+        [np.isnan(scores), scores < reject_threshold, scores < flag_threshold],
+        ['无法比较', '不匹配', '存疑'],
+        default='匹配'
+    )
+
+
+def save_rejected(rows, rejected_csv):
+    """被清空的行在清空前保存到 rejected_csv，便于复查或恢复；输入文件不会被改动，每次运行重新生成"""
+    rows.to_csv(rejected_csv, index=False, encoding='utf-8-sig')
+
+
+def check_baike_matches(web_csv='非遗项目_web.csv', baike_csv='百度百科.csv', output_csv='百度百科_checked.csv',
+                        encoder=None, reject=False, rejected_csv='百度百科_rejected.csv',
+                        flag_threshold=None, reject_threshold=None):
+    """
+    为百科数据的每一行计算百科摘要（为空时用历史渊源）与官网描述的相似度，新增"相似度"和"匹配状态"两列，
+    结果写入 output_csv，不改动输入文件，baidu_data_process.py 读取该文件并跳过"不匹配"的行。
+    reject 为 True 时另外把"不匹配"行的原始内容保存到 rejected_csv，再清空其百科字段并将 status 置为 Rejected
+    """
+    encoder = encoder or TextEncoder(cache=EmbeddingCache())
+    web_df = pd.read_csv(web_csv, dtype=str).fillna('')
+    baike_df = pd.read_csv(baike_csv, dtype=str).fillna('')
+
+    descriptions = web_df.drop_duplicates('项目名称').set_index('项目名称')['官网描述'].map(description_text)
+    official = baike_df['项目名称'].replace(PROJECT_NAME_ALIASES).map(descriptions).fillna('')
+    baike_text = baike_df['相关介绍'].where(baike_df['相关介绍'].str.strip() != '', baike_df['历史渊源'])
+
+    scores, baseline = score_pairs(encoder, baike_text.tolist(), official.tolist(),
+                                   SIMILARITY_CONFIG['baseline_shifts'])
+    flag_threshold, reject_threshold = calibrate_thresholds(baseline, flag_threshold, reject_threshold)
+    logger.info(f"基线配对 {len(baseline)} 对，"
+                f"相似度中位数 {np.median(baseline) if len(baseline) else float('nan'):.4f}；"
+                f"存疑阈值 {flag_threshold:.4f}，不匹配阈值 {reject_threshold:.4f}")
+    baike_df['相似度'] = np.round(scores, 4)
+    baike_df['匹配状态'] = match_status(scores, flag_threshold, reject_threshold)
+
+    rejected = baike_df['匹配状态'] == '不匹配'
+    if reject and rejected.any():
+        save_rejected(baike_df[rejected], rejected_csv)
+        baike_df.loc[rejected, BAIKE_FIELDS] = ''
+        if 'status' in baike_df.columns:
+            baike_df.loc[rejected, 'status'] = 'Rejected'
+        logger.info(f"已清空 {rejected.sum()} 行不匹配的百科字段，原始内容已保存至 {rejected_csv}")
+
+    baike_df.to_csv(output_csv, index=False, encoding='utf-8-sig')
+    counts = baike_df['匹配状态'].value_counts().to_dict()
+    logger.info(f"相似度检查完成: {counts}，新计算句向量 {encoder.computed} 条，结果已保存至 {output_csv}")
+    for _, row in baike_df[baike_df['匹配状态'].isin(['存疑', '不匹配'])].iterrows():
+        logger.info(f"{row['匹配状态']}: {row['项目名称']} (相似度 {row['相似度']})")
+    return baike_df
+
+
+def main(tiny=False, reject=False):
+    check_baike_matches(encoder=TextEncoder(tiny=tiny, cache=EmbeddingCache()), reject=reject)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='百度百科词条与官网描述的相似度检查')
+    parser.add_argument('--reject', action='store_true', help='清空不匹配行的百科字段（原始内容另存）')
+    args = parser.parse_args()
+    main(tiny=os.getenv('BERT_TINY') == '1', reject=args.reject)
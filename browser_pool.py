@@ -0,0 +1,273 @@
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+'''
+    可复用的无头浏览器池：
+    - N 个长期运行的浏览器，每个浏览器打开多个标签页，一批页面先在各标签页中依次开始加载，
+      再统一等待、滚动、读取源码，各页面的等待时间相互重叠
+    - 每个浏览器处理 pages_per_browser 个页面后关闭并重新启动（同时更换 User-Agent），出现异常时立即重启，
+      未完成的页面重新排队，超过 max_attempts 次仍失败则放弃
+    - 页面在 load_timeout 内没有加载完成时不读取不完整的源码，同样重新排队（浏览器不必重启）
+    - 浏览器由 driver_factory 创建，只用到 WebDriver 的少量接口；StubDriver 用 urllib 实现这些接口，
+      可以在没有 Chrome 的环境中配合本地静态文件服务器测试
+'''
+
+logger = logging.getLogger(__name__)
+
+BROWSER_POOL_CONFIG = {
+    'num_browsers': 2,          # 同时运行的浏览器数
+    'tabs_per_browser': 3,      # 每个浏览器的标签页数，即每批同时加载的页面数
+    'pages_per_browser': 60,    # 每个浏览器处理多少个页面后重启
+    'max_attempts': 2,          # 每个页面最多尝试次数
+    'page_wait': (2, 5),        # 一批页面开始加载后的随机等待（秒）
+    'scroll_times': 3,          # 模拟人类滚动次数
+    'scroll_wait': (0.5, 1.5),  # 每次滚动后的随机等待（秒）
+    'load_timeout': 30          # 等待 document.readyState == complete 的最长时间（秒）
+}
+
+
+class PageLoadTimeout(Exception):
+    """页面在 load_timeout 内没有加载完成"""
+
+
+class _StubSwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def new_window(self, type_hint=None):
+        handle = f'tab-{len(self._driver.window_handles)}'
+        self._driver.window_handles.append(handle)
+        self._driver._pages[handle] = ''
+        self._driver.current_window_handle = handle
+
+    def window(self, handle):
+        if handle not in self._driver._pages:
+            raise KeyError(f"标签页不存在: {handle}")
+        self._driver.current_window_handle = handle
+
+
+class StubDriver:
+    """用 urllib 模拟浏览器池用到的 WebDriver 接口（标签页切换、get、page_source、execute_script），用于测试"""
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.window_handles = ['tab-0']
+        self.current_window_handle = 'tab-0'
+        self._pages = {'tab-0': ''}
+        self.switch_to = _StubSwitchTo(self)
+        self.closed = False
+
+    def get(self, url):
+        # 与浏览器一样对 URL 中的中文做百分号编码
+        url = urllib.parse.quote(url, safe=':/?&=%#+@')
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            self._pages[self.current_window_handle] = response.read().decode('utf-8')
+
+    @property
+    def page_source(self):
+        return self._pages[self.current_window_handle]
+
+    def execute_script(self, script, *args):
+        return 'complete' if 'readyState' in script else None
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+
+class _PageJob:
+    def __init__(self, url, callback):
+        self.url = url
+        self.callback = callback
+        self.attempts = 0
+        self.done = False
+
+
+class BrowserPool:
+    """
+    浏览器工作池。submit(url, callback) 提交页面，callback(url, html, error) 在工作线程中被调用：
+    成功时 error 为 None，最终失败时 html 为 None。可作为上下文管理器使用，退出时等待所有页面完成
+    """
+
+    def __init__(self, driver_factory, config=None, limiter=None, on_new_tab=None):
+        self.driver_factory = driver_factory
+        self.config = {**BROWSER_POOL_CONFIG, **(config or {})}
+        self.limiter = limiter
+        self.on_new_tab = on_new_tab
+        self.stats = {'pages': 0, 'failed': 0, 'launches': 0, 'crashes': 0, 'timeouts': 0}
+        self._jobs = queue.Queue()
+        # 限制排队中的页面数，避免一次性读入全部任务
+        self._slots = threading.Semaphore(self.config['num_browsers'] * self.config['tabs_per_browser'] * 2)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def start(self):
+        for index in range(self.config['num_browsers']):
+            worker = threading.Thread(target=self._worker, name=f'browser-{index}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def submit(self, url, callback):
+        self._slots.acquire()
+        self._jobs.put(_PageJob(url, callback))
+
+    def close(self):
+        """等待所有已提交的页面处理完毕，然后关闭所有浏览器"""
+        self._jobs.join()
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _finish(self, job, html, error):
+        job.done = True
+        self._count('pages' if error is None else 'failed')
+        try:
+            job.callback(job.url, html, error)
+        except Exception as e:
+            logger.error(f"处理页面 {job.url} 的回调出错: {str(e)}")
+        self._slots.release()
+
+    def _retry(self, job, error):
+        """未超过 max_attempts 的页面重新排队，否则以 error 结束"""
+        if job.attempts < self.config['max_attempts']:
+            self._jobs.put(job)
+        else:
+            self._finish(job, None, error)
+
+    def _take_batch(self):
+        """取出一批任务，最多与标签页数相同；队列为空时返回空列表"""
+        try:
+            batch = [self._jobs.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.config['tabs_per_browser']:
+            try:
+                batch.append(self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _launch(self):
+        driver = self.driver_factory()
+        self._count('launches')
+        try:
+            handles = []
+            for index in range(self.config['tabs_per_browser']):
+                if index > 0:
+                    driver.switch_to.new_window('tab')
+                if self.on_new_tab:
+                    self.on_new_tab(driver)
+                handles.append(driver.current_window_handle)
+        except Exception:
+            self._quit(driver)
+            raise
+        return driver, handles
+
+    @staticmethod
+    def _quit(driver):
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"关闭浏览器出错: {str(e)}")
+
+    def _wait_loaded(self, driver, url):
+        """等待当前标签页加载完成，超时抛出 PageLoadTimeout"""
+        deadline = time.monotonic() + self.config['load_timeout']
+        while time.monotonic() < deadline:
+            if driver.execute_script('return document.readyState') == 'complete':
+                return
+            time.sleep(0.2)
+        raise PageLoadTimeout(f"页面 {url} 在 {self.config['load_timeout']} 秒内没有加载完成")
+
+    def _load_batch(self, driver, handles, batch, current, retried):
+        """
+        current[0] 记录正在处理的任务，出错时据此判断是哪个页面导致的；
+        retried 收集因加载超时已重新排队的任务，浏览器随后出错时不再重复排队
+        """
+        # 先让每个标签页开始加载（Chrome 使用 pageLoadStrategy=none，get 会立即返回）
+        for job, handle in zip(batch, handles):
+            current[0] = job
+            driver.switch_to.window(handle)
+            if self.limiter is not None:
+                self.limiter.wait(job.url)
+            driver.get(job.url)
+
+        # 随机等待时间更自然，整批页面只等待一次
+        current[0] = None
+        time.sleep(random.uniform(*self.config['page_wait']))
+
+        for job, handle in zip(batch, handles):
+            current[0] = job
+            driver.switch_to.window(handle)
+            try:
+                self._wait_loaded(driver, job.url)
+            except PageLoadTimeout as e:
+                # 不完整的页面不当作成功，与浏览器崩溃一样在 max_attempts 内重新排队
+                logger.warning(str(e))
+                self._count('timeouts')
+                retried.add(job)
+                self._retry(job, e)
+                continue
+            # 模拟人类滚动行为
+            for _ in range(self.config['scroll_times']):
+                driver.execute_script("window.scrollBy(0, window.innerHeight/2)")
+                time.sleep(random.uniform(*self.config['scroll_wait']))
+            self._finish(job, driver.page_source, None)
+
+    def _worker(self):
+        driver, handles, served = None, [], 0
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if not batch:
+                continue
+            for job in batch:
+                job.attempts += 1
+            current, retried = [None], set()
+            try:
+                if driver is None:
+                    driver, handles = self._launch()
+                    served = 0
+                self._load_batch(driver, handles, batch, current, retried)
+                served += len(batch)
+                if served >= self.config['pages_per_browser']:
+                    logger.info(f"浏览器已处理 {served} 个页面，重新启动")
+                    self._quit(driver)
+                    driver = None
+            except Exception as e:
+                logger.warning(f"浏览器出错，重新启动: {str(e)}")
+                self._count('crashes')
+                self._quit(driver)
+                driver = None
+                for job in batch:
+                    if job.done or job in retried:
+                        continue
+                    if current[0] is not None and job is not current[0]:
+                        # 受同一批中其他页面牵连，不计入尝试次数
+                        job.attempts -= 1
+                    self._retry(job, e)
+            finally:
+                # 重新排队的任务已先放回队列，这里再标记本批完成，close() 不会提前返回
+                for _ in batch:
+                    self._jobs.task_done()
+        self._quit(driver)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+'''
+    列表页爬取进度日志（追加写入的 JSONL 文件）
+    每条记录对应一个 (分类, 页码)，记录状态、页面内容哈希、项目 id 以及总页数；
+    同一个键以最后一条记录为准，中断后重新运行时只需补爬缺失或失败的页面。
+    分类全部爬取完成后由调用方清除其记录，日志只用于恢复被中断的运行；
+    续爬时重新请求的第 1 页与记录中的内容哈希不同，说明列表已经变化，已完成页面的分页也不再可靠
+'''
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def content_hash(projects):
+    """对接口返回的项目列表计算稳定的内容哈希"""
+    payload = json.dumps(projects, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PageJournal:
+    """以 (project_type, page) 为键的页面进度日志，线程安全"""
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}       # (type, page) -> record
+        self._total_pages = {}   # type -> total pages
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程在写入过程中被杀死时，最后一行可能不完整，直接忽略
+                    continue
+                self._apply(record)
+
+    def _apply(self, record):
+        key = (int(record['type']), int(record['page']))
+        self._entries[key] = record
+        if record.get('total_pages'):
+            self._total_pages[key[0]] = int(record['total_pages'])
+
+    def _append(self, record):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(record)
+
+    def mark_done(self, project_type, page, page_hash, ids, total_pages=None):
+        self._append({
+            'type': project_type,
+            'page': page,
+            'status': STATUS_DONE,
+            'hash': page_hash,
+            'ids': list(ids),
+            'total_pages': total_pages,
+            'time': time.time()
+        })
+
+    def mark_failed(self, project_type, page, error=''):
+        self._append({
+            'type': project_type,
+            'page': page,
+            'status': STATUS_FAILED,
+            'error': str(error),
+            'time': time.time()
+        })
+
+    def get(self, project_type, page):
+        with self._lock:
+            return self._entries.get((project_type, page))
+
+    def is_done(self, project_type, page):
+        record = self.get(project_type, page)
+        return record is not None and record['status'] == STATUS_DONE
+
+    def page_hash(self, project_type, page):
+        """已完成页面记录的内容哈希，未完成时返回 None"""
+        record = self.get(project_type, page)
+        return record.get('hash') if record is not None and record['status'] == STATUS_DONE else None
+
+    def total_pages(self, project_type):
+        with self._lock:
+            return self._total_pages.get(project_type)
+
+    def pending_pages(self, project_type):
+        """返回该分类尚未完成的页码；总页数未知时返回 None"""
+        total = self.total_pages(project_type)
+        if total is None:
+            return None
+        return [page for page in range(1, total + 1) if not self.is_done(project_type, page)]
+
+    def is_complete(self, project_type):
+        return self.pending_pages(project_type) == []
+
+    def clear(self, project_types=None):
+        """
+        清空日志，下一次运行将从头完整爬取；指定 project_types 时只清除这些分类的记录，
+        其余分类的记录（每个页面只保留最后一条）重新写回日志文件
+        """
+        with self._lock:
+            if project_types is None:
+                self._entries.clear()
+                self._total_pages.clear()
+            else:
+                project_types = set(project_types)
+                self._entries = {key: record for key, record in self._entries.items()
+                                 if key[0] not in project_types}
+                self._total_pages = {key: total for key, total in self._total_pages.items()
+                                     if key not in project_types}
+            if not self._entries:
+                if os.path.isfile(self.path):
+                    os.remove(self.path)
+                return
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in self._entries.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
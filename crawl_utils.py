@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+'''
+    爬虫公共工具：
+    - 按域名限速的令牌桶：多个线程共享同一个 HostRateLimiter，即可保证对同一站点的总请求速率不超过设定值
+    - 统一的重试/退避策略
+    - 保持输入顺序的线程池
+'''
+
+
+class TokenBucket:
+    """线程安全的令牌桶，rate 为每秒补充的令牌数，capacity 为允许的突发请求数"""
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, tokens=1):
+        """阻塞直到取得 tokens 个令牌，返回实际等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class HostRateLimiter:
+    """按域名维护独立的令牌桶，未单独配置的域名使用默认速率"""
+
+    def __init__(self, default_rate=0.5, default_capacity=1, host_rates=None):
+        self.default_rate = default_rate
+        self.default_capacity = default_capacity
+        # host -> (rate, capacity)
+        self.host_rates = dict(host_rates or {})
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, capacity = self.host_rates.get(host, (self.default_rate, self.default_capacity))
+                bucket = TokenBucket(rate, capacity)
+                self._buckets[host] = bucket
+            return bucket
+
+    def wait(self, url):
+        """在向 url 发送请求之前调用，阻塞到该域名允许下一次请求"""
+        host = urlsplit(url).netloc
+        return self.bucket_for(host).acquire()
+
+
+class RetryPolicy:
+    """重试与指数退避策略，第 attempt 次失败后等待 base_delay * backoff ** attempt 秒（附加随机抖动）"""
+
+    def __init__(self, max_retries=5, base_delay=1.0, backoff=2.0, max_delay=60.0, jitter=1.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        return min(self.max_delay, self.base_delay * self.backoff ** attempt) + random.uniform(0, self.jitter)
+
+    def sleep(self, attempt):
+        time.sleep(self.delay(attempt))
+
+
+def map_ordered(func, items, max_workers=4, on_done=None):
+    """
+    用线程池并发执行 func(item)，返回结果列表与输入顺序一一对应；
+    on_done(index, result) 会在每个任务完成时被调用，可用于打印进度
+    """
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if on_done:
+                on_done(index, results[index])
+    return results
@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from deepseek_client import DeepSeekClient, DeepSeekError, MAX_TOKENS, PACKED_PROMPT, SUMMARIZE_PROMPT
+
+'''
+    DeepSeek 总结的离线批处理模式，把耗时的 LLM 请求与 CSV 清洗流程分开：
+    - 第一遍：清洗脚本加 --batch 运行，使用 BatchClient 代替 DeepSeekClient。所有需要总结、但缓存和已有响应中
+      都没有结果的请求写入 summary_requests.jsonl（每行 custom_id + 请求体，custom_id 由模型、max_tokens 和
+      请求内容的哈希生成，重复运行保持不变），此时不写出清洗结果
+    - 执行：python deepseek_batch.py 并发执行请求，响应逐行追加到 summary_responses.jsonl，中断后重新运行会跳过
+      已有响应的请求；也可以把 summary_requests.jsonl 交给其他批处理接口执行，只要响应文件格式相同
+    - 第二遍：再次以 --batch 运行清洗脚本，响应按 custom_id 读入字典，每个总结请求 O(1) 查到结果，
+      整个文件只需处理一遍。长文本的 map-reduce 总结需要先拿到各块的总结才能生成整合请求，
+      因此会在这一遍产生新一轮请求，重复"执行 -> 合并"直到提示全部完成
+    请求行与响应行的格式与 OpenAI 兼容的批处理接口一致：
+        {"custom_id": "...", "method": "POST", "url": "/chat/completions", "body": {...}}
+        {"custom_id": "...", "response": {"status_code": 200, "body": {...}}, "error": null}
+'''
+
+REQUESTS_PATH = 'summary_requests.jsonl'
+RESPONSES_PATH = 'summary_responses.jsonl'
+
+# 结果尚未返回的总结；包含该标记的文本不会发出请求，也不会写入缓存
+PENDING = '\0pending\0'
+
+
+class PendingCache:
+    """包装 SummaryCache，含有未返回结果的总结不写入缓存"""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def get(self, *args):
+        return self._cache.get(*args)
+
+    def put(self, model, prompt, max_tokens, text, summary):
+        if PENDING not in summary:
+            self._cache.put(model, prompt, max_tokens, text, summary)
+
+
+def custom_id(model, max_tokens, content):
+    digest = hashlib.sha256(f"{model}\0{max_tokens}\0{content}".encode('utf-8')).hexdigest()
+    return f"summary-{digest[:32]}"
+
+
+def load_responses(path=RESPONSES_PATH):
+    """读取响应文件，返回 {custom_id: 回复文本 或 DeepSeekError}；同一 custom_id 以最后一行为准"""
+    responses = {}
+    if not os.path.exists(path):
+        return responses
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get('response') or {}
+            try:
+                if response.get('status_code') != 200:
+                    raise KeyError('status_code')
+                responses[record['custom_id']] = response['body']['choices'][0]['message']['content'].strip()
+            except (KeyError, IndexError, TypeError):
+                responses[record['custom_id']] = DeepSeekError(str(record.get('error') or response))
+    return responses
+
+
+def load_requests(path=REQUESTS_PATH):
+    requests = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    requests[record['custom_id']] = record
+    return requests
+
+
+def write_requests(pending, path=REQUESTS_PATH, responses=None):
+    """写出待执行的请求；文件中已有、仍没有成功响应的请求（例如另一个清洗脚本写入的）一并保留"""
+    responses = responses if responses is not None else load_responses()
+    merged = {cid: record for cid, record in load_requests(path).items()
+              if not isinstance(responses.get(cid), str)}
+    merged.update(pending)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in merged.values():
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+    return len(merged)
+
+
+class BatchClient(DeepSeekClient):
+    """
+    与 DeepSeekClient 接口相同，但不发送请求：已有响应的请求直接返回结果，
+    其余请求记录到 pending 中并返回占位文本，所在行视为未完成
+    """
+
+    def __init__(self, responses_path=RESPONSES_PATH, cache=None, **kwargs):
+        super().__init__(cache=PendingCache(cache) if cache is not None else None, **kwargs)
+        self.responses = load_responses(responses_path)
+        self.pending = {}
+        self.stats.update({'answered': 0, 'pending': 0})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def chat(self, content, max_tokens=MAX_TOKENS, payload=None):
+        payload = payload or self.builder.build(content, max_tokens)
+        content = payload['messages'][-1]['content']
+        if PENDING in content:
+            # 依赖的总结还没有结果（如 map-reduce 的整合请求），下一轮再生成
+            return PENDING
+        cid = custom_id(self.model, payload.get('max_tokens'), content)
+        result = self.responses.get(cid)
+        if isinstance(result, DeepSeekError):
+            self.stats['failed'] += 1
+            raise result
+        if result is not None:
+            self.stats['answered'] += 1
+            return result
+        if cid not in self.pending:
+            self.stats['pending'] += 1
+            self.pending[cid] = {'custom_id': cid, 'method': 'POST', 'url': '/chat/completions', 'body': payload}
+        return PENDING
+
+    async def summarize_packed(self, text):
+        # 批处理没有往返开销，短文本也逐段请求；结果仍按 PACKED_PROMPT 缓存，与在线模式共用
+        return await self._cached(text, PACKED_PROMPT, MAX_TOKENS,
+                                  lambda: self._summarize(text, SUMMARIZE_PROMPT, MAX_TOKENS,
+                                                          cache_prompt=PACKED_PROMPT))
+
+
+def finish_batch_pass(client, output_file, partial_file, requests_path=REQUESTS_PATH):
+    """
+    一遍批处理结束后调用：全部总结都有结果时把 partial_file 改名为 output_file 并返回 True，
+    否则删除 partial_file、写出待执行的请求并返回 False
+    """
+    if not client.pending:
+        os.replace(partial_file, output_file)
+        print(f"✅ 批处理结果已全部合并，已保存至 {output_file}")
+        return True
+    os.remove(partial_file)
+    total = write_requests(client.pending, requests_path, client.responses)
+    print(f"本轮新增 {len(client.pending)} 条待执行请求（{requests_path} 中共 {total} 条），"
+          f"运行 python deepseek_batch.py 执行后再次以 --batch 运行")
+    return False
+
+
+async def run_requests(requests_path=REQUESTS_PATH, responses_path=RESPONSES_PATH, concurrency=None):
+    """执行请求文件中还没有成功响应的请求，响应完成一条追加一条"""
+    responses = load_responses(responses_path)
+    todo = [record for cid, record in load_requests(requests_path).items()
+            if not isinstance(responses.get(cid), str)]
+    print(f"共 {len(todo)} 条请求待执行")
+    if not todo:
+        return {}
+
+    async with DeepSeekClient(concurrency=concurrency) as client:
+        with open(responses_path, 'a', encoding='utf-8') as out:
+
+            async def run_one(record):
+                try:
+                    content = await client.chat(None, payload=record['body'])
+                    line = {'custom_id': record['custom_id'], 'error': None, 'response': {
+                        'status_code': 200,
+                        'body': {'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}}]}
+                    }}
+                except DeepSeekError as e:
+                    line = {'custom_id': record['custom_id'], 'response': None,
+                            'error': {'message': str(e)}}
+                out.write(json.dumps(line, ensure_ascii=False) + '\n')
+                out.flush()
+
+            await asyncio.gather(*[run_one(record) for record in todo])
+    print(f"API 请求统计: {client.stats}")
+    return client.stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='执行 summary_requests.jsonl 中的 DeepSeek 总结请求')
+    parser.add_argument('requests', nargs='?', default=REQUESTS_PATH)
+    parser.add_argument('responses', nargs='?', default=RESPONSES_PATH)
+    parser.add_argument('--concurrency', type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(run_requests(args.requests, args.responses, args.concurrency))
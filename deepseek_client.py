@@ -0,0 +1,496 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+import random
+import time
+from types import MappingProxyType
+import aiohttp
+from extractive_summary import extractive_summary
+from text_chunker import chunk_text, get_counter
+
+'''
+    DeepSeek 对话接口的异步客户端，供 web_data_process.py 和 baidu_data_process.py 批量总结长文本：
+    - 基于 asyncio + aiohttp，所有请求共享一个连接池，同时进行的请求数不超过 concurrency
+    - 自适应限流：收到 429 时并发上限减半，并按 Retry-After（没有时按指数退避）暂停发送新请求；
+      之后每连续成功"当前上限"次，上限加一，直到恢复为 concurrency
+    - 超时、连接错误和 5xx 按 max_retries 重试，429 单独计数，不占用普通重试次数
+    - stream_ordered 让多行数据同时处理，但严格按输入顺序逐行交给写入函数，结果可以边算边写入 CSV
+    - 请求体由不可变的 RequestBuilder 生成，每次调用返回新的 dict，并发请求之间不会互相改写提示词
+    - 较短的文本（如短的相关文章）可以用 summarize_packed 提交，短时间内提交的多段文本合并为一个请求，
+      要求模型按顺序返回 JSON 数组；解析失败时自动退回逐段请求
+    - 超过 chunk_tokens 的长文本不再截断：按段落切块（text_chunker，本地分词器计数），
+      各块并发总结后再整合为一篇（map-reduce）
+    - 请求失败时用 extractive_summary 的本地抽取式摘要兜底（结果不写入缓存）；设置 extractive_chars 后，
+      summarize_auto 对只需轻度压缩的文本直接使用抽取式摘要
+    - 传入 summary_cache.SummaryCache 时，总结结果按原文哈希持久化，重新运行只请求新增或修改过的文本
+    - 接口地址可用环境变量 DeepSeek_API_URL 覆盖，配合 mock_deepseek_server.py 在本地测试
+'''
+
+logger = logging.getLogger(__name__)
+
+DEEPSEEK_CONFIG = {
+    'api_url': os.getenv("DeepSeek_API_URL", "https://api.deepseek.com/chat/completions"),
+    'api_key': os.getenv("DeepSeek_API_KEY"),  # 替换为你的 DeepSeek API Key
+    'model': "deepseek-reasoner",
+    'temperature': 0.7,
+    'top_p': 0.95,
+    'concurrency': 8,           # 同时进行的请求数上限
+    'timeout': 180,             # 单次请求超时（秒）
+    'max_retries': 3,           # 超时、连接错误、5xx 的最多尝试次数
+    'retry_delay': 5,           # 第 n 次重试前等待 retry_delay * n 秒
+    'max_throttled': 8,         # 单个请求最多因 429 重试的次数
+    'throttle_delay': 2,        # 429 没有 Retry-After 时的初始等待（秒），连续 429 时翻倍
+    'max_throttle_delay': 60,
+    'row_window': 256,          # stream_ordered 同时处理的行数，大多数行不需要请求，窗口要远大于并发上限
+    'pack_size': 8,             # 一个合并请求最多包含的文本段数
+    'pack_chars': 4096,         # 一个合并请求中文本的总字符数上限
+    'pack_wait': 0.2,           # 合并请求未装满时最多等待其他文本加入的时间（秒）
+    'pack_item_chars': 2048,    # summarize_auto 中不超过该长度的文本走合并请求
+    'extractive_chars': 0,      # summarize_auto 中不超过该长度的文本直接用本地抽取式摘要，0 表示不启用
+    'pack_max_tokens': 4096,    # 合并请求的 max_tokens
+    'chunk_tokens': 4000,       # 单个请求中原文的 token 预算，超出时按段落切块做 map-reduce 总结
+    'max_reduce_rounds': 3      # 各块总结拼接后仍超出预算时，最多再合并几轮
+}
+
+MAX_LENGTH = 1096  # 判断是否需要压缩的阈值
+MAX_TOKENS = 1024   # 压缩后的最大字符数
+
+SUMMARIZE_PROMPT = "请用中文对以下内容进行专业、准确的总结，保留关键信息，并确保总字数不超过1024个字符（注意，你只需要输出总结后的内容，不要输出任何无关文字）：\n\n"
+
+# 长文本 map-reduce 总结：先分别总结每一块，再把各块的总结整合为一篇
+CHUNK_PROMPT = "以下是一篇长文中的一部分，请用中文对这部分内容进行专业、准确的总结，保留人名、地名、时间、数据等关键信息，并确保总字数不超过1024个字符（注意，你只需要输出总结后的内容，不要输出任何无关文字）：\n\n"
+REDUCE_PROMPT = "以下是同一篇长文各部分按顺序排列的总结，请用中文将它们整合为一篇专业、准确的总结，保留关键信息并去除重复内容，确保总字数不超过1024个字符（注意，你只需要输出总结后的内容，不要输出任何无关文字）：\n\n"
+
+# 多段文本合并请求的提示词，文本以 JSON 字符串数组的形式附在后面
+PACKED_PROMPT = "下面的 JSON 数组中有多段相互独立的文本，请用中文分别对每一段进行专业、准确的总结，保留关键信息，每段总结不超过1024个字符。只输出一个与输入等长、顺序一致的 JSON 字符串数组，第 i 个元素是第 i 段文本的总结，不要输出任何无关文字：\n\n"
+
+# 请求体模板，只读；需要修改时用 RequestBuilder.replace 得到新的构造器
+REQUEST_BODY_TEMPLATE = MappingProxyType({
+    "model": "deepseek-reasoner",
+    "messages": (MappingProxyType({"role": "user", "content": ""}),),
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "max_tokens": MAX_TOKENS
+})
+
+
+class RequestBuilder:
+    """
+    不可变的请求体构造器：模板在创建时冻结，build() 每次返回全新的 dict（包括 messages 列表），
+    调用方修改返回值不会影响模板和其他请求
+    """
+
+    __slots__ = ('_template',)
+
+    def __init__(self, template=REQUEST_BODY_TEMPLATE, **overrides):
+        template = {**template, **overrides}
+        template['messages'] = tuple(MappingProxyType(dict(message)) for message in template['messages'])
+        object.__setattr__(self, '_template', MappingProxyType(template))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RequestBuilder 是不可变的，请使用 replace() 创建新的构造器")
+
+    @property
+    def template(self):
+        return self._template
+
+    def replace(self, **overrides):
+        return RequestBuilder(self._template, **overrides)
+
+    def build(self, content, max_tokens=None):
+        payload = {key: value for key, value in self._template.items() if key != 'messages'}
+        messages = [dict(message) for message in self._template['messages']]
+        messages[-1]['content'] = content
+        payload['messages'] = messages
+        if max_tokens is not None:
+            payload['max_tokens'] = max_tokens
+        return payload
+
+    def build_packed(self, texts, max_tokens=None):
+        """把多段文本合并为一个请求"""
+        return self.build(PACKED_PROMPT + json.dumps(list(texts), ensure_ascii=False), max_tokens)
+
+
+def parse_packed_reply(reply, count):
+    """解析合并请求的回复，返回长度为 count 的总结列表；格式不对时抛出 ValueError"""
+    reply = reply.strip()
+    # 模型有时会把 JSON 包在 ```json 代码块中
+    if reply.startswith('```'):
+        reply = reply.strip('`').strip()
+        if reply.startswith('json'):
+            reply = reply[4:]
+    start, end = reply.find('['), reply.rfind(']')
+    if start < 0 or end < start:
+        raise ValueError("回复中没有 JSON 数组")
+    summaries = json.loads(reply[start:end + 1])
+    if not isinstance(summaries, list) or len(summaries) != count \
+            or not all(isinstance(item, str) and item.strip() for item in summaries):
+        raise ValueError(f"回复的数组与输入不对应: 期望 {count} 段")
+    return [item.strip() for item in summaries]
+
+
+class DeepSeekError(Exception):
+    """请求在重试后仍然失败"""
+
+
+class AdaptiveLimiter:
+    """
+    并发上限可调的信号量（加性增、乘性减）：
+    throttled() 在收到 429 时调用，上限减半并暂停到 Retry-After 之后；succeeded() 在请求成功时调用，逐步恢复上限
+    """
+
+    def __init__(self, max_concurrency, min_concurrency=1):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = max_concurrency
+        self._active = 0
+        self._successes = 0
+        self._resume_at = 0.0
+        self._cond = None
+
+    def _condition(self):
+        # Condition 需要在事件循环中创建
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self):
+        cond = self._condition()
+        while True:
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            async with cond:
+                if self._active < self.limit:
+                    self._active += 1
+                    return
+                await cond.wait()
+
+    async def release(self):
+        cond = self._condition()
+        async with cond:
+            self._active -= 1
+            cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+    def throttled(self, retry_after):
+        now = time.monotonic()
+        # 同一次暂停期间返回的多个 429 来自同一波请求，上限只减半一次
+        if now >= self._resume_at:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+        self._successes = 0
+        self._resume_at = max(self._resume_at, now + retry_after)
+
+    def succeeded(self):
+        if self.limit >= self.max_concurrency:
+            return
+        self._successes += 1
+        if self._successes >= self.limit:
+            self._successes = 0
+            self.limit += 1
+            # 上限提高后唤醒等待中的请求
+            cond = self._condition()
+            asyncio.get_running_loop().create_task(self._notify(cond))
+
+    @staticmethod
+    async def _notify(cond):
+        async with cond:
+            cond.notify_all()
+
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class DeepSeekClient:
+    """
+    异步对话客户端，需在事件循环中作为上下文管理器使用：
+        async with DeepSeekClient(cache=SummaryCache()) as client:
+            summary = await client.summarize(text)
+    """
+
+    def __init__(self, api_url=None, api_key=None, model=None, concurrency=None, config=None, cache=None,
+                 counter=None):
+        self.config = {**DEEPSEEK_CONFIG, **(config or {})}
+        self.api_url = api_url or self.config['api_url']
+        self.api_key = api_key or self.config['api_key']
+        self.model = model or self.config['model']
+        self.builder = RequestBuilder(model=self.model, temperature=self.config['temperature'],
+                                      top_p=self.config['top_p'])
+        self.concurrency = concurrency or self.config['concurrency']
+        self.limiter = AdaptiveLimiter(self.concurrency)
+        self.cache = cache
+        self.counter = counter or get_counter()
+        self.stats = {'requests': 0, 'succeeded': 0, 'failed': 0, 'throttled': 0, 'retries': 0, 'deduplicated': 0,
+                      'packed_requests': 0, 'packed_items': 0,
+                      'map_reduce': 0, 'chunks': 0, 'extractive': 0}
+        self._inflight = {}
+        # 等待合并的短文本：[(文本, Future)]，以及到时发送的定时器
+        self._pack = []
+        self._pack_chars = 0
+        self._pack_timer = None
+        self._session = None
+
+    async def __aenter__(self):
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        self._session = aiohttp.ClientSession(
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.config['timeout']),
+            connector=aiohttp.TCPConnector(limit=self.concurrency)
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        self._session = None
+
+    async def _post(self, payload):
+        """发送一次请求，返回 (状态码, 响应头, 响应 JSON 或文本)"""
+        async with self.limiter:
+            self.stats['requests'] += 1
+            async with self._session.post(self.api_url, json=payload) as response:
+                if response.status == 200:
+                    return response.status, response.headers, await response.json(content_type=None)
+                return response.status, response.headers, await response.text()
+
+    async def chat(self, content, max_tokens=MAX_TOKENS, payload=None):
+        """返回模型回复的文本，多次重试仍失败时抛出 DeepSeekError；payload 为 None 时按 content 构造请求体"""
+        payload = payload or self.builder.build(content, max_tokens)
+        attempts, throttled = 0, 0
+        last_error = None
+        while attempts < self.config['max_retries']:
+            try:
+                status, headers, body = await self._post(payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, body = None, e
+
+            if status == 200:
+                try:
+                    result = body['choices'][0]['message']['content'].strip()
+                except (KeyError, IndexError, TypeError):
+                    # 响应结构不对时重试没有意义
+                    self.stats['failed'] += 1
+                    raise DeepSeekError(f"Invalid API response: {body}")
+                self.limiter.succeeded()
+                self.stats['succeeded'] += 1
+                return result
+
+            if status == 429:
+                throttled += 1
+                self.stats['throttled'] += 1
+                if throttled > self.config['max_throttled']:
+                    last_error = f"HTTP 429 (throttled {throttled} times)"
+                    break
+                retry_after = parse_retry_after(headers.get('Retry-After'))
+                if retry_after is None:
+                    retry_after = min(self.config['throttle_delay'] * 2 ** (throttled - 1),
+                                      self.config['max_throttle_delay'])
+                self.limiter.throttled(retry_after)
+                logger.warning(f"请求被限流 (429)，并发上限降为 {self.limiter.limit}，{retry_after:.1f} 秒后继续")
+                continue
+
+            attempts += 1
+            last_error = body if status is None else f"HTTP Error {status}: {body}"
+            if status is not None and 400 <= status < 500:
+                # 除 429 外的 4xx（如鉴权失败、请求体过大）重试也不会成功
+                break
+            logger.warning(f"Request failed on attempt {attempts}: {last_error}")
+            if attempts < self.config['max_retries']:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.config['retry_delay'] * attempts * random.uniform(0.8, 1.2))
+
+        self.stats['failed'] += 1
+        raise DeepSeekError(str(last_error))
+
+    async def summarize(self, text, prompt=SUMMARIZE_PROMPT, max_tokens=MAX_TOKENS):
+        """
+        总结一段文本，超出 chunk_tokens 的长文本做 map-reduce 总结；请求失败时返回抽取式摘要。
+        先查 SummaryCache，同一段文本同时只请求一次
+        """
+        if self.counter.count(text) <= self.config['chunk_tokens']:
+            return await self._cached(text, prompt, max_tokens, lambda: self._summarize(text, prompt, max_tokens))
+        return await self._cached(text, REDUCE_PROMPT, max_tokens, lambda: self._map_reduce(text, max_tokens))
+
+    async def summarize_auto(self, text):
+        """
+        不超过 extractive_chars 的文本直接做抽取式摘要；不超过 pack_item_chars 的文本与其他短文本合并请求，
+        更长的文本单独请求（必要时 map-reduce）
+        """
+        if len(text) <= self.config['extractive_chars']:
+            self.stats['extractive'] += 1
+            return extractive_summary(text, MAX_TOKENS)
+        if len(text) <= self.config['pack_item_chars']:
+            return await self.summarize_packed(text)
+        return await self.summarize(text)
+
+    async def summarize_packed(self, text):
+        """
+        总结一段较短的文本，与短时间内提交的其他短文本合并为一个请求；
+        结果按 PACKED_PROMPT 单独缓存，与 summarize 的缓存互不影响
+        """
+        return await self._cached(text, PACKED_PROMPT, MAX_TOKENS, lambda: self._add_to_pack(text))
+
+    async def _cached(self, text, prompt, max_tokens, request):
+        if self.cache is not None:
+            cached = self.cache.get(self.model, prompt, max_tokens, text)
+            if cached is not None:
+                return cached
+
+        # 多个项目引用同一篇文章时，正在请求中的相同文本直接等待已有的请求
+        key = (prompt, max_tokens, text)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['deduplicated'] += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(request())
+        self._inflight[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _request_summary(self, text, prompt, max_tokens, cache_prompt=None):
+        """请求一次总结并写入缓存，失败时抛出 DeepSeekError"""
+        summary = await self.chat(prompt + text, max_tokens)
+        if self.cache is not None:
+            self.cache.put(self.model, cache_prompt or prompt, max_tokens, text, summary)
+        return summary
+
+    async def _summarize(self, text, prompt, max_tokens, cache_prompt=None):
+        try:
+            return await self._request_summary(text, prompt, max_tokens, cache_prompt)
+        except DeepSeekError as e:
+            logger.error(f"总结失败，使用抽取式摘要: {e}")
+            self.stats['extractive'] += 1
+            return extractive_summary(text, MAX_TOKENS)  # 失败时返回抽取式摘要，不写入缓存
+
+    async def _summarize_chunks(self, chunks, prompt, max_tokens):
+        """并发总结各块，返回 (各块总结, 是否有块失败)；失败的块用抽取式摘要代替"""
+        results = await asyncio.gather(*[
+            self._cached(chunk, prompt, max_tokens,
+                         lambda chunk=chunk: self._request_summary(chunk, prompt, max_tokens))
+            for chunk in chunks
+        ], return_exceptions=True)
+        summaries, degraded = [], False
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, DeepSeekError):
+                logger.error(f"分块总结失败，使用抽取式摘要: {result}")
+                self.stats['extractive'] += 1
+                result, degraded = extractive_summary(chunk, MAX_TOKENS), True
+            elif isinstance(result, BaseException):
+                raise result
+            summaries.append(result)
+        return summaries, degraded
+
+    async def _map_reduce(self, text, max_tokens):
+        budget = self.config['chunk_tokens']
+        chunks = chunk_text(text, budget, self.counter)
+        self.stats['map_reduce'] += 1
+        self.stats['chunks'] += len(chunks)
+        summaries, degraded = await self._summarize_chunks(chunks, CHUNK_PROMPT, max_tokens)
+        combined = '\n'.join(summaries)
+
+        # 块数很多时各块总结拼起来仍可能超出预算，逐轮合并直到一次请求放得下
+        for _ in range(self.config['max_reduce_rounds']):
+            if self.counter.count(combined) <= budget:
+                break
+            summaries, failed = await self._summarize_chunks(chunk_text(combined, budget, self.counter),
+                                                             REDUCE_PROMPT, max_tokens)
+            combined, degraded = '\n'.join(summaries), degraded or failed
+
+        try:
+            summary = await self.chat(REDUCE_PROMPT + combined, max_tokens)
+        except DeepSeekError as e:
+            logger.error(f"整合各块总结失败，使用各块总结的抽取式摘要: {e}")
+            self.stats['extractive'] += 1
+            return extractive_summary(combined, MAX_TOKENS)
+        # 有块失败时结果不完整，不写入缓存，下次运行重新请求
+        if self.cache is not None and not degraded:
+            self.cache.put(self.model, REDUCE_PROMPT, max_tokens, text, summary)
+        return summary
+
+    def _add_to_pack(self, text):
+        future = asyncio.get_running_loop().create_future()
+        if self._pack and (len(self._pack) >= self.config['pack_size']
+                           or self._pack_chars + len(text) > self.config['pack_chars']):
+            self._flush_pack()
+        self._pack.append((text, future))
+        self._pack_chars += len(text)
+        if len(self._pack) >= self.config['pack_size']:
+            self._flush_pack()
+        elif self._pack_timer is None:
+            self._pack_timer = asyncio.get_running_loop().call_later(self.config['pack_wait'], self._flush_pack)
+        return future
+
+    def _flush_pack(self):
+        if self._pack_timer is not None:
+            self._pack_timer.cancel()
+            self._pack_timer = None
+        items, self._pack, self._pack_chars = self._pack, [], 0
+        if items:
+            asyncio.ensure_future(self._send_pack(items))
+
+    async def _send_pack(self, items):
+        texts = [text for text, _ in items]
+        try:
+            if len(texts) == 1:
+                summaries = [await self._summarize(texts[0], SUMMARIZE_PROMPT, MAX_TOKENS, cache_prompt=PACKED_PROMPT)]
+            else:
+                summaries = await self._request_pack(texts)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), summary in zip(items, summaries):
+            if not future.done():
+                future.set_result(summary)
+
+    async def _request_pack(self, texts):
+        payload = self.builder.build_packed(texts, self.config['pack_max_tokens'])
+        try:
+            summaries = parse_packed_reply(await self.chat(None, payload=payload), len(texts))
+        except (DeepSeekError, ValueError) as e:
+            logger.warning(f"合并请求失败，改为逐段请求: {e}")
+            return await asyncio.gather(*[
+                self._summarize(text, SUMMARIZE_PROMPT, MAX_TOKENS, cache_prompt=PACKED_PROMPT) for text in texts
+            ])
+        self.stats['packed_requests'] += 1
+        self.stats['packed_items'] += len(texts)
+        if self.cache is not None:
+            for text, summary in zip(texts, summaries):
+                self.cache.put(self.model, PACKED_PROMPT, MAX_TOKENS, text, summary)
+        return summaries
+
+
+async def stream_ordered(items, worker, write, window):
+    """
+    对 items 中的每一项并发执行 worker(item)，最多同时处理 window 项；
+    结果按输入顺序依次传给 write(result)，前面的项没完成时后面的结果先暂存
+    """
+    pending = collections.deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(worker(item)))
+            if len(pending) >= window:
+                write(await pending.popleft())
+        while pending:
+            write(await pending.popleft())
+    finally:
+        for task in pending:
+            task.cancel()
@@ -2,6 +2,7 @@ import csv
 import json
 from collections import defaultdict
 import pandas as pd
+from field_parser import load_field
 
 def clean_project_name(original_name):
     """清洗项目名称，提取末尾括号中的别名"""
@@ -25,17 +26,13 @@ def process_heritage_data(input_file, output_file):
         for row in reader:
             project_name = clean_project_name(row['项目名称'].strip())
 
-            # 预处理JSON字段（改用 ast 安全解析）
-            import ast
-            def safe_json_parse(s):
+            # 预处理JSON字段（标准 JSON 或旧文件中的 Python 字面量）
+            for field in ('传承人信息', '相关文章'):
                 try:
-                    return ast.literal_eval(s)  # 直接解析 Python 数据结构
-                except Exception as e:
-                    print(f"解析失败原始数据: {s}")
+                    row[field] = load_field(row[field])
+                except ValueError:
+                    print(f"解析失败原始数据: {row[field]}")
                     raise
-            
-            row['传承人信息'] = safe_json_parse(row['传承人信息'])
-            row['相关文章'] = safe_json_parse(row['相关文章'])
             grouped_data[project_name].append(row)
 
     merged_rows = []
@@ -0,0 +1,77 @@
+import numpy as np
+from text_chunker import split_sentences, truncate_at_boundary
+
+'''
+    本地抽取式摘要，不依赖网络和 GPU，单篇文本在 CPU 上只需几毫秒：
+    - 按中文句末标点和换行切分句子（与 text_chunker 的切分一致）
+    - TextRank：句子之间的相似度为共有的字二元组数 / (log|Si| + log|Sj|)，在相似度图上迭代求 PageRank 得分
+    - 按得分从高到低贪心选取句子，总长度不超过预算，最后按原文顺序拼接
+    用途：DeepSeek 请求失败时代替截断文本作为兜底；或在 DEEPSEEK_CONFIG['extractive_chars'] 中
+    设置长度，只需轻度压缩的文本直接用抽取式摘要，不再请求 API
+'''
+
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+# 句子太多时只对前面的句子打分，避免相似度矩阵过大
+MAX_SENTENCES = 1000
+
+
+def _bigrams(sentence):
+    chars = [char for char in sentence if not char.isspace()]
+    if len(chars) < 2:
+        return set(chars)
+    return {a + b for a, b in zip(chars, chars[1:])}
+
+
+def textrank_scores(sentences):
+    """返回每个句子的 TextRank 得分"""
+    n = len(sentences)
+    if n <= 2:
+        return np.ones(n)
+    grams = [_bigrams(sentence) for sentence in sentences]
+    vocabulary = {}
+    rows, cols = [], []
+    for i, sentence_grams in enumerate(grams):
+        for gram in sentence_grams:
+            rows.append(i)
+            cols.append(vocabulary.setdefault(gram, len(vocabulary)))
+    occurrence = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    occurrence[rows, cols] = 1.0
+
+    overlap = occurrence @ occurrence.T
+    sizes = np.log(np.maximum(occurrence.sum(axis=1), 2.0))
+    weights = overlap / (sizes[:, None] + sizes[None, :])
+    np.fill_diagonal(weights, 0.0)
+
+    # 按行归一化为转移矩阵，没有相似句子的孤立句均匀跳转
+    totals = weights.sum(axis=1, keepdims=True)
+    transition = np.divide(weights, totals, out=np.full_like(weights, 1.0 / n), where=totals > 0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / n + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def extractive_summary(text, max_chars):
+    """从 text 中选出不超过 max_chars 个字符的重要句子，按原文顺序拼接；text 本身不超过预算时原样返回"""
+    if not isinstance(text, str) or len(text) <= max_chars:
+        return text
+    sentences = split_sentences(text)[:MAX_SENTENCES]
+    if len(sentences) <= 1:
+        return truncate_at_boundary(text, max_chars)
+
+    scores = textrank_scores(sentences)
+    selected, total = [], 0
+    for index in np.argsort(-scores, kind='stable'):
+        length = len(sentences[index])
+        if total + length <= max_chars:
+            selected.append(index)
+            total += length
+    if not selected:
+        # 每个句子都超出预算，退回在句子边界处截断
+        return truncate_at_boundary(text, max_chars)
+    return ''.join(sentences[index] for index in sorted(selected)).strip()
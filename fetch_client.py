@@ -0,0 +1,221 @@
+import codecs
+import json
+import random
+import re
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from crawl_utils import HostRateLimiter, RetryPolicy
+from response_cache import cached_get, CacheMiss
+
+'''
+    所有爬虫共享的请求客户端：
+    - 一个带连接池的 requests.Session，HTTP keep-alive 复用 TCP/TLS 连接
+    - User-Agent 池只在首次使用时从 fake_useragent 的本地 JSON 加载一次，之后每次请求只做一次随机选择
+    - 各站点的请求速率、重试次数、退避与超时统一在 REQUEST_CONFIG 中配置
+    - 请求经过共享的响应缓存（response_cache）
+    - 统一的编码识别（decode_response）：响应头 -> <meta charset> -> 该站点上次识别出的编码 -> 严格 UTF-8，
+      都不成立时才对响应体前 DETECT_SAMPLE_BYTES 字节做统计检测，每个响应体通常只需解码一次
+'''
+
+UA_CACHE_PATH = "fake_useragent_0.1.11.json"
+FALLBACK_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36'
+
+# 各站点的请求节奏与重试配置
+REQUEST_CONFIG = {
+    'default': {
+        'requests_per_second': 1.0,
+        'burst': 2,
+        'max_retries': 3,
+        'base_delay': 1,
+        'backoff': 2,
+        'timeout': 10
+    },
+    'www.ihchina.cn': {
+        'requests_per_second': 1.0,
+        'burst': 2,
+        'max_retries': 5,
+        'base_delay': 1,
+        'backoff': 2,
+        'timeout': 10
+    },
+    # 百度百科反爬严格，原先每次请求前随机等待 5~10 秒，这里折算为每秒 0.13 次
+    'baike.baidu.com': {
+        'requests_per_second': 0.13,
+        'burst': 1,
+        'max_retries': 3,
+        'base_delay': 2,
+        'backoff': 2,
+        'timeout': 10
+    }
+}
+
+# 编码识别：<meta> 只在文档开头查找，统计检测只使用前 64KB
+META_SCAN_BYTES = 4096
+DETECT_SAMPLE_BYTES = 64 * 1024
+HEADER_CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+# 网页中标注为 gb2312/gbk 的内容经常包含超出其字符集的字，统一按超集 gb18030 解码
+CHARSET_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'ascii': 'utf-8', 'iso8859-1': 'cp1252'}
+# 单字节编码对任何字节序列都能"解码成功"，声明为这些编码时先尝试 UTF-8
+SINGLE_BYTE_CHARSETS = {'cp1252', 'iso8859-15'}
+
+_host_charsets = {}
+_host_charsets_lock = threading.Lock()
+
+
+def normalize_charset(name):
+    """把编码名规范化为 Python 的编码名，未知编码返回 None"""
+    if not name:
+        return None
+    try:
+        name = codecs.lookup(name.strip().lower()).name
+    except LookupError:
+        return None
+    return CHARSET_ALIASES.get(name.replace('_', '-'), name)
+
+
+def declared_charsets(response):
+    """按优先级返回响应头和 <meta> 中声明的编码"""
+    declared = []
+    match = HEADER_CHARSET_PATTERN.search(response.headers.get('Content-Type', ''))
+    if match:
+        declared.append(normalize_charset(match.group(1)))
+    match = META_CHARSET_PATTERN.search(response.content[:META_SCAN_BYTES])
+    if match:
+        declared.append(normalize_charset(match.group(1).decode('ascii', 'ignore')))
+    return [charset for charset in declared if charset]
+
+
+def detect_charset(body, sample_bytes=DETECT_SAMPLE_BYTES):
+    """只对响应体开头的一段样本做统计检测"""
+    sample = body[:sample_bytes]
+    return normalize_charset(chardet.detect(sample).get('encoding')) if sample else None
+
+
+def decode_response(response):
+    """
+    识别响应的编码并返回解码后的文本，同时把 response.encoding 设置为识别结果。
+    依次尝试：响应头 charset、<meta charset>、该站点缓存的编码、严格 UTF-8，
+    严格解码成功即采用；都失败时对前缀样本做统计检测并按容错方式解码
+    """
+    body = response.content or b''
+    host = urlsplit(response.url or '').netloc
+    with _host_charsets_lock:
+        host_charset = _host_charsets.get(host)
+
+    tried = set()
+    declared = declared_charsets(response)
+    candidates = ([c for c in declared if c not in SINGLE_BYTE_CHARSETS] + [host_charset, 'utf-8'] +
+                  [c for c in declared if c in SINGLE_BYTE_CHARSETS])
+    for charset in candidates:
+        if not charset or charset in tried:
+            continue
+        tried.add(charset)
+        try:
+            text = body.decode(charset)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        break
+    else:
+        charset = detect_charset(body) or host_charset or 'utf-8'
+        text = body.decode(charset, errors='replace')
+
+    if host:
+        with _host_charsets_lock:
+            _host_charsets[host] = charset
+    response.encoding = charset
+    return text
+
+
+@lru_cache(maxsize=None)
+def load_user_agents(path=UA_CACHE_PATH):
+    """读取 fake_useragent 的本地缓存文件，返回 (按权重展开的浏览器列表, {浏览器: UA 列表})"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        browsers = {name: agents for name, agents in data['browsers'].items() if agents}
+        randomize = [name for name in data['randomize'].values() if name in browsers]
+        return randomize, browsers
+    except (OSError, KeyError, ValueError):
+        return [], {}
+
+
+def random_user_agent(path=UA_CACHE_PATH):
+    """与 fake_useragent 的 ua.random 相同的选择方式：先按权重选浏览器，再随机选一个 UA"""
+    randomize, browsers = load_user_agents(path)
+    if not randomize:
+        return FALLBACK_USER_AGENT
+    return random.choice(browsers[random.choice(randomize)])
+
+
+class FetchClient:
+    """带连接池、限速、重试和响应缓存的 HTTP 客户端，可在多个线程间共享"""
+
+    def __init__(self, config=None, pool_size=16):
+        self.config = {host: {**REQUEST_CONFIG['default'], **conf} for host, conf in REQUEST_CONFIG.items()}
+        for host, conf in (config or {}).items():
+            self.config[host] = {**self.config.get(host, self.config['default']), **conf}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        default = self.config['default']
+        self.limiter = HostRateLimiter(
+            default_rate=default['requests_per_second'],
+            default_capacity=default['burst'],
+            host_rates={host: (conf['requests_per_second'], conf['burst'])
+                        for host, conf in self.config.items() if host != 'default'}
+        )
+
+    def config_for(self, url):
+        return self.config.get(urlsplit(url).netloc, self.config['default'])
+
+    def retry_policy(self, url):
+        conf = self.config_for(url)
+        return RetryPolicy(max_retries=conf['max_retries'], base_delay=conf['base_delay'], backoff=conf['backoff'])
+
+    def get(self, url, params=None, headers=None, timeout=None, max_retries=None, max_age=None, logger=None):
+        """
+        GET 请求：命中缓存直接返回，否则在限速器控制下请求，失败按该站点的退避策略重试，
+        最终失败时抛出最后一次的异常；未指定 User-Agent 时从 UA 池中随机选择
+        """
+        conf = self.config_for(url)
+        policy = self.retry_policy(url)
+        max_retries = max_retries or policy.max_retries
+        headers = dict(headers or {})
+        rotate_ua = 'User-Agent' not in headers
+        for attempt in range(max_retries):
+            if rotate_ua:
+                headers['User-Agent'] = random_user_agent()
+            try:
+                response = cached_get(url, params, session=self.session, limiter=self.limiter,
+                                      max_age=max_age, headers=headers, timeout=timeout or conf['timeout'])
+                response.raise_for_status()
+                return response
+            except CacheMiss:
+                raise
+            except requests.exceptions.RequestException as e:
+                if logger:
+                    logger.warning(f"{url} 第 {attempt+1} 次尝试失败: {str(e)}")
+                if attempt == max_retries - 1:
+                    raise
+                policy.sleep(attempt)
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """进程内共享的默认客户端"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = FetchClient()
+        return _default_client
@@ -0,0 +1,69 @@
+import ast
+import functools
+import json
+
+'''
+    CSV 中以文本保存的列表/字典字段（申报地区或单位、官网描述、传承人信息、相关文章）的统一解析与写出：
+    - 先按严格 JSON 解析；上游脚本用 dump_field 写出标准 JSON，绝大多数取值走这条路径
+    - JSON 解析失败时按 Python 字面量解析，兼容旧文件中 str(list) 写出的单引号格式：文本中没有双引号和 \'
+      时，单引号一定是字符串的定界符，替换为双引号后按 JSON 解析；否则（正文里有单引号、撇号或双引号）
+      用 ast.literal_eval 解析，不会再因为替换引号导致整个字段解析失败、数据被丢弃
+    - 开头字符不可能是 JSON 或字面量的普通文本（如官网描述正文）直接判定为无法解析，不走异常
+    - 解析结果按原文缓存，重复的取值（如 "[]"、相同的申报地区）只解析一次；
+      返回的列表和字典在多次调用之间共享，调用方不要原地修改
+'''
+
+CACHE_SIZE = 16384
+
+JSON_START = frozenset('[{"-0123456789tfn')
+LITERAL_START = frozenset('[{(\'"')
+
+_INVALID = object()
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _load(text):
+    if text[0] in JSON_START:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+    if text[0] in LITERAL_START and '"' not in text and "\\'" not in text:
+        # 没有双引号和 \' 时，Python repr 中的单引号都是字符串的定界符，替换为双引号后与 JSON 完全等价
+        try:
+            return json.loads(text.replace("'", '"'))
+        except json.JSONDecodeError:
+            pass
+    if text[0] in LITERAL_START:
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            pass
+    return _INVALID
+
+
+def load_field(text):
+    """解析字段文本，无法解析时抛出 ValueError"""
+    if not isinstance(text, str):
+        raise ValueError(f"字段不是字符串: {text!r}")
+    stripped = text.strip()
+    if stripped and (stripped[0] in JSON_START or stripped[0] in LITERAL_START):
+        result = _load(stripped)
+        if result is not _INVALID:
+            return result
+    raise ValueError(f"无法解析的字段: {text[:50]!r}")
+
+
+def parse_field(text, default=None):
+    """解析字段文本，无法解析（或不是字符串）时返回 default"""
+    try:
+        return load_field(text)
+    except ValueError:
+        return default
+
+
+def dump_field(value):
+    """把列表/字典写成标准 JSON 文本；已经是字符串的（例如从已有文件读出的字段）原样返回"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
@@ -1,12 +1,14 @@
 from selenium import webdriver
 import os
-import time
 import logging
-import random 
-from fake_useragent import UserAgent
+import functools
 import requests
 import urllib3
 import csv
+from baidu_baike_collection import fetch_baike_html
+from browser_pool import BrowserPool
+from fetch_client import get_client, random_user_agent, decode_response
+from response_cache import get_default_cache, is_offline
 
 # 抑制 InsecureRequestWarning 警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -15,18 +17,65 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-cache_path = "fake_useragent_0.1.11.json"
+def save_html(html_content, save_path):
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    with open(save_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
 
-def download_html_with_selenium(url, save_path):
-    """使用Selenium模拟浏览器下载页面"""
-    # 伪造请求头
-    ua = UserAgent(
-        use_cache_server=False,  # 禁用在线获取
-        cache=True,  # 启用本地缓存
-        path=cache_path  # 指定缓存路径
-    )
+def restore_from_cache(url, save_path):
+    """如果响应缓存中已有完整的页面，直接写出到 save_path，返回是否命中"""
+    cached = get_default_cache().get(url)
+    if cached is None:
+        return False
+    html_content = decode_response(cached)
+    if not is_complete_page(html_content):
+        return False
+    save_html(html_content, save_path)
+    return True
+
+BAIKE_URL_TEMPLATE = 'https://baike.baidu.com/item/{}'
+# 词条正文的标记（extract_content_from_html 依赖的摘要和段落标题），以及百度安全验证页的特征
+BAIKE_CONTENT_MARKERS = ('lemmaSummary', 'paraTitle')
+CHALLENGE_MARKERS = ('百度安全验证', 'wappass.baidu.com')
+
+def is_challenge_page(html_content):
+    return any(marker in html_content for marker in CHALLENGE_MARKERS)
+
+def is_complete_page(html_content):
+    """页面包含词条正文标记且不是安全验证页"""
+    if is_challenge_page(html_content):
+        return False
+    return any(marker in html_content for marker in BAIKE_CONTENT_MARKERS)
+
+def fetch_without_browser(url):
+    """先用普通 HTTP 请求获取页面，请求失败或页面不完整时返回 None，由调用方交给浏览器渲染"""
+    try:
+        html_content = fetch_baike_html(url, max_retries=1)
+    except requests.exceptions.RequestException as e:
+        logger.info(f"普通请求失败，改用浏览器: {url} ({str(e)})")
+        return None
+    if is_complete_page(html_content):
+        return html_content
+    # 验证页或不完整的页面不能留在响应缓存中，否则之后会被当作已下载的页面恢复
+    get_default_cache().discard(url)
+    return None
+
+def hide_webdriver(driver):
+    """执行JavaScript代码隐藏自动化特征（对当前标签页之后加载的文档生效）"""
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": """
+            Object.defineProperty(navigator, 'webdriver', {
+              get: () => undefined
+            })
+        """
+    })
+
+def chrome_driver_factory():
+    """启动一个无头 Chrome，供浏览器池使用；每次启动随机选择一个 User-Agent"""
     option = webdriver.ChromeOptions()
     option.headless = True
+    # get 立即返回，由浏览器池在多个标签页同时加载后统一等待
+    option.page_load_strategy = 'none'
     
     # 添加反反爬措施
     option.add_argument("--disable-blink-features=AutomationControlled")
@@ -36,51 +85,58 @@ def download_html_with_selenium(url, save_path):
     # option.add_argument(f"--proxy-server=http://{proxy_ip}")
     
     # 添加用户代理
-    option.add_argument(f"user-agent={ua.random}")
+    option.add_argument(f"user-agent={random_user_agent()}")  # UA 池只加载一次
     
-    driver = webdriver.Chrome(options=option)
-    
-    try:
-        # 执行JavaScript代码隐藏自动化特征
-        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-            "source": """
-                Object.defineProperty(navigator, 'webdriver', {
-                  get: () => undefined
-                })
-            """
-        })
-        
-        driver.get(url)
-        # 随机等待时间更自然
-        time.sleep(random.uniform(2, 5))
-        
-        # 模拟人类滚动行为
-        for _ in range(3):
-            driver.execute_script("window.scrollBy(0, window.innerHeight/2)")
-            time.sleep(random.uniform(0.5, 1.5))
-            
-        html_content = driver.page_source
-        
-        # 保存到文件
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-            
-        return True
-    except Exception as e:
-        logger.error(f"Selenium下载失败: {str(e)}")
-        return False
-    finally:
-        driver.quit()
+    return webdriver.Chrome(options=option)
 
-def batch_download_from_csv(csv_file, output_dir):
-    """从CSV文件批量下载HTML页面"""
+def store_page(url, html_content, save_path):
+    """保存到文件，同时写入共享的响应缓存，之后可离线重新解析"""
+    save_html(html_content, save_path)
+    get_default_cache().put(url, html_content.encode('utf-8'),
+                            {'Content-Type': 'text/html; charset=utf-8', 'X-Fetched-By': 'selenium'})
+
+def build_browser_pool(driver_factory=chrome_driver_factory, config=None):
+    """浏览器池共享请求客户端的按域名限速器，与其他爬虫一起遵守同一站点的请求速率"""
+    return BrowserPool(driver_factory, config=config, limiter=get_client().limiter, on_new_tab=hide_webdriver)
+
+def download_html_with_selenium(url, save_path, driver_factory=chrome_driver_factory):
+    """使用Selenium模拟浏览器下载单个页面（单浏览器、单标签页的浏览器池）"""
+    results = {}
+
+    def on_page(page_url, html_content, error):
+        if error is None:
+            store_page(page_url, html_content, save_path)
+        else:
+            logger.error(f"Selenium下载失败: {str(error)}")
+        results[page_url] = error is None
+
+    with build_browser_pool(driver_factory, {'num_browsers': 1, 'tabs_per_browser': 1}) as pool:
+        pool.submit(url, on_page)
+    return results.get(url, False)
+
+def batch_download_from_csv(csv_file, output_dir, driver_factory=chrome_driver_factory,
+                            url_template=BAIKE_URL_TEMPLATE, pool_config=None, tiered=True):
+    """
+    从CSV文件批量下载HTML页面。tiered 为 True 时先用普通 HTTP 请求获取，
+    缺少正文标记或遇到安全验证页时才交给浏览器池渲染
+    """
     if not os.path.exists(csv_file):
         logger.error(f"CSV文件不存在: {csv_file}")
         return False
     
+    def on_page(url, html_content, error, save_path, idx, project_name):
+        if error is None and is_challenge_page(html_content):
+            logger.warning(f"浏览器也遇到安全验证页，未保存: {project_name}")
+        elif error is None:
+            store_page(url, html_content, save_path)
+            logger.info(f"已下载第 {idx+1} 个文件: {project_name}")
+        else:
+            logger.warning(f"下载失败: {project_name} ({str(error)})")
+
+    pool = build_browser_pool(driver_factory, pool_config)
+    plain_pages = 0
     try:
-        with open(csv_file, 'r', encoding='utf-8-sig') as f:
+        with pool, open(csv_file, 'r', encoding='utf-8-sig') as f:
             reader = csv.DictReader(f)
             for idx, row in enumerate(reader):
 
@@ -95,21 +151,31 @@ def batch_download_from_csv(csv_file, output_dir):
                     logger.info(f"跳过已下载项目 [{idx+1}]: {project_name}")
                     continue
                 
-                url = f'https://baike.baidu.com/item/{project_name}'
-                logger.info(f"正在下载第 {idx+1} 个文件: {project_name}")
-                
-                if not download_html_with_selenium(url, save_path):
-                    logger.warning(f"下载失败: {project_name}")
-                
-                time.sleep(random.uniform(2, 5))
-                if idx > 0:
-                    if idx % 50 == 0:
-                        time.sleep(random.uniform(120, 240))
-                    elif idx % 100 == 0:
-                        time.sleep(random.uniform(240, 360))
-                    else:
-                        time.sleep(random.uniform(1, 2))
-                
+                url = url_template.format(project_name)
+
+                # 缓存命中时直接写出，无需占用浏览器
+                if restore_from_cache(url, save_path):
+                    logger.info(f"从缓存恢复 [{idx+1}]: {project_name}")
+                    continue
+                if is_offline():
+                    logger.warning(f"离线模式下缓存中不存在: {project_name}")
+                    continue
+
+                # 普通请求拿到完整页面时无需启动浏览器（响应已由请求客户端写入缓存）
+                if tiered:
+                    html_content = fetch_without_browser(url)
+                    if html_content is not None:
+                        save_html(html_content, save_path)
+                        plain_pages += 1
+                        logger.info(f"已下载第 {idx+1} 个文件（普通请求）: {project_name}")
+                        continue
+
+                # 队列已满时在这里阻塞，直到有浏览器空闲
+                pool.submit(url, functools.partial(on_page, save_path=save_path, idx=idx, project_name=project_name))
+
+        stats = pool.stats
+        logger.info(f"下载完成: 普通请求 {plain_pages} 个，浏览器渲染成功 {stats['pages']} 个，失败 {stats['failed']} 个，"
+                    f"启动浏览器 {stats['launches']} 次（其中异常重启 {stats['crashes']} 次）")
         return True
     except Exception as e:
         logger.error(f"批量下载出错: {str(e)}")
@@ -0,0 +1,143 @@
+import csv
+import json
+import os
+import shutil
+import time
+from raw_data_collection_web import (
+    BASE_URL, TYPE_MAP, JOURNAL_FILENAME, crawl_types_concurrently, project_id_from_url
+)
+from crawl_journal import PageJournal
+
+'''
+    非遗官网项目列表的增量刷新：
+    1. 将最新的项目列表爬取到临时目录
+    2. 按项目 id 与 raw_data_items 中的上一版快照比较项目名称和申报地区或单位
+    3. 生成差异报告（新增、删除、变更），只有新增或变更的详情链接才需要交给 raw_data_item_enrich 二次爬取
+    4. 用新列表替换旧快照
+'''
+
+SNAPSHOT_DIR = 'raw_data_items'
+STAGING_DIR = 'raw_data_items_staging'
+REPORT_PATH = 'listing_diff_report.json'
+
+# 参与比较的字段：项目 id 之外，名称或申报地区变化都视为需要重新爬取详情页
+COMPARE_FIELDS = ['项目名称', '申报地区或单位']
+
+
+def load_listing(csv_path):
+    """读取列表 CSV，返回 {项目 id: 行}；文件不存在时返回空字典"""
+    if not os.path.isfile(csv_path):
+        return {}
+    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as f:
+        listing = {}
+        for row in csv.DictReader(f):
+            project_id = project_id_from_url(row.get('详情链接'))
+            if project_id:
+                listing[project_id] = row
+        return listing
+
+
+def diff_listings(old, new):
+    """比较新旧两版列表，返回新增、删除和变更的项目"""
+    added = [new[pid] for pid in new if pid not in old]
+    removed = [old[pid] for pid in old if pid not in new]
+    changed = []
+    for pid, new_row in new.items():
+        old_row = old.get(pid)
+        if old_row is None:
+            continue
+        fields = {
+            field: {'old': old_row.get(field), 'new': new_row.get(field)}
+            for field in COMPARE_FIELDS if old_row.get(field) != new_row.get(field)
+        }
+        if fields:
+            changed.append({'详情链接': new_row['详情链接'], '项目名称': new_row['项目名称'], 'changes': fields})
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def build_report(diffs):
+    """汇总各分类的差异，to_enrich 为需要重新爬取详情页的链接"""
+    report = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'enriched': False, 'categories': {}, 'to_enrich': []}
+    for type_name, diff in diffs.items():
+        report['categories'][type_name] = diff
+        report['to_enrich'].extend(row['详情链接'] for row in diff['added'])
+        report['to_enrich'].extend(item['详情链接'] for item in diff['changed'])
+    return report
+
+
+def load_report(report_path=REPORT_PATH):
+    if not os.path.isfile(report_path):
+        return None
+    with open(report_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_report(report, report_path=REPORT_PATH):
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def print_report(report):
+    for type_name, diff in report['categories'].items():
+        if not (diff['added'] or diff['removed'] or diff['changed']):
+            continue
+        print(f"{type_name}: 新增 {len(diff['added'])}，删除 {len(diff['removed'])}，变更 {len(diff['changed'])}")
+        for row in diff['added']:
+            print(f"  + {row['项目名称']} ({row['申报地区或单位']})")
+        for row in diff['removed']:
+            print(f"  - {row['项目名称']} ({row['申报地区或单位']})")
+        for item in diff['changed']:
+            details = '；'.join(f"{k}: {v['old']} -> {v['new']}" for k, v in item['changes'].items())
+            print(f"  * {item['项目名称']}：{details}")
+    print(f"共 {len(report['to_enrich'])} 个详情页需要重新爬取")
+
+
+def incremental_refresh(type_map=None, snapshot_dir=SNAPSHOT_DIR, staging_dir=STAGING_DIR,
+                        report_path=REPORT_PATH, resume=False, base_url=BASE_URL, config=None):
+    """
+    爬取最新列表并与快照比较，生成差异报告后用新列表替换快照。
+    resume=True 时沿用临时目录中的进度日志，继续上一次中断的列表爬取
+    """
+    type_map = type_map or TYPE_MAP
+    # 增量刷新需要最新的列表，默认不使用缓存中的列表页
+    config = {'cache_ttl': 0, **(config or {})}
+    filenames = {type_name: f'非遗项目_{type_name}.csv' for type_name in type_map.values()}
+
+    if not resume and os.path.isdir(staging_dir):
+        for filename in list(filenames.values()) + [JOURNAL_FILENAME]:
+            path = os.path.join(staging_dir, filename)
+            if os.path.isfile(path):
+                os.remove(path)
+    # 临时目录的进度日志由这里管理：列表不完整时保留以便 resume=True 补爬，替换快照之后再清除
+    _, completed = crawl_types_concurrently(type_map, staging_dir, base_url, config=config, resume=resume,
+                                            clear_on_complete=False)
+
+    # 列表不完整时，缺失页面中的项目会被误判为删除，此时不生成报告也不替换快照
+    incomplete = [type_map[t] for t in type_map if t not in completed]
+    if incomplete:
+        print(f"以下分类的列表未爬取完整: {'、'.join(incomplete)}，请使用 resume=True 重新运行以补爬缺失页面")
+        return None
+
+    diffs = {}
+    for type_name, filename in filenames.items():
+        old = load_listing(os.path.join(snapshot_dir, filename))
+        new = load_listing(os.path.join(staging_dir, filename))
+        diffs[type_name] = diff_listings(old, new)
+
+    report = build_report(diffs)
+    save_report(report, report_path)
+    print_report(report)
+
+    # 差异报告落盘之后再替换快照，保证中断时不会丢失待爬取的链接
+    os.makedirs(snapshot_dir, exist_ok=True)
+    for filename in filenames.values():
+        staged = os.path.join(staging_dir, filename)
+        if os.path.isfile(staged):
+            shutil.move(staged, os.path.join(snapshot_dir, filename))
+    # 临时目录中的列表已经移走，之后即使以 resume=True 运行也必须重新完整爬取
+    PageJournal(os.path.join(staging_dir, JOURNAL_FILENAME)).clear()
+    return report
+
+
+if __name__ == '__main__':
+    incremental_refresh()
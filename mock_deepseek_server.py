@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+import time
+from aiohttp import web
+from deepseek_client import PACKED_PROMPT
+
+'''
+    本地模拟的 DeepSeek 对话接口（/chat/completions），用于在不消耗 API 额度的情况下测试清洗脚本：
+    - 每个请求固定延迟 latency 秒后返回，回复内容为原文的前 reply_chars 个字符；
+      合并请求（PACKED_PROMPT）返回每段文本前 reply_chars 个字符组成的 JSON 数组
+    - 每秒超过 rate_limit 个请求时返回 429 和 Retry-After，用于观察客户端的自适应限流
+    用法:
+        python mock_deepseek_server.py --port 8089 --latency 0.5 --rate-limit 20
+        DeepSeek_API_URL=http://127.0.0.1:8089/chat/completions python baidu_data_process.py
+'''
+
+
+class MockChatServer:
+    def __init__(self, latency=0.5, rate_limit=None, reply_chars=200):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.reply_chars = reply_chars
+        self.stats = {'requests': 0, 'packed': 0, 'throttled': 0, 'max_in_flight': 0}
+        self._in_flight = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def _over_limit(self):
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        return self._window_count > self.rate_limit
+
+    async def handle(self, request):
+        self.stats['requests'] += 1
+        if self._over_limit():
+            self.stats['throttled'] += 1
+            return web.json_response({'error': {'message': 'Rate limit reached'}}, status=429,
+                                     headers={'Retry-After': '1'})
+        payload = await request.json()
+        self._in_flight += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self._in_flight -= 1
+        content = payload['messages'][-1]['content']
+        if content.startswith(PACKED_PROMPT):
+            self.stats['packed'] += 1
+            texts = json.loads(content[len(PACKED_PROMPT):])
+            reply = json.dumps([text[:self.reply_chars] for text in texts], ensure_ascii=False)
+        else:
+            reply = content[:self.reply_chars]
+        return web.json_response({
+            'id': f"mock-{self.stats['requests']}",
+            'object': 'chat.completion',
+            'model': payload.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop'
+            }]
+        })
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post('/chat/completions', self.handle)
+        return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地模拟 DeepSeek 对话接口')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--rate-limit', type=int, default=None, help='每秒最多处理的请求数，超出返回 429')
+    parser.add_argument('--reply-chars', type=int, default=200)
+    args = parser.parse_args()
+    server = MockChatServer(args.latency, args.rate_limit, args.reply_chars)
+    web.run_app(server.app(), host='127.0.0.1', port=args.port)
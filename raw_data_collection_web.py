@@ -1,113 +1,385 @@
 import requests
 import csv
-from urllib.parse import urljoin
-import time
+from urllib.parse import urljoin, urlsplit
 import re
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from fetch_client import FetchClient, get_client
+from crawl_journal import PageJournal, content_hash
+from response_cache import CacheMiss
 
 BASE_URL = 'https://www.ihchina.cn'
 CSV_HEADERS = ['项目名称', '项目类别', '申报地区或单位', '详情链接']
 
-def get_projects_by_type(project_type, csv_filename):
+TYPE_MAP = {
+    1: "民间文学",
+    2: "传统音乐",
+    3: "传统舞蹈",
+    4: "传统戏剧",
+    5: "曲艺",
+    6: "传统体育、游艺与杂技",
+    7: "传统美术",
+    8: "传统技艺",
+    9: "传统医药",
+    10: "民俗"
+}
+
+# 并发爬取配置：全局并发上限 + 每个域名的请求速率
+CRAWL_CONFIG = {
+    'max_workers': 4,           # 全局并发请求上限
+    'requests_per_second': 1.0, # 单个域名每秒允许的请求数
+    'burst': 2,                 # 单个域名允许的突发请求数
+    'max_retries': 5,           # 单页失败后的最大重试次数
+    'batch_size': 100,          # 每个分类的写入线程累计多少行后落盘一次
+    'cache_ttl': 6 * 3600       # 列表页响应缓存的有效期（秒），0 表示强制重新请求
+}
+
+JOURNAL_FILENAME = '.crawl_journal.jsonl'  # 页面进度日志，删除后下一次运行将从头完整爬取
+PROJECT_ID_PATTERN = re.compile(r'/project_details/(\d+)\.html')
+
+def project_id_from_url(url):
+    """从详情链接中提取项目 id"""
+    match = PROJECT_ID_PATTERN.search(url or '')
+    return match.group(1) if match else None
+
+def load_existing_ids(csv_filename):
+    """读取已写入 CSV 的项目 id，用于断点续爬时去重"""
+    if not os.path.isfile(csv_filename):
+        return set()
+    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
+        return {pid for pid in (project_id_from_url(row.get('详情链接')) for row in csv.DictReader(f)) if pid}
+
+def get_projects_by_type(project_type, csv_filename, journal=None, client=None, base_url=BASE_URL):
+    """
+    逐页串行爬取一个分类；请求经过共享的 fetch_client（限速、重试与退避按 REQUEST_CONFIG 中该站点的配置，
+    并使用响应缓存），某页多次重试后仍失败时记录到进度日志并跳过，下一次运行时补爬
+    """
+    client = client or get_client()
     page = 1
-    session = requests.Session()
-    retry = Retry(
-        total=5,  # 增加重试次数
-        backoff_factor=5,  # 指数退避: 5s, 10s, 20s...
-        status_forcelist=[429, 500, 502, 503, 504]  # 新增429状态码
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    
+    total_pages = None
+    seen_ids = load_existing_ids(csv_filename)
+
     # 首次写入表头（优化文件存在性检查）
     if not os.path.isfile(csv_filename):
         with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
             csv.DictWriter(f, fieldnames=CSV_HEADERS).writeheader()
 
+    # 断点续爬：第 1 页总是重新请求以刷新总页数，内容与日志一致时跳过之后已完成的页面
+    resuming = journal is not None and journal.total_pages(project_type) is not None
+    previous_hash = journal.page_hash(project_type, 1) if resuming else None
+
     while True:
-        url = f"{BASE_URL}/getProject.html"
-        params = {
-            'type': project_type,
-            'category_id': 16,
-            'p': page
-        }
-
-        try:
-            response = session.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            # 检查数据结构
-            projects = data.get('list', [])
-            if not projects:
-                print(f"分类 {project_type} 第 {page} 页无数据")
+        if resuming and page > 1 and journal.is_done(project_type, page):
+            if page >= journal.total_pages(project_type):
                 break
+            page += 1
+            continue
 
-            # 写入CSV（优化写入逻辑）
-            with open(csv_filename, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-                for project in projects:
-                    try:
-                        writer.writerow({
-                            '项目名称': project.get('title', 'N/A'),
-                            '项目类别': project.get('type', 'N/A'),
-                            '申报地区或单位': project.get('province', 'N/A'),
-                            '详情链接': urljoin(BASE_URL, f"/project_details/{project.get('id', '')}.html")
-                        })
-                    except Exception as e:
-                        print(f"写入数据时发生错误: {e}")
-                        continue
-
-            print(f"分类 {project_type} 第 {page} 页爬取完成，保存 {len(projects)} 条数据到 {csv_filename}")
-            
-            # 增强分页控制（使用正则提取数字）
-            try:
-                total_pages_text = data['links']['end']['text']
-                total_pages = int(re.search(r'\d+', total_pages_text).group())
-                print(f"检测到总页数: {total_pages}")
-                if page >= total_pages:
-                    break
-            except (KeyError, TypeError, AttributeError):
-                print("无法获取总页数，尝试继续下一页")
-                total_pages = page + 1  # 强制继续
-            
+        max_age = 0 if resuming and page == 1 else CRAWL_CONFIG['cache_ttl']
+        data = fetch_page(client, project_type, page, base_url, cache_ttl=max_age)
+        if data is None:
+            if journal:
+                journal.mark_failed(project_type, page, '多次重试后仍失败')
+            if total_pages is None and resuming:
+                # 续爬时第 1 页重新请求失败，按日志中记录的总页数继续补爬
+                total_pages = journal.total_pages(project_type)
+            if total_pages is None or page >= total_pages:
+                print(f"分类 {project_type} 第 {page} 页多次重试后仍失败，停止爬取该分类")
+                break
+            print(f"分类 {project_type} 第 {page} 页多次重试后仍失败，已跳过")
             page += 1
-            time.sleep(2)  # 优化请求间隔
-
-        except requests.exceptions.HTTPError as e:
-            print(f"HTTP错误: {e}")
-            if e.response.status_code == 429:
-                print("触发反爬虫机制，等待30秒后重试...")
-                time.sleep(30)
-            else:
-                print("未知HTTP错误，等待10秒后重试...")
-                time.sleep(10)
-        except (requests.exceptions.RequestException, ValueError) as e:
-            print(f"请求出错: {e}, 5秒后重试...")
-            time.sleep(5)
             continue
 
-def main():
-    TYPE_MAP = {
-        1: "民间文学",
-        2: "传统音乐",
-        3: "传统舞蹈",
-        4: "传统戏剧",
-        5: "曲艺",
-        6: "传统体育、游艺与杂技",
-        7: "传统美术",
-        8: "传统技艺",
-        9: "传统医药",
-        10: "民俗"
+        # 检查数据结构
+        projects = data.get('list', [])
+        if not projects:
+            print(f"分类 {project_type} 第 {page} 页无数据")
+            break
+        page_hash = content_hash(projects)
+        if resuming and page == 1 and listing_changed(previous_hash, page_hash):
+            print(f"分类 {project_type} 第 1 页与进度日志不一致，列表已变化，重新爬取全部页面")
+            resuming = False
+
+        # 写入CSV（按项目 id 去重，避免重启后重复写入）
+        with open(csv_filename, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
+            for project in projects:
+                project_id = str(project.get('id', ''))
+                if project_id and project_id in seen_ids:
+                    continue
+                writer.writerow(project_to_row(project, base_url))
+                seen_ids.add(project_id)
+
+        print(f"分类 {project_type} 第 {page} 页爬取完成，保存 {len(projects)} 条数据到 {csv_filename}")
+
+        total_pages = parse_total_pages(data)
+        if journal:
+            journal.mark_done(project_type, page, page_hash,
+                              [str(p.get('id', '')) for p in projects], total_pages)
+        if total_pages is not None:
+            print(f"检测到总页数: {total_pages}")
+            if page >= total_pages:
+                break
+        else:
+            print("无法获取总页数，尝试继续下一页")
+        page += 1
+
+def listing_changed(previous_hash, page_hash):
+    """续爬时重新请求的第 1 页与日志记录的内容哈希不同：之前完成的页面可能已经错位，需要重新爬取"""
+    return previous_hash is not None and previous_hash != page_hash
+
+def clear_completed(journal, project_types):
+    """清除已全部完成的分类的进度记录，下一次运行对这些分类重新完整爬取；返回被清除的分类"""
+    completed = [project_type for project_type in project_types if journal.is_complete(project_type)]
+    if completed:
+        journal.clear(completed)
+        print(f"分类 {', '.join(map(str, completed))} 已全部爬取完成，已清除其进度记录")
+    return completed
+
+def build_client(base_url=BASE_URL, config=None):
+    """按 CRAWL_CONFIG 创建请求客户端（连接池、按域名限速、重试与响应缓存），供并发爬取的所有线程共享"""
+    config = {**CRAWL_CONFIG, **(config or {})}
+    host_config = {
+        'requests_per_second': config['requests_per_second'],
+        'burst': config['burst'],
+        'max_retries': config['max_retries'],
+        'timeout': 15
+    }
+    return FetchClient({urlsplit(base_url).netloc: host_config}, pool_size=config['max_workers'])
+
+def project_to_row(project, base_url=BASE_URL):
+    """将接口返回的单个项目转换为 CSV 行"""
+    return {
+        '项目名称': project.get('title', 'N/A'),
+        '项目类别': project.get('type', 'N/A'),
+        '申报地区或单位': project.get('province', 'N/A'),
+        '详情链接': urljoin(base_url, f"/project_details/{project.get('id', '')}.html")
     }
+
+def parse_total_pages(data):
+    """从接口返回的分页信息中解析总页数，解析失败返回 None"""
+    try:
+        return int(re.search(r'\d+', data['links']['end']['text']).group())
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+def fetch_page(client, project_type, page, base_url=BASE_URL, cache_ttl=None):
+    """请求某分类的某一页（优先使用响应缓存，限速与重试由客户端负责），最终失败时返回 None"""
+    url = f"{base_url}/getProject.html"
+    params = {
+        'type': project_type,
+        'category_id': 16,
+        'p': page
+    }
+    try:
+        return client.get(url, params, max_age=cache_ttl).json()
+    except CacheMiss as e:
+        print(e)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"分类 {project_type} 第 {page} 页请求失败: {e}")
+    return None
+
+class CategoryWriter(threading.Thread):
+    """
+    单个分类的写入线程：按页号顺序缓存各页数据，累计到 batch_size 行后一次性追加写入 CSV，
+    避免每页都重新打开文件，同时保证输出顺序与串行爬取一致。
+    已写入 CSV 的项目 id 会被跳过；页面数据真正落盘之后才在进度日志中标记为完成，
+    因此进程中途退出时最多只会重爬少量页面，而不会丢失或重复数据
+    """
+
+    def __init__(self, csv_filename, batch_size=100, journal=None, project_type=None):
+        super().__init__(daemon=True)
+        self.csv_filename = csv_filename
+        self.batch_size = batch_size
+        self.journal = journal
+        self.project_type = project_type
+        self.rows_written = 0
+        self._queue = queue.Queue()
+        self._pending = {}   # page -> (rows, 日志信息)
+        self._next_page = 1
+        self._buffer = []
+        self._buffered_pages = []
+        self._seen_ids = set()
+
+    def submit(self, page, rows, page_hash=None, total_pages=None):
+        """
+        提交某一页的数据；page_hash 为 None 表示该页无需记录进度
+        （爬取失败或已在日志中完成），此时提交空列表以免阻塞后续页面的写入
+        """
+        self._queue.put((page, rows, page_hash, total_pages))
+
+    def close(self):
+        self._queue.put(None)
+        self.join()
+
+    def _flush(self):
+        if self._buffer:
+            with open(self.csv_filename, 'a', newline='', encoding='utf-8') as f:
+                csv.DictWriter(f, fieldnames=CSV_HEADERS).writerows(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+        if self.journal:
+            for page, rows, page_hash, total_pages in self._buffered_pages:
+                ids = [project_id_from_url(row['详情链接']) for row in rows]
+                self.journal.mark_done(self.project_type, page, page_hash, ids, total_pages)
+        self._buffered_pages = []
+
+    def _buffer_page(self, page):
+        rows, page_hash, total_pages = self._pending.pop(page)
+        for row in rows:
+            project_id = project_id_from_url(row['详情链接'])
+            if project_id and project_id in self._seen_ids:
+                continue
+            self._seen_ids.add(project_id)
+            self._buffer.append(row)
+        if page_hash is not None:
+            self._buffered_pages.append((page, rows, page_hash, total_pages))
+
+    def _drain_ready_pages(self):
+        while self._next_page in self._pending:
+            self._buffer_page(self._next_page)
+            self._next_page += 1
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def run(self):
+        if not os.path.isfile(self.csv_filename):
+            with open(self.csv_filename, 'w', newline='', encoding='utf-8') as f:
+                csv.DictWriter(f, fieldnames=CSV_HEADERS).writeheader()
+        self._seen_ids = load_existing_ids(self.csv_filename)
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            page, rows, page_hash, total_pages = item
+            self._pending[page] = (rows, page_hash, total_pages)
+            self._drain_ready_pages()
+        # 收尾：按页号顺序写出剩余数据（包括因前序页缺失而未能写出的页面）
+        for page in sorted(self._pending):
+            self._buffer_page(page)
+        self._flush()
+
+def crawl_types_concurrently(type_map=None, output_dir='.', base_url=BASE_URL, config=None, resume=True,
+                             clear_on_complete=True):
+    """
+    并发爬取多个分类：
+    1. 先并发请求每个分类的第 1 页，从中解析总页数
+    2. 再将剩余页面全部提交到线程池，由全局并发上限和按域名的令牌桶共同控制请求节奏
+    3. 每个分类一个写入线程，按页号顺序批量写入 CSV
+    resume=True 时读取 output_dir 下的页面进度日志：第 1 页总是不使用缓存重新请求，以刷新总页数；
+    其内容与日志一致时只请求尚未完成或失败的页面，不一致（列表已变化）时重新爬取该分类的全部页面。
+    resume=False 时清空日志重新完整爬取（已写入 CSV 的项目仍按 id 去重）；
+    clear_on_complete=True 时，运行结束时全部完成的分类会从日志中清除
+    返回 ({分类编号: 写入行数}, 全部页面都已完成的分类编号列表)
+    """
+    type_map = type_map or TYPE_MAP
+    config = {**CRAWL_CONFIG, **(config or {})}
+    client = build_client(base_url, config)
+    os.makedirs(output_dir, exist_ok=True)
+    journal = PageJournal(os.path.join(output_dir, JOURNAL_FILENAME))
+    if not resume:
+        journal.clear()
+
+    writers = {}
+    for project_type, type_name in type_map.items():
+        filename = os.path.join(output_dir, f'非遗项目_{type_name}.csv')
+        writers[project_type] = CategoryWriter(filename, batch_size=config['batch_size'],
+                                               journal=journal, project_type=project_type)
+        writers[project_type].start()
+
+    total_pages = {}
+    with ThreadPoolExecutor(max_workers=config['max_workers']) as executor:
+        def submit(project_type, page, max_age=config['cache_ttl']):
+            future = executor.submit(fetch_page, client, project_type, page, base_url, max_age)
+            futures[future] = (project_type, page)
+
+        def schedule(project_type, total, page_hash=None):
+            """提交第 2 页起的页面；续爬且第 1 页内容未变化时，日志中已完成的页面不再请求"""
+            resuming = project_type in previous_hashes
+            if resuming and listing_changed(previous_hashes[project_type], page_hash):
+                print(f"分类 {project_type} 第 1 页与进度日志不一致，列表已变化，重新爬取全部 {total} 页")
+                resuming = False
+            skipped = 0
+            for next_page in range(2, total + 1):
+                if resuming and journal.is_done(project_type, next_page):
+                    writers[project_type].submit(next_page, [])
+                    skipped += 1
+                else:
+                    submit(project_type, next_page)
+            if resuming:
+                print(f"分类 {project_type} 日志中已完成 {skipped}/{total - 1} 页（不含第 1 页），"
+                      f"本次补爬 {total - 1 - skipped} 页")
+
+        futures = {}
+        previous_hashes = {}  # 日志中有进度的分类 -> 第 1 页记录的内容哈希（未完成时为 None）
+        for project_type in type_map:
+            if journal.total_pages(project_type) is None:
+                submit(project_type, 1)
+                continue
+            # 续爬时不使用缓存重新请求第 1 页，刷新总页数并检查列表是否变化
+            previous_hashes[project_type] = journal.page_hash(project_type, 1)
+            submit(project_type, 1, max_age=0)
+
+        while futures:
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                project_type, page = futures.pop(future)
+                data = future.result()
+                if data is None:
+                    print(f"分类 {project_type} 第 {page} 页多次重试后仍失败，已跳过")
+                    journal.mark_failed(project_type, page, '多次重试后仍失败')
+                    writers[project_type].submit(page, [])
+                    if page == 1 and project_type in previous_hashes:
+                        # 第 1 页重新请求失败时无法判断列表是否变化，按日志中的总页数只补爬未完成的页面
+                        total_pages[project_type] = journal.total_pages(project_type)
+                        schedule(project_type, total_pages[project_type], previous_hashes[project_type])
+                    continue
+
+                projects = data.get('list', [])
+                total = parse_total_pages(data)
+                page_hash = content_hash(projects)
+                writers[project_type].submit(page, [project_to_row(p, base_url) for p in projects],
+                                             page_hash, total)
+                print(f"分类 {project_type} 第 {page} 页爬取完成，共 {len(projects)} 条数据")
+
+                if page == 1:
+                    total_pages[project_type] = total
+                    if total is not None:
+                        print(f"分类 {project_type} 检测到总页数: {total}")
+                        schedule(project_type, total, page_hash)
+                        continue
+                # 无法获取总页数时退化为逐页探测，直到某页无数据
+                if total_pages.get(project_type) is None and projects:
+                    submit(project_type, page + 1)
+
+    result = {}
+    for project_type, writer in writers.items():
+        writer.close()
+        result[project_type] = writer.rows_written
+        print(f"{'='*30} 分类 {project_type} - {type_map[project_type]} 共写入 {writer.rows_written} 条 {'='*30}")
+    completed = [project_type for project_type in type_map if journal.is_complete(project_type)]
+    if clear_on_complete:
+        # 进度日志只用于恢复被中断的运行，全部完成的分类下一次运行重新完整爬取
+        clear_completed(journal, completed)
+    return result, completed
+
+def main(concurrent=True, resume=True):
+    if concurrent:
+        crawl_types_concurrently(TYPE_MAP, resume=resume)
+        return
+
+    journal = PageJournal(JOURNAL_FILENAME)
+    if not resume:
+        journal.clear()
     for project_type in range(1, 11):
         filename = f'非遗项目_{TYPE_MAP[project_type]}.csv'
         print(f"\n{'='*30} 开始爬取分类 {project_type} - {TYPE_MAP[project_type]} {'='*30}")
-        get_projects_by_type(project_type, filename)
+        get_projects_by_type(project_type, filename, journal)
         print(f"{'='*30} 分类 {project_type} 爬取完成 {'='*30}\n")
+    clear_completed(journal, TYPE_MAP)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,18 +1,62 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound
 import pandas as pd
 import logging
 import os
-import time
-import random
+import threading
+from crawl_utils import map_ordered
+from article_cache import ArticleCache
+from fetch_client import get_client, decode_response
+from response_cache import CacheMiss, get_default_cache
+from field_parser import dump_field
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def extract_inheritors_info(html_content):
+BASE_URL = 'https://www.ihchina.cn'
+ARTICLE_CACHE_PATH = 'article_cache.sqlite3'  # 相关文章正文的持久化缓存
+
+# HTML 解析后端，默认使用内置的 'html.parser'。'lxml' 明显更快，但对不规范 HTML 的容错与 html.parser 不同，
+# 先用 benchmarks/bench_detail_parse.py 在缓存的详情页上确认两者提取结果一致，再设置环境变量 HTML_PARSER=lxml 启用；
+# 指定的后端未安装时自动退回 'html.parser'
+PARSER_BACKEND = os.getenv('HTML_PARSER', 'html.parser')
+
+# 二次爬取配置：线程池大小；请求速率与重试策略在 fetch_client.REQUEST_CONFIG 中按站点统一配置
+ENRICH_CONFIG = {
+    'max_workers': 4
+}
+
+_article_cache = None
+
+def get_article_cache():
+    global _article_cache
+    if _article_cache is None:
+        _article_cache = ArticleCache(ARTICLE_CACHE_PATH)
+    return _article_cache
+
+_fallback_warned = False
+
+def parse_html(html_content, backend=None):
+    """
+    将 HTML 解析为文档树，每个页面只解析一次，之后把同一棵树传给各字段的提取函数；
+    已经是文档树时原样返回
+    """
+    global _fallback_warned
+    if isinstance(html_content, BeautifulSoup):
+        return html_content
+    backend = backend or PARSER_BACKEND
+    try:
+        return BeautifulSoup(html_content, backend)
+    except FeatureNotFound:
+        if not _fallback_warned:
+            logger.warning(f"解析后端 {backend} 不可用，改用 html.parser")
+            _fallback_warned = True
+        return BeautifulSoup(html_content, 'html.parser')
+
+def extract_inheritors_info(html_content, backend=None):
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content, backend)
         
         # 提取项目名称
         project_name, related_articles = "", []
@@ -21,10 +65,10 @@ def extract_inheritors_info(html_content):
             project_name = h30.text.strip()
 
         # 提取官网描述
-        description = extract_description_text(html_content)
+        description = extract_description_text(soup)
 
         # 提取相关咨询文章
-        related_articles = extract_related_articles(html_content, project_name)
+        related_articles = extract_related_articles(soup, project_name)
 
         # 检查是否存在相关传承人部分
         inheritors_section = None
@@ -91,9 +135,12 @@ def extract_inheritors_info(html_content):
         return []
 
 def extract_related_articles(html_content, project_name):
-    """提取包含项目名称的相关咨询文章"""
+    """
+    提取包含项目名称的相关咨询文章的标题和链接；
+    正文不在解析阶段下载，而是由 fill_related_articles 对一批项目统一去重后并发下载
+    """
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content)
         list_mod2 = soup.find('div', class_='list-mod2')
         if not list_mod2:
             return []
@@ -102,11 +149,9 @@ def extract_related_articles(html_content, project_name):
         for link in list_mod2.find_all('a', class_='list-link'):
             p_tag = link.find('div', class_='p')
             if p_tag and project_name in p_tag.text:
-                article_url = 'https://www.ihchina.cn' + link['href']
-                content = scrape_article(article_url)
                 related_articles.append({
                     'title': p_tag.text.strip(),
-                    'content': content
+                    'url': BASE_URL + link['href']
                 })
         return related_articles
     
@@ -115,8 +160,9 @@ def extract_related_articles(html_content, project_name):
         return []
 
 def extract_description_text(html_content):
+    """提取官网描述，html_content 可以是 HTML 文本，也可以是 parse_html 得到的文档树"""
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content)
         
         inherit_div = soup.find('div', class_='inherit_xx1 article-mod2')
         if not inherit_div:
@@ -164,7 +210,7 @@ def extract_description_text(html_content):
 def extract_article_content(html_content):
     """提取文章主体内容"""
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content)
         article_div = soup.find('div', class_='article-cont')
         if not article_div:
             return ""
@@ -184,74 +230,107 @@ def extract_article_content(html_content):
         logger.error(f"提取文章内容时发生错误: {str(e)}")
         return ""
 
-def scrape_article(url):
-    """爬取文章内容"""
+def fetch_html(url, timeout=None, max_retries=None, max_age=None):
+    """
+    通过共享的请求客户端获取页面并返回解码后的文本（限速、重试、缓存均由客户端负责），最终失败时抛出异常。
+    max_age 为可接受的缓存时长（秒），0 表示强制重新请求
+    """
+    response = get_client().get(url, timeout=timeout, max_retries=max_retries, max_age=max_age, logger=logger)
+    return decode_response(response)
+
+def fetch_article(url):
+    """下载并解析单篇文章，失败时返回 None（失败结果不会写入缓存）"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=100)
-        response.raise_for_status()
-        
-        # 处理编码问题
-        if response.encoding == 'ISO-8859-1':
-            for encoding in ['utf-8', 'gb2312', 'gbk']:
-                try:
-                    response.encoding = encoding
-                    response.text
-                    break
-                except UnicodeDecodeError:
-                    continue
-        
-        return extract_article_content(response.text)
+        return extract_article_content(fetch_html(url, timeout=100, max_retries=1))
     
     except Exception as e:
         logger.error(f"爬取文章时发生错误: {str(e)}")
-        return ""
+        return None
 
-def scrape_url(url):
-    REQUEST_CONFIG = {
-        'base_delay': 3,
-        'random_delay': 2,
-        'max_retries': 5
+def scrape_article(url):
+    """爬取文章内容"""
+    content = fetch_article(url)
+    return content if content is not None else ""
+
+def fill_related_articles(enriched_items, cache=None):
+    """
+    为一批详情页结果补全相关文章正文：文章按链接去重，已缓存的直接复用，
+    其余文章并发下载后写入缓存，因此同一篇文章在一次运行中只会下载、解析一次
+    """
+    if cache is None:
+        cache = get_article_cache()
+    urls = list(dict.fromkeys(
+        article['url']
+        for item in enriched_items if isinstance(item.get('related_articles'), list)
+        for article in item['related_articles'] if 'url' in article
+    ))
+    if not urls:
+        return enriched_items
+
+    contents = cache.get_many(urls)
+    missing = [url for url in urls if url not in contents]
+    logger.info(f"相关文章共 {len(urls)} 篇（已去重），缓存命中 {len(contents)} 篇，需下载 {len(missing)} 篇")
+    for url, content in zip(missing, map_ordered(fetch_article, missing, ENRICH_CONFIG['max_workers'])):
+        if content is not None:
+            cache.put(url, content)
+            contents[url] = content
+
+    for item in enriched_items:
+        if isinstance(item.get('related_articles'), list):
+            item['related_articles'] = [
+                {'title': article['title'], 'content': contents.get(article['url'], '')} if 'url' in article else article
+                for article in item['related_articles']
+            ]
+    return enriched_items
+
+def empty_enriched_item():
+    return {
+        'web_description': "",
+        'inheritors': [],
+        'related_articles': []
     }
-    for attempt in range(REQUEST_CONFIG["max_retries"]):
+
+def scrape_detail(url, max_age=None):
+    """爬取并解析单个详情页（相关文章只包含标题和链接），失败时返回空字段，保证结果可以与原始数据逐行对齐"""
+    try:
+        html_content = fetch_html(url, max_age=max_age)
+    except CacheMiss as e:
+        logger.error(str(e))
+        return empty_enriched_item()
+    except requests.exceptions.RequestException:
+        logger.error(f"URL {url} 重试{get_client().retry_policy(url).max_retries}次后失败")
+        return empty_enriched_item()  # 确保返回完整数据结构
+
+    inheritors = extract_inheritors_info(html_content)
+    return inheritors if inheritors else empty_enriched_item()
+
+def scrape_url(url):
+    """爬取单个详情页并补全相关文章正文"""
+    return fill_related_articles([scrape_detail(url)])[0]
+
+def enrich_urls(urls, label='', max_age=None):
+    """
+    用线程池并发爬取一组详情页，请求节奏由共享的令牌桶控制，全部详情页解析完成后统一下载相关文章；
+    返回结果与 urls 顺序一一对应，单个链接失败时对应位置为空字段
+    """
+    total = len(urls)
+    finished = [0]
+    lock = threading.Lock()
+
+    def safe_scrape(url):
         try:
-            delay = REQUEST_CONFIG['base_delay'] + random.uniform(0, REQUEST_CONFIG['random_delay'])
-            time.sleep(delay)
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36 Edg/135.0.0.0'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()  # 如果响应状态码不是200，则抛出异常
-            
-            # 确保使用正确的编码
-            if response.encoding == 'ISO-8859-1':
-                possible_encodings = ['utf-8', 'gb2312', 'gbk']
-                for encoding in possible_encodings:
-                    try:
-                        response.encoding = encoding
-                        # 测试解码是否正常
-                        response.text
-                        break
-                    except UnicodeDecodeError:
-                        continue
-            
-            inheritors = extract_inheritors_info(response.text)
-            
-            return inheritors
-        
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"第 {attempt+1} 次尝试失败: {str(e)}")
-            if attempt == REQUEST_CONFIG["max_retries"] - 1:
-                logger.error(f"URL {url} 重试{REQUEST_CONFIG['max_retries']}次后失败")
-                # return {'web_description': "", 'inheritors': [], 'related_articles': []}
-                return {  # 确保返回完整数据结构
-                    'web_description': "", 
-                    'inheritors': [],
-                    'related_articles': []
-                }
-            time.sleep(2 ** attempt)  # 指数退避等待
+            return scrape_detail(url, max_age)
+        except Exception as e:
+            logger.error(f"处理URL失败: {url}，错误: {str(e)}")
+            return empty_enriched_item()  # 异常时填充空值
+
+    def on_done(index, result):
+        with lock:
+            finished[0] += 1
+            logger.info(f"{label} 已完成 {finished[0]}/{total}: {urls[index]}")
+
+    results = map_ordered(safe_scrape, urls, ENRICH_CONFIG['max_workers'], on_done)
+    return fill_related_articles(results)
 
 def save_to_csv(data, output_file='inheritors_info.csv'):
     if not data:
@@ -261,8 +340,8 @@ def save_to_csv(data, output_file='inheritors_info.csv'):
     # 将数据转换为DataFrame
     df = pd.DataFrame([{
         'web_description': data['web_description'],
-        'inheritors': str(data['inheritors']),  # 将列表转换为字符串格式
-        'related_articles': data['related_articles']
+        'inheritors': dump_field(data['inheritors']),  # 列表写成标准 JSON
+        'related_articles': dump_field(data['related_articles'])
     }])
     
     df.to_csv(output_file, index=False, encoding='utf-8-sig')
@@ -274,8 +353,9 @@ def save_enriched_data(original_df, enriched_data, output_folder='enrich_web_ite
         # 合并原始数据和新字段
         merged_df = original_df.copy()
         merged_df['官网描述'] = [d['web_description'] for d in enriched_data]
-        merged_df['传承人信息'] = [str(d['inheritors']) for d in enriched_data]
-        merged_df['相关文章'] = [d['related_articles'] for d in enriched_data]
+        # 列表写成标准 JSON，下游用 field_parser 解析时走 JSON 快速路径；增量模式复用的取值已是文本，原样写回
+        merged_df['传承人信息'] = [dump_field(d['inheritors']) for d in enriched_data]
+        merged_df['相关文章'] = [dump_field(d['related_articles']) for d in enriched_data]
         
         # 创建输出目录
         os.makedirs(output_folder, exist_ok=True)
@@ -290,12 +370,109 @@ def save_enriched_data(original_df, enriched_data, output_folder='enrich_web_ite
         logger.error(f"保存扩展数据时出错: {str(e)}")
         return False
 
+def load_enriched_items(output_path):
+    """读取已有的扩展文件，返回 {详情链接: 扩展字段}，用于增量模式下复用未变化项目的结果"""
+    if not os.path.isfile(output_path):
+        return {}
+    enriched_df = pd.read_csv(output_path, keep_default_na=False)
+    return {
+        row['详情链接']: {
+            'web_description': row['官网描述'],
+            'inheritors': row['传承人信息'],
+            'related_articles': row['相关文章']
+        }
+        for _, row in enriched_df.iterrows()
+    }
+
+def enrich_csv_file(csv_file, input_folder='raw_data_items', output_folder='enrich_web_items', to_enrich=None):
+    """
+    对单个分类文件中的详情链接进行二次爬取并保存。
+    to_enrich 为 None 时爬取全部链接；否则只爬取其中的链接以及扩展文件中尚不存在的链接，
+    其余项目直接复用上一次的扩展结果
+    """
+    file_path = os.path.join(input_folder, csv_file)
+    logger.info(f"开始处理文件: {csv_file}")
+
+    # 读取原始数据
+    df = pd.read_csv(file_path)
+    df.attrs['source_file'] = file_path  # 保存源文件路径
+
+    if '详情链接' not in df.columns:
+        logger.error(f"{csv_file} 中缺少详情链接列")
+        return False
+
+    previous = {}
+    if to_enrich is not None:
+        previous = load_enriched_items(os.path.join(output_folder, csv_file))
+
+    # 增量模式下未变化的项目直接复用已有结果，其余链接交给线程池并发爬取
+    urls = list(df['详情链接'])
+    total_urls = len(urls)
+    enriched_data = [None] * total_urls
+    pending = []
+    for index, url in enumerate(urls):
+        if to_enrich is not None and url not in to_enrich and url in previous:
+            enriched_data[index] = previous[url]
+        else:
+            pending.append(index)
+
+    # 增量模式下需要重新爬取的项目都已发生变化，不使用缓存中的旧页面
+    results = enrich_urls([urls[index] for index in pending], label=csv_file,
+                          max_age=0 if to_enrich is not None else None)
+    for index, data in zip(pending, results):
+        enriched_data[index] = data
+    scraped = len(pending)
+
+    if to_enrich is not None:
+        logger.info(f"{csv_file} 增量模式: 爬取 {scraped} 个详情页，复用 {total_urls - scraped} 条已有结果")
+
+    # 保存扩展数据
+    if save_enriched_data(df, enriched_data, output_folder):
+        logger.info(f"文件处理完成: {csv_file}")
+        return scraped
+    logger.error(f"文件保存失败: {csv_file}")
+    return False
+
+def enrich_incremental(report_path='listing_diff_report.json', input_folder='raw_data_items', output_folder='enrich_web_items'):
+    """根据 listing_diff.py 生成的差异报告，只爬取新增或变更项目的详情页"""
+    from listing_diff import load_report, save_report
+
+    report = load_report(report_path)
+    to_enrich = set(report['to_enrich'])
+    logger.info(f"增量模式: 差异报告中共有 {len(to_enrich)} 个详情页需要重新爬取")
+
+    for type_name in report['categories']:
+        csv_file = f'非遗项目_{type_name}.csv'
+        if not os.path.isfile(os.path.join(input_folder, csv_file)):
+            logger.warning(f"{input_folder} 中不存在 {csv_file}，跳过")
+            continue
+        try:
+            if enrich_csv_file(csv_file, input_folder, output_folder, to_enrich) is False:
+                return False
+        except Exception as e:
+            logger.error(f"处理文件 {csv_file} 时发生严重错误: {str(e)}")
+            return False
+
+    report['enriched'] = True
+    save_report(report, report_path)
+    return True
+
 # 测试代码
 if __name__ == "__main__":
     input_folder = 'raw_data_items'
     output_folder = 'enrich_web_items'
-    
+    report_path = 'listing_diff_report.json'
+
     try:
+        # 存在尚未处理的增量差异报告时，只爬取新增或变更的项目
+        if os.path.isfile(report_path):
+            from listing_diff import load_report
+            if not load_report(report_path).get('enriched'):
+                ok = enrich_incremental(report_path, input_folder, output_folder)
+                logger.info("增量处理完成！" if ok else "增量处理未完成，可重新运行继续")
+                logger.info(f"响应缓存: {get_default_cache().report()}")
+                exit(0 if ok else 1)
+
         # 获取所有CSV文件
         csv_files = [f for f in os.listdir(input_folder) if f.endswith('.csv')][3:]
 
@@ -303,54 +480,16 @@ if __name__ == "__main__":
             logger.error(f"{input_folder} 中没有找到CSV文件")
             exit(1)
 
-        # 处理每个文件
+        # 处理每个文件（请求节奏由令牌桶统一控制，分类之间无需额外休眠）
         for csv_file in csv_files:
-            file_path = os.path.join(input_folder, csv_file)
-            logger.info(f"开始处理文件: {csv_file}")
-            
             try:
-                # 读取原始数据
-                df = pd.read_csv(file_path)
-                df.attrs['source_file'] = file_path  # 保存源文件路径
-                
-                if '详情链接' not in df.columns:
-                    logger.error(f"{csv_file} 中缺少详情链接列")
-                    continue
-                
-                # 准备存储扩展数据
-                enriched_data = []
-                total_urls = len(df['详情链接'])
-                
-                # 处理每个URL
-                for index, url in enumerate(df['详情链接'], 1):
-                    try:
-                        logger.info(f"正在处理 {csv_file} 的URL {index}/{total_urls}")
-                        data = scrape_url(url)
-                        if data:
-                            enriched_data.append(data)
-                    except Exception as e:
-                        logger.error(f"处理URL失败: {url}，错误: {str(e)}")
-                        enriched_data.append({  # 异常时填充空值
-                            'web_description': "",
-                            'inheritors': [],
-                            'related_articles': []
-                        })
-                        continue
-                        
-                # 保存扩展数据
-                if save_enriched_data(df, enriched_data, output_folder):
-                    logger.info(f"文件处理完成: {csv_file}")
-                else:
-                    logger.error(f"文件保存失败: {csv_file}")
-                    
+                enrich_csv_file(csv_file, input_folder, output_folder)
             except Exception as e:
                 logger.error(f"处理文件 {csv_file} 时发生严重错误: {str(e)}")
                 continue
-            
-            # 每个种类处理完后休眠一会，防止过快请求
-            time.sleep(random.uniform(120, 180))  # 随机等待2到3分钟
-                
+
         logger.info("所有文件处理完成！")
+        logger.info(f"响应缓存: {get_default_cache().report()}")
         
     except Exception as e:
         logger.error(f"程序初始化失败: {str(e)}")
@@ -0,0 +1,258 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+'''
+    所有爬虫共享的原始响应缓存（类似 WARC 的本地存档）
+    - 按内容寻址：响应体以 sha256 命名、gzip 压缩后存放在 objects/ 下，相同内容只存一份
+    - SQLite 索引：URL -> 内容摘要、状态码、响应头、抓取时间、最近访问时间
+    - 支持按 TTL 过期以及按总大小淘汰最久未访问的条目；命中时以 DEBUG 级别记录缓存内容的抓取时长，
+      report() 汇总命中次数与命中内容中最旧的一条，便于判断是否需要缩短有效期
+    - 离线回放模式（环境变量 CRAWL_OFFLINE=1 或 set_offline(True)）：只从缓存读取，不访问网络，
+      修复解析逻辑后可以按磁盘速度重新运行所有提取流程
+'''
+
+CACHE_DIR = os.getenv('HTTP_CACHE_DIR', 'http_cache')
+DEFAULT_TTL = 7 * 24 * 3600           # 默认缓存有效期 7 天
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3     # 压缩后总大小上限 2GB
+
+HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+_offline = os.getenv('CRAWL_OFFLINE') == '1'
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    """离线模式下请求的 URL 不在缓存中"""
+
+
+def set_offline(flag=True):
+    global _offline
+    _offline = flag
+
+
+def is_offline():
+    return _offline
+
+
+def build_url(url, params=None):
+    """拼接查询参数得到完整 URL，作为缓存键"""
+    if not params:
+        return url
+    return requests.Request('GET', url, params=params).prepare().url
+
+
+def build_response(url, status_code, headers, body):
+    """用缓存内容构造 requests.Response，调用方无需区分响应来自网络还是缓存"""
+    response = requests.models.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+class ResponseCache:
+    """URL -> (压缩响应体, 响应头, 抓取时间) 的持久化存储，线程安全"""
+
+    def __init__(self, root=CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.oldest_hit_age = 0.0   # 命中的缓存内容中，抓取时间距今最久的秒数
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'index.sqlite3'), check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'url TEXT PRIMARY KEY, digest TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL, '
+            'fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_digest ON responses (digest)')
+        self._conn.commit()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest + '.gz')
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get(self, url, max_age=None):
+        """
+        返回缓存的 requests.Response；不存在或超过有效期时返回 None。
+        max_age 覆盖默认 TTL（秒），离线模式下忽略有效期
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT digest, status, headers, fetched_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return self._miss()
+        digest, status, headers, fetched_at = row
+        max_age = self.ttl if max_age is None else max_age
+        age = time.time() - fetched_at
+        if not is_offline() and max_age is not None and age > max_age:
+            return self._miss()
+        try:
+            with gzip.open(self._object_path(digest), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return self._miss()
+        with self._lock:
+            self._conn.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+            self.hits += 1
+            self.oldest_hit_age = max(self.oldest_hit_age, age)
+        logger.debug(f"缓存命中 {url}，内容抓取于 {age / 3600:.1f} 小时前")
+        response = build_response(url, status, json.loads(headers), body)
+        response.fetched_at = fetched_at
+        return response
+
+    def report(self):
+        """命中统计，例如 '命中 12 次，未命中 3 次，命中内容最旧的抓取于 30.5 小时前'"""
+        with self._lock:
+            hits, misses, oldest = self.hits, self.misses, self.oldest_hit_age
+        summary = f"命中 {hits} 次，未命中 {misses} 次"
+        if hits:
+            summary += f"，命中内容最旧的抓取于 {oldest / 3600:.1f} 小时前"
+        return summary
+
+    def put(self, url, body, headers=None, status=200):
+        """保存一次响应，body 为原始字节"""
+        # 保存的是解压后的响应体，与传输相关的响应头不再适用
+        headers = {k: v for k, v in dict(headers or {}).items() if k.lower() not in HOP_HEADERS}
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (url, digest, status, headers, fetched_at, accessed_at, size) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, digest, status, json.dumps(headers, ensure_ascii=False), now, now,
+                 os.path.getsize(path))
+            )
+            self._conn.commit()
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            self.evict()
+
+    def put_response(self, response):
+        self.put(response.url, response.content, response.headers, response.status_code)
+
+    def _delete(self, urls):
+        """删除索引条目，并清理不再被引用的响应体文件"""
+        digests = set()
+        for url in urls:
+            row = self._conn.execute('SELECT digest FROM responses WHERE url = ?', (url,)).fetchone()
+            if row:
+                digests.add(row[0])
+            self._conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+        for digest in digests:
+            if self._conn.execute('SELECT 1 FROM responses WHERE digest = ? LIMIT 1', (digest,)).fetchone() is None:
+                try:
+                    os.remove(self._object_path(digest))
+                except OSError:
+                    pass
+
+    def discard(self, url):
+        """删除一个条目，例如内容不完整、不应被之后的运行复用的页面"""
+        with self._lock:
+            self._delete([url])
+            self._conn.commit()
+
+    def evict(self):
+        """删除过期条目，再按最近访问时间淘汰，直到总大小不超过上限；返回删除的条目数"""
+        removed = 0
+        with self._lock:
+            if self.ttl is not None:
+                expired = [row[0] for row in self._conn.execute(
+                    'SELECT url FROM responses WHERE fetched_at < ?', (time.time() - self.ttl,))]
+                self._delete(expired)
+                removed += len(expired)
+            if self.max_bytes:
+                # 同一响应体可能被多个 URL 引用，这里按条目大小近似估算
+                total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+                victims = []
+                for url, size in self._conn.execute('SELECT url, size FROM responses ORDER BY accessed_at'):
+                    if total <= self.max_bytes * 0.9:
+                        break
+                    victims.append(url)
+                    total -= size
+                self._delete(victims)
+                removed += len(victims)
+            self._conn.commit()
+        return removed
+
+    def urls(self, pattern=None):
+        """缓存中的 URL 列表，pattern 为 SQL LIKE 模式（例如 '%/project_details/%'），按 URL 排序"""
+        with self._lock:
+            if pattern is None:
+                rows = self._conn.execute('SELECT url FROM responses ORDER BY url').fetchall()
+            else:
+                rows = self._conn.execute('SELECT url FROM responses WHERE url LIKE ? ORDER BY url',
+                                          (pattern,)).fetchall()
+        return [row[0] for row in rows]
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM responses WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def cached_get(url, params=None, session=None, limiter=None, cache=None, max_age=None, **kwargs):
+    """
+    带缓存的 GET 请求：命中缓存时直接返回，不经过限速器；否则通过 session（默认 requests）请求，
+    成功的响应写入缓存。离线模式下未命中缓存会抛出 CacheMiss
+    """
+    if cache is None:
+        cache = get_default_cache()
+    full_url = build_url(url, params)
+    response = cache.get(full_url, max_age=max_age)
+    if response is not None:
+        return response
+    if is_offline():
+        raise CacheMiss(f"离线模式下缓存中不存在: {full_url}")
+
+    if limiter is not None:
+        limiter.wait(full_url)
+    response = (session or requests).get(full_url, **kwargs)
+    response.from_cache = False
+    if response.status_code == 200:
+        cache.put(full_url, response.content, response.headers, response.status_code)
+    return response
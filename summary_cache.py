@@ -0,0 +1,65 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+'''
+    DeepSeek 总结结果的持久化缓存（SQLite）
+    键为 (模型, 提示词模板, max_tokens, sha256(原文))，任何一项变化都视为新的请求；
+    只缓存请求成功的总结，失败时兜底返回的本地抽取式摘要（以及按 extractive_chars 直接生成的抽取式摘要）不写入缓存，
+    下一次运行会重新请求。
+    重新运行清洗脚本时，只有新增或修改过的文本才会真正请求 API
+'''
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def summary_key(model, prompt, max_tokens, text):
+    return hashlib.sha256(f"{model}\0{prompt}\0{max_tokens}\0{text_hash(text)}".encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    """总结请求 -> 总结文本 的持久化缓存，线程安全，stats 记录本次运行的命中情况"""
+
+    def __init__(self, path='summary_cache.sqlite3'):
+        self.path = path
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS summaries ('
+            'key TEXT PRIMARY KEY, model TEXT NOT NULL, text_hash TEXT NOT NULL, '
+            'summary TEXT NOT NULL, created_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, model, prompt, max_tokens, text):
+        key = summary_key(model, prompt, max_tokens, text)
+        with self._lock:
+            row = self._conn.execute('SELECT summary FROM summaries WHERE key = ?', (key,)).fetchone()
+            self.stats['hits' if row else 'misses'] += 1
+        return row[0] if row else None
+
+    def put(self, model, prompt, max_tokens, text, summary):
+        key = summary_key(model, prompt, max_tokens, text)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO summaries (key, model, text_hash, summary, created_at) VALUES (?, ?, ?, ?, ?)',
+                (key, model, text_hash(text), summary, time.time())
+            )
+            self._conn.commit()
+            self.stats['stored'] += 1
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+
+# 仓库中的脚本都是顶层模块，测试直接从仓库根目录导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_cache
+from stub_servers import StubListingServer
+
+
+@pytest.fixture
+def http_cache(tmp_path, monkeypatch):
+    """每个测试使用独立的响应缓存，工作目录切换到临时目录"""
+    monkeypatch.chdir(tmp_path)
+    cache = response_cache.ResponseCache(str(tmp_path / 'http_cache'))
+    monkeypatch.setattr(response_cache, '_default_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def listing_server():
+    server = StubListingServer({1: 12, 2: 7}).start()
+    yield server
+    server.stop()
@@ -0,0 +1,100 @@
+import json
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler, SimpleHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+'''
+    测试用的本地服务器：模拟非遗官网的项目列表接口 /getProject.html，以及浏览器池使用的静态页面
+'''
+
+
+class StubListingServer:
+    """
+    counts 为 {分类编号: 项目数}，每页 per_page 个项目，分页信息与官网接口格式一致；
+    hits 记录收到的 (分类, 页码)，fail_pages 中的 (分类, 页码) 返回 500
+    """
+
+    def __init__(self, counts, per_page=5):
+        self.counts = dict(counts)
+        self.per_page = per_page
+        self.renamed = {}   # 项目 id -> 新名称，用于模拟列表中项目的变更
+        self.hits = []
+        self.fail_pages = set()
+        self._server = None
+
+    def projects(self, project_type, page):
+        start = (page - 1) * self.per_page
+        end = min(self.counts.get(project_type, 0), start + self.per_page)
+        return [{'id': project_type * 1000 + i,
+                 'title': self.renamed.get(project_type * 1000 + i, f"项目{project_type}-{i}"),
+                 'type': f"类别{project_type}", 'province': "某省"} for i in range(start, end)]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != '/getProject.html':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                query = parse_qs(url.query)
+                key = (int(query['type'][0]), int(query['p'][0]))
+                server.hits.append(key)
+                if key in server.fail_pages:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                total = max(1, -(-server.counts.get(key[0], 0) // server.per_page))
+                body = json.dumps({'list': server.projects(*key),
+                                   'links': {'end': {'text': f"{total}"}}}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StubStaticServer:
+    """提供 directory 下的静态文件，供 StubDriver 加载"""
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        class Handler(SimpleHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), partial(Handler, directory=self.directory))
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,119 @@
+import threading
+import pytest
+from browser_pool import BrowserPool, StubDriver
+from stub_servers import StubStaticServer
+
+# 测试中不做随机等待和滚动
+FAST_POOL = {'num_browsers': 1, 'tabs_per_browser': 2, 'page_wait': (0, 0), 'scroll_times': 0,
+             'load_timeout': 0.5}
+PAGE_COUNT = 10
+
+
+class RecordingDriver(StubDriver):
+    """
+    记录加载过的页面。fail_once 中的页面第一次 get 时抛出异常，fail_always 中的页面每次都抛出异常，
+    slow_once 中的页面第一次加载时一直未完成；seen 在同一次测试的所有浏览器之间共享
+    """
+
+    def __init__(self, seen, fail_once=(), fail_always=(), slow_once=()):
+        super().__init__(timeout=5)
+        self.loaded = []
+        self.seen = seen
+        self.fail_once = fail_once
+        self.fail_always = fail_always
+        self.slow_once = slow_once
+        self._loading = {}
+
+    def get(self, url):
+        page = url.rsplit('/', 1)[-1]
+        first = page not in self.seen
+        self.seen.add(page)
+        if page in self.fail_always or (first and page in self.fail_once):
+            raise RuntimeError(f"浏览器崩溃: {page}")
+        super().get(url)
+        self.loaded.append(page)
+        self._loading[self.current_window_handle] = first and page in self.slow_once
+
+    def execute_script(self, script, *args):
+        if 'readyState' in script and self._loading.get(self.current_window_handle):
+            return 'loading'
+        return super().execute_script(script, *args)
+
+
+@pytest.fixture
+def page_server(tmp_path):
+    for i in range(PAGE_COUNT):
+        (tmp_path / f'page{i}.html').write_text(f'<html><body>第 {i} 页</body></html>', encoding='utf-8')
+    server = StubStaticServer(tmp_path).start()
+    yield server
+    server.stop()
+
+
+def crawl(server, config, **driver_options):
+    drivers, results, lock = [], {}, threading.Lock()
+    seen = set()
+
+    def factory():
+        driver = RecordingDriver(seen, **driver_options)
+        drivers.append(driver)
+        return driver
+
+    def callback(url, html, error):
+        with lock:
+            results[url.rsplit('/', 1)[-1]] = (html, error)
+
+    pool = BrowserPool(factory, config={**FAST_POOL, **config})
+    with pool:
+        for i in range(PAGE_COUNT):
+            pool.submit(f"{server.url}/page{i}.html", callback)
+    return pool, drivers, results
+
+
+def assert_all_loaded(results):
+    assert sorted(results) == sorted(f'page{i}.html' for i in range(PAGE_COUNT))
+    for page, (html, error) in results.items():
+        assert error is None
+        assert f"第 {page[4:-5]} 页" in html
+
+
+def test_browser_recycled_after_pages_per_browser(page_server):
+    pool, drivers, results = crawl(page_server, {'pages_per_browser': 4})
+
+    assert_all_loaded(results)
+    assert pool.stats['launches'] == len(drivers) >= 3
+    assert pool.stats['crashes'] == 0
+    # 每个浏览器最多处理 pages_per_browser 个页面，退出前全部关闭
+    assert all(len(driver.loaded) <= 4 for driver in drivers)
+    assert all(driver.closed for driver in drivers)
+
+
+def test_browser_restarted_after_error(page_server):
+    pool, drivers, results = crawl(page_server, {'pages_per_browser': 100}, fail_once={'page3.html'})
+
+    assert_all_loaded(results)
+    assert pool.stats['crashes'] == 1
+    assert pool.stats['launches'] == 2
+    assert drivers[0].closed
+    assert 'page3.html' in drivers[1].loaded
+
+
+def test_page_failing_every_attempt_is_reported(page_server):
+    pool, drivers, results = crawl(page_server, {'pages_per_browser': 100, 'max_attempts': 2},
+                                   fail_always={'page5.html'})
+
+    html, error = results.pop('page5.html')
+    assert html is None and isinstance(error, RuntimeError)
+    assert all(error is None for _, error in results.values())
+    assert pool.stats['failed'] == 1
+    assert pool.stats['pages'] == PAGE_COUNT - 1
+    assert pool.stats['crashes'] == 2
+
+
+def test_load_timeout_requeues_without_restart(page_server):
+    pool, drivers, results = crawl(page_server, {'pages_per_browser': 100}, slow_once={'page2.html'})
+
+    assert_all_loaded(results)
+    assert pool.stats['timeouts'] == 1
+    assert pool.stats['crashes'] == 0
+    assert pool.stats['launches'] == 1
+    assert drivers[0].loaded.count('page2.html') == 2
@@ -0,0 +1,72 @@
+import csv
+import os
+from crawl_journal import PageJournal
+from raw_data_collection_web import JOURNAL_FILENAME, crawl_types_concurrently
+
+# cache_ttl 为 0：每次都请求服务器，hits 反映真正发出的请求
+FAST_CRAWL = {'requests_per_second': 100, 'burst': 100, 'max_retries': 1, 'cache_ttl': 0}
+TYPE_MAP = {1: '民间文学', 2: '传统音乐'}
+
+
+def read_names(path):
+    with open(path, encoding='utf-8') as f:
+        return [row['项目名称'] for row in csv.DictReader(f)]
+
+
+def crawled_pages(server):
+    return sorted(set(server.hits))
+
+
+def test_resume_fetches_only_failed_pages(http_cache, listing_server):
+    listing_server.fail_pages.add((1, 2))
+
+    result, completed = crawl_types_concurrently(TYPE_MAP, base_url=listing_server.url, config=FAST_CRAWL)
+
+    assert result == {1: 7, 2: 7}
+    assert completed == [2]
+    journal = PageJournal(JOURNAL_FILENAME)
+    assert journal.pending_pages(1) == [2]
+    # 全部完成的分类已从日志中清除
+    assert journal.total_pages(2) is None
+
+    # 中断后续爬：第 1 页重新请求以刷新总页数，此外只请求失败的第 2 页
+    listing_server.fail_pages.clear()
+    listing_server.hits.clear()
+    result, completed = crawl_types_concurrently({1: '民间文学'}, base_url=listing_server.url,
+                                                 config=FAST_CRAWL)
+
+    assert crawled_pages(listing_server) == [(1, 1), (1, 2)]
+    assert completed == [1]
+    assert result == {1: 5}
+    names = read_names('非遗项目_民间文学.csv')
+    assert sorted(names) == sorted(f"项目1-{i}" for i in range(12))
+    assert PageJournal(JOURNAL_FILENAME).total_pages(1) is None
+
+
+def test_resume_recrawls_changed_listing(http_cache, listing_server):
+    listing_server.fail_pages.add((1, 3))
+    crawl_types_concurrently({1: '民间文学'}, base_url=listing_server.url, config=FAST_CRAWL)
+
+    # 第 1 页内容变化（列表已更新），日志中已完成的页面不再可信，重新爬取全部页面
+    listing_server.fail_pages.clear()
+    listing_server.hits.clear()
+    listing_server.renamed[1000] = '改名后的项目'
+    _, completed = crawl_types_concurrently({1: '民间文学'}, base_url=listing_server.url, config=FAST_CRAWL)
+
+    assert crawled_pages(listing_server) == [(1, 1), (1, 2), (1, 3)]
+    assert completed == [1]
+
+
+def test_resume_falls_back_to_journal_total_pages(http_cache, listing_server):
+    listing_server.fail_pages.add((1, 3))
+    crawl_types_concurrently({1: '民间文学'}, base_url=listing_server.url, config=FAST_CRAWL)
+
+    # 续爬时第 1 页重新请求失败，按日志中记录的总页数补爬缺失的第 3 页
+    listing_server.fail_pages = {(1, 1)}
+    listing_server.hits.clear()
+    _, completed = crawl_types_concurrently({1: '民间文学'}, base_url=listing_server.url, config=FAST_CRAWL)
+
+    assert crawled_pages(listing_server) == [(1, 1), (1, 3)]
+    assert completed == []
+    assert len(read_names('非遗项目_民间文学.csv')) == 12
+    assert PageJournal(JOURNAL_FILENAME).pending_pages(1) == [1]
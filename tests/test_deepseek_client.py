@@ -0,0 +1,69 @@
+import asyncio
+import random
+import time
+from aiohttp import web
+from deepseek_client import DeepSeekClient, SUMMARIZE_PROMPT, stream_ordered
+from mock_deepseek_server import MockChatServer
+
+TEXT_COUNT = 20
+# 每个请求 Retry-After 为 1 秒，429 之后的这段时间内不应有新的请求到达（开头留出已发出请求的余量）
+QUIET_AFTER_THROTTLE = (0.2, 0.9)
+
+
+class RecordingChatServer(MockChatServer):
+    """记录每个请求到达的时间和返回的状态码"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.arrivals = []
+
+    async def handle(self, request):
+        arrived = time.monotonic()
+        response = await super().handle(request)
+        self.arrivals.append((arrived, response.status))
+        return response
+
+
+async def serve(server):
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/chat/completions"
+
+
+async def summarize_all(server, texts, concurrency=8):
+    runner, api_url = await serve(server)
+    results = []
+    try:
+        async with DeepSeekClient(api_url=api_url, api_key='test', concurrency=concurrency,
+                                  config={'retry_delay': 0}) as client:
+            async def worker(text):
+                # 随机延迟让各行完成的先后与输入顺序不同
+                await asyncio.sleep(random.uniform(0, 0.05))
+                return await client.summarize(text)
+
+            await stream_ordered(texts, worker, results.append, window=16)
+    finally:
+        await runner.cleanup()
+    return client, results
+
+
+def test_backs_off_on_429_and_keeps_input_order():
+    texts = [f"第 {i} 段文本，" + '内容' * random.randint(1, 50) for i in range(TEXT_COUNT)]
+    server = RecordingChatServer(latency=0.05, rate_limit=5, reply_chars=10000)
+
+    client, results = asyncio.run(summarize_all(server, texts))
+
+    # 429 不计入失败，所有文本都由接口返回（没有退回抽取式摘要），且按输入顺序写出
+    assert server.stats['throttled'] > 0
+    assert client.stats['throttled'] == server.stats['throttled']
+    assert client.stats['failed'] == 0 and client.stats['extractive'] == 0
+    assert results == [(SUMMARIZE_PROMPT + text).strip() for text in texts]
+
+    # 收到第一个 429 后按 Retry-After 暂停发送
+    first_throttled = min(arrived for arrived, status in server.arrivals if status == 429)
+    start, end = (first_throttled + offset for offset in QUIET_AFTER_THROTTLE)
+    assert not [arrived for arrived, _ in server.arrivals if start < arrived < end]
+
@@ -0,0 +1,60 @@
+import csv
+import os
+from listing_diff import incremental_refresh, load_report
+from raw_data_collection_web import CSV_HEADERS, JOURNAL_FILENAME, project_to_row
+
+FAST_CRAWL = {'requests_per_second': 100, 'burst': 100}
+TYPE_MAP = {1: '民间文学', 2: '传统音乐'}
+
+
+def write_snapshot(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_refresh_writes_report_and_promotes_snapshot(http_cache, listing_server, tmp_path):
+    base_url = listing_server.url
+    os.makedirs('raw_data_items')
+    # 旧快照：分类 1 少最后两个项目、多一个已下线的项目，分类 2 与当前列表一致
+    old_projects = [listing_server.projects(1, page) for page in (1, 2, 3)]
+    old_rows = [project_to_row(p, base_url) for page in old_projects for p in page][:10]
+    old_rows.append(project_to_row({'id': 1999, 'title': '已下线', 'type': '类别1', 'province': '某省'}, base_url))
+    write_snapshot('raw_data_items/非遗项目_民间文学.csv', old_rows)
+    write_snapshot('raw_data_items/非遗项目_传统音乐.csv',
+                   [project_to_row(p, base_url) for page in (1, 2) for p in listing_server.projects(2, page)])
+    listing_server.renamed[2000] = '改名后的项目'
+
+    report = incremental_refresh(TYPE_MAP, base_url=base_url, config=FAST_CRAWL)
+
+    assert report is not None
+    assert load_report('listing_diff_report.json') == report
+    folk, music = report['categories']['民间文学'], report['categories']['传统音乐']
+    assert [row['项目名称'] for row in folk['added']] == ['项目1-10', '项目1-11']
+    assert [row['项目名称'] for row in folk['removed']] == ['已下线']
+    assert [item['项目名称'] for item in music['changed']] == ['改名后的项目']
+    assert len(report['to_enrich']) == 3
+    # 新列表替换了快照，临时目录的进度日志已清除
+    with open('raw_data_items/非遗项目_民间文学.csv', encoding='utf-8') as f:
+        assert len(list(csv.DictReader(f))) == 12
+    assert not os.path.exists(os.path.join('raw_data_items_staging', JOURNAL_FILENAME))
+
+
+def test_refresh_with_missing_page_keeps_snapshot(http_cache, listing_server):
+    listing_server.fail_pages.add((1, 2))
+    os.makedirs('raw_data_items')
+    write_snapshot('raw_data_items/非遗项目_民间文学.csv', [])
+
+    report = incremental_refresh(TYPE_MAP, base_url=listing_server.url, config={**FAST_CRAWL, 'max_retries': 1})
+
+    assert report is None
+    assert not os.path.exists('listing_diff_report.json')
+    assert os.path.exists(os.path.join('raw_data_items_staging', JOURNAL_FILENAME))
+
+    # 恢复后 resume=True 只补爬缺失的页面，生成报告
+    listing_server.fail_pages.clear()
+    listing_server.hits.clear()
+    report = incremental_refresh(TYPE_MAP, base_url=listing_server.url, config=FAST_CRAWL, resume=True)
+    assert report is not None
+    assert sorted(listing_server.hits) == [(1, 1), (1, 2), (2, 1)]
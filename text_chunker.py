@@ -0,0 +1,140 @@
+import logging
+import math
+import os
+import re
+import threading
+
+'''
+    长文本按 token 预算切块，供 deepseek_client 的 map-reduce 总结使用：
+    - token 数用本地的 bert-base-chinese 分词器统计（中文基本一字一个 token，与 DeepSeek 的计数同量级且偏保守）；
+      没有下载模型或没有安装 transformers 时，退回按字符类别估算
+    - 优先在段落（换行）处切分，单个段落超出预算时再按句末标点切分，仍然超出的句子按预算硬切
+    - truncate_at_boundary 在预算内最后一个句子结束处截断，避免从句子中间截断
+'''
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_DIR = os.path.join('bert-base-chinese', 'tiansz', 'bert-base-chinese')  # model_download.py 的下载位置
+
+PARAGRAPH_PATTERN = re.compile(r'\n+')
+# 句子以中文或英文句末标点结束，标点后紧跟的引号、括号归入同一句
+SENTENCE_PATTERN = re.compile(r'[^。！？；!?;\n]*(?:[。！？；!?;]+[”’」』）)]*|\n|$)')
+# 估算用：汉字及全角符号每个算一个 token，连续的字母数字每 4 个字符算一个 token
+CJK_PATTERN = re.compile(r'[　-〿一-鿿＀-￯]')
+WORD_PATTERN = re.compile(r'[A-Za-z0-9]+')
+
+
+def approximate_tokens(text):
+    cjk = len(CJK_PATTERN.findall(text))
+    words = WORD_PATTERN.findall(text)
+    word_chars = sum(len(word) for word in words)
+    other = len(text) - cjk - word_chars - text.count(' ') - text.count('\n')
+    return cjk + sum(math.ceil(len(word) / 4) for word in words) + max(other, 0)
+
+
+class TokenCounter:
+    """统计文本的 token 数；分词器在第一次使用时加载，加载失败则使用 approximate_tokens"""
+
+    def __init__(self, tokenizer_dir=TOKENIZER_DIR, tokenizer=None):
+        self.tokenizer_dir = tokenizer_dir
+        self._tokenizer = tokenizer
+        self._loaded = tokenizer is not None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return self._tokenizer
+            self._loaded = True
+            if self.tokenizer_dir and os.path.isdir(self.tokenizer_dir):
+                try:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_dir)
+                except (ImportError, OSError, ValueError) as e:
+                    logger.warning(f"加载分词器失败，按字符估算 token 数: {e}")
+            elif self.tokenizer_dir:
+                logger.info(f"未找到分词器 {self.tokenizer_dir}，按字符估算 token 数")
+            return self._tokenizer
+
+    def count(self, text):
+        tokenizer = self._tokenizer if self._loaded else self._load()
+        if tokenizer is None:
+            return approximate_tokens(text)
+        return len(tokenizer.tokenize(text))
+
+
+def split_sentences(text):
+    return [sentence for sentence in SENTENCE_PATTERN.findall(text) if sentence.strip()]
+
+
+def _hard_split(text, budget, count):
+    """没有标点可切的超长句子：按 token 预算二分出每一段的长度"""
+    pieces = []
+    while text:
+        low, high = 1, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if count(text[:mid]) <= budget:
+                low = mid
+            else:
+                high = mid - 1
+        pieces.append(text[:low])
+        text = text[low:]
+    return pieces
+
+
+def _units(text, budget, count):
+    """把文本拆成不超过预算的最小单位：段落，超长段落拆成句子，超长句子硬切"""
+    for paragraph in PARAGRAPH_PATTERN.split(text):
+        if not paragraph.strip():
+            continue
+        tokens = count(paragraph)
+        if tokens <= budget:
+            yield paragraph, tokens
+            continue
+        for sentence in split_sentences(paragraph):
+            tokens = count(sentence)
+            if tokens <= budget:
+                yield sentence, tokens
+            else:
+                for piece in _hard_split(sentence, budget, count):
+                    yield piece, count(piece)
+
+
+def chunk_text(text, budget, counter=None):
+    """按 token 预算切块：相邻的段落（或句子）依次装入同一块，装不下时开始新的一块，块内用换行连接"""
+    count = (counter or get_counter()).count
+    chunks, current, current_tokens = [], [], 0
+    for unit, tokens in _units(text, budget, count):
+        if current and current_tokens + tokens > budget:
+            chunks.append('\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def truncate_at_boundary(text, max_chars):
+    """截断到 max_chars 以内，尽量在句末标点或换行处结束"""
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    cut = max(head.rfind(mark) for mark in '。！？；!?;\n')
+    # 最后一个句末在很靠前的位置时，截断会丢掉太多内容，直接按字符截断
+    if cut < max_chars // 2:
+        return head
+    return head[:cut + 1].rstrip()
+
+
+_default_counter = None
+_default_lock = threading.Lock()
+
+
+def get_counter():
+    global _default_counter
+    with _default_lock:
+        if _default_counter is None:
+            _default_counter = TokenCounter()
+        return _default_counter
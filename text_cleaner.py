@@ -0,0 +1,141 @@
+import re
+import pandas as pd
+
+'''
+    调用 DeepSeek 总结之前的本地规则清洗，结果确定、不依赖网络：
+    - 去除样板内容：图片说明（"图为……"、"△……"）、括号内的署名（"（编辑：……）"）、网址、
+      百科的参考文献角标（[1]、[2-3]）
+    - 相关文章另外去除整行的来源与署名（"原文链接：……"、"作者：……"），以及文章开头连续的
+      "项目编号/类别/申报地区或单位"表头；官网描述中的"类型：""保护单位："等是正文，不做处理
+    - 合并多余的空白和空行，删除重复的句子和被前文完整包含的段落（忽略标点和空白后比较）
+    - 正则替换以 pandas 字符串方法对整列文本一次完成，去重逐条处理
+    只有本来就要请求 API 的文本（超出预算，或相关文章）才会被清洗，其余原样保留；
+    清洗后不再超过预算的不必请求，TextCleaner.stats 记录因此省下的请求数
+'''
+
+# (说明, 正则, 替换)，按顺序应用
+BOILERPLATE_PATTERNS = [
+    ('网址', r'https?://[^\s，。；）)]+', ''),
+    ('参考文献角标', r'\[\d+(?:[-–,，]\d+)*\]', ''),
+    ('署名', r'[（(](?:责任编辑|编辑|摄影|记者|通讯员|来源|供图|图片|图文|图|文|作者)[：:/][^）)\n]{0,40}[）)]', ''),
+    ('图片说明', r'(?m)^[ \t　]*(?:图为|图片为|△|▲|图\d*[：:]|图片[：:]).*$', ''),
+    ('多余空白', r'[ \t　\xa0]+', ' '),
+    ('空行', r'\n(?:[ ]*\n)+', '\n'),
+]
+
+# 只用于相关文章，在 BOILERPLATE_PATTERNS 之前应用
+ARTICLE_PATTERNS = [
+    ('来源行', r'(?m)^[ \t　]*(?:原文链接|原标题|来源|转载自|责任编辑|编辑|摄影|记者|通讯员|作者|点击)[：:].*$', ''),
+    # 只去除文章开头连续的表头行，正文中的同名字段保留
+    ('项目表头', r'\A\s*(?:[ \t　]*(?:项目编号|项目序号|类别|公布时间|类型|申报地区或单位|保护单位)[：:][^\n]*(?:\n|\Z))+', ''),
+]
+
+SENTENCE_PATTERN = re.compile(r'[^。！？；!?;]*(?:[。！？；!?;]+[”’」』）)]*|$)')
+NORMALIZE_PATTERN = re.compile(r'[\W_]+')
+
+# 比较去重时忽略过短的句子和段落（如"现场"、"是的。"），避免误删
+MIN_DEDUPE_SENTENCE = 8
+MIN_DEDUPE_PARAGRAPH = 20
+
+
+def normalize(text):
+    return NORMALIZE_PATTERN.sub('', text)
+
+
+def dedupe_text(text):
+    """删除重复的句子和被前文包含的段落，保留第一次出现的位置"""
+    seen_sentences = set()
+    kept_paragraphs = []
+    # 已保留段落的归一化文本，以换行分隔（归一化后的段落不含换行），包含判断不会跨越两个段落
+    kept_text = ''
+    for paragraph in text.split('\n'):
+        key = normalize(paragraph)
+        if not key:
+            continue
+        if len(key) >= MIN_DEDUPE_PARAGRAPH and key in kept_text:
+            continue
+        sentences = []
+        for sentence in SENTENCE_PATTERN.findall(paragraph):
+            sentence_key = normalize(sentence)
+            if not sentence_key:
+                continue
+            if len(sentence_key) >= MIN_DEDUPE_SENTENCE:
+                if sentence_key in seen_sentences:
+                    continue
+                seen_sentences.add(sentence_key)
+            sentences.append(sentence)
+        if sentences:
+            kept_paragraphs.append(''.join(sentences).strip())
+            kept_text += key + '\n'
+    return '\n'.join(kept_paragraphs)
+
+
+def clean_series(series, article=False):
+    """对一列文本做清洗，非字符串（如 NaN）原样保留；article 为 True 时另外应用 ARTICLE_PATTERNS"""
+    is_text = series.map(lambda value: isinstance(value, str))
+    texts = series[is_text].astype(str)
+    patterns = ARTICLE_PATTERNS + BOILERPLATE_PATTERNS if article else BOILERPLATE_PATTERNS
+    for _, pattern, replacement in patterns:
+        texts = texts.str.replace(pattern, replacement, regex=True)
+    texts = texts.str.strip().map(dedupe_text)
+    result = series.copy()
+    result[is_text] = texts
+    return result
+
+
+class TextCleaner:
+    """
+    清洗结果按 (是否为相关文章, 原文) 缓存；prepare() 一次清洗整批需要清洗的文本，之后 clean() 只是查表。
+    within_budget() 在决定是否请求 API 时调用，并统计省下的请求
+    """
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self.stats = {'texts': 0, 'chars_before': 0, 'chars_after': 0, 'sent': 0, 'avoided': 0}
+        self._cleaned = {}
+
+    def needs_cleaning(self, text, article=False):
+        """只有本来就要请求 API 的文本才清洗：相关文章原先无论长短都会请求总结，其余文本超出预算时才请求"""
+        return isinstance(text, str) and (article or len(text) > self.max_length)
+
+    def prepare(self, texts, article=False):
+        pending = pd.Series(list({text for text in texts if self.needs_cleaning(text, article)
+                                  and (article, text) not in self._cleaned}), dtype=object)
+        if len(pending):
+            cleaned = clean_series(pending, article=article)
+            self._cleaned.update(((article, text), value) for text, value in zip(pending, cleaned))
+
+    def clean(self, text, article=False):
+        if not isinstance(text, str):
+            return text
+        if (article, text) not in self._cleaned:
+            cleaned = clean_series(pd.Series([text], dtype=object), article=article)
+            self._cleaned[(article, text)] = cleaned.iloc[0]
+        return self._cleaned[(article, text)]
+
+    def within_budget(self, text, article=False):
+        """
+        返回 (文本, 是否仍超出预算)。调用方只在超出预算时请求 API；
+        不需要请求的文本（不超过预算的官网描述、百科字段等）原样返回，不做清洗；
+        原先需要请求（超出预算，或是相关文章）、清洗后不再需要的返回清洗后的文本，计入 avoided
+        """
+        self.stats['texts'] += 1
+        self.stats['chars_before'] += len(text)
+        if not self.needs_cleaning(text, article):
+            self.stats['chars_after'] += len(text)
+            return text, False
+        cleaned = self.clean(text, article)
+        over_budget = len(cleaned) > self.max_length
+        self.stats['chars_after'] += len(cleaned)
+        if over_budget:
+            self.stats['sent'] += 1
+        else:
+            self.stats['avoided'] += 1
+        return cleaned, over_budget
+
+    def report(self):
+        stats = self.stats
+        removed = stats['chars_before'] - stats['chars_after']
+        ratio = removed / stats['chars_before'] if stats['chars_before'] else 0.0
+        return (f"本地清洗: 处理 {stats['texts']} 段文本，删除 {removed} 个字符（{ratio:.1%}），"
+                f"仍需请求 API {stats['sent']} 次，省下 {stats['avoided']} 次请求")
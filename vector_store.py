@@ -0,0 +1,327 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from field_parser import load_field
+
+'''
+    项目文本的持久化向量库：
+    - 句向量以 float16 存放在内存映射的 .npy 文件中（vectors.npy），按需扩容，删除的行会被新数据复用
+    - 段落 id、所在行号、文本哈希和附加信息保存在 SQLite（meta.sqlite3）中
+    - 近似最近邻索引为 IVF：用球面 k-means 把向量分到 nlist 个簇，查询时只比较最近的 nprobe 个簇内的向量；
+      新增的向量直接分配到最近的簇，删除只需从簇中移除，不必重建索引
+    - 未训练索引或数据量很小时直接做精确搜索
+    build_project_store 用 bert_similarity.TextEncoder 把每个项目的官网描述、历史渊源和相关文章编码入库，
+    文本未变化的段落不会重新编码
+'''
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_DIR = 'vector_store'
+INDEX_CONFIG = {
+    'min_train_size': 256,   # 少于该数量时不训练 IVF，直接精确搜索
+    'nprobe': 8,             # 查询时搜索的簇数
+    'kmeans_iterations': 10,
+    'initial_capacity': 1024
+}
+PASSAGE_FIELDS = ['官网描述', '历史渊源', '相关文章']
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def spherical_kmeans(vectors, nlist, iterations=10, seed=0, batch_size=8192):
+    """对归一化向量做 k-means（以余弦相似度为距离），返回归一化的簇中心"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_clusters(vectors, centroids, batch_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=nlist)
+        # 空簇重新随机选一个向量作为中心
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+def assign_clusters(vectors, centroids, batch_size=8192):
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), batch_size):
+        labels[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+    return labels
+
+
+class VectorStore:
+    """id -> 归一化向量 的持久化存储，支持增量添加、删除和近似最近邻查询，线程安全"""
+
+    def __init__(self, root=VECTOR_STORE_DIR, dim=768):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(root, 'meta.sqlite3'), check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS passages ('
+            'id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, text_hash TEXT NOT NULL, '
+            'cluster INTEGER NOT NULL DEFAULT -1, meta TEXT NOT NULL, added_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+        self._vectors_path = os.path.join(root, 'vectors.npy')
+        if os.path.exists(self._vectors_path):
+            self.vectors = np.load(self._vectors_path, mmap_mode='r+')
+            self.dim = self.vectors.shape[1]
+        else:
+            self.dim = dim
+            self.vectors = np.lib.format.open_memmap(
+                self._vectors_path, mode='w+', dtype=np.float16, shape=(INDEX_CONFIG['initial_capacity'], dim))
+
+        self._centroids_path = os.path.join(root, 'centroids.npy')
+        self.centroids = np.load(self._centroids_path) if os.path.exists(self._centroids_path) else None
+        self._load_rows()
+
+    def _load_rows(self):
+        """从 SQLite 重建内存中的 id/行号映射、空闲行和倒排表"""
+        self._row_of = {}
+        self._id_of = {}
+        self._cluster_of = {}
+        self._lists = {}
+        for passage_id, row, cluster in self._conn.execute('SELECT id, row, cluster FROM passages'):
+            self._row_of[passage_id] = row
+            self._id_of[row] = passage_id
+            if cluster >= 0:
+                self._cluster_of[row] = cluster
+                self._lists.setdefault(cluster, set()).add(row)
+        used = set(self._id_of)
+        self._next_row = max(used) + 1 if used else 0
+        self._free_rows = sorted(set(range(self._next_row)) - used, reverse=True)
+        self._list_arrays = {}
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def __contains__(self, passage_id):
+        return passage_id in self._row_of
+
+    def text_hashes(self):
+        with self._lock:
+            return dict(self._conn.execute('SELECT id, text_hash FROM passages'))
+
+    def _allocate_row(self):
+        if self._free_rows:
+            return self._free_rows.pop()
+        row = self._next_row
+        self._next_row += 1
+        if row >= len(self.vectors):
+            self._grow(max(len(self.vectors) * 2, row + 1))
+        return row
+
+    def _grow(self, capacity):
+        """容量不足时新建更大的内存映射文件并复制已有数据"""
+        self.vectors.flush()
+        tmp_path = self._vectors_path + '.tmp'
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float16, shape=(capacity, self.dim))
+        grown[:len(self.vectors)] = self.vectors
+        grown.flush()
+        del grown
+        self.vectors = None
+        os.replace(tmp_path, self._vectors_path)
+        self.vectors = np.load(self._vectors_path, mmap_mode='r+')
+
+    def add(self, ids, vectors, metas=None, hashes=None):
+        """添加或覆盖向量；vectors 应已归一化。已训练索引时新向量直接分配到最近的簇"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        metas = metas or [{}] * len(ids)
+        hashes = hashes or [''] * len(ids)
+        clusters = assign_clusters(vectors, self.centroids) if self.centroids is not None and len(vectors) \
+            else np.full(len(ids), -1)
+        with self._lock:
+            self.delete([passage_id for passage_id in ids if passage_id in self._row_of], commit=False)
+            records = []
+            for passage_id, vector, meta, hash_value, cluster in zip(ids, vectors, metas, hashes, clusters):
+                row = self._allocate_row()
+                self.vectors[row] = vector
+                self._row_of[passage_id] = row
+                self._id_of[row] = passage_id
+                if cluster >= 0:
+                    self._cluster_of[row] = int(cluster)
+                    self._lists.setdefault(int(cluster), set()).add(row)
+                    self._list_arrays.pop(int(cluster), None)
+                records.append((passage_id, row, hash_value, int(cluster),
+                                json.dumps(meta, ensure_ascii=False), time.time()))
+            self._conn.executemany(
+                'INSERT INTO passages (id, row, text_hash, cluster, meta, added_at) VALUES (?, ?, ?, ?, ?, ?)', records)
+            self._conn.commit()
+            self.vectors.flush()
+
+    def delete(self, ids, commit=True):
+        """删除向量：行号放入空闲列表，并从所在的簇中移除"""
+        with self._lock:
+            removed = []
+            for passage_id in ids:
+                row = self._row_of.pop(passage_id, None)
+                if row is None:
+                    continue
+                del self._id_of[row]
+                self._free_rows.append(row)
+                cluster = self._cluster_of.pop(row, None)
+                if cluster is not None:
+                    self._lists[cluster].discard(row)
+                    self._list_arrays.pop(cluster, None)
+                removed.append((passage_id,))
+            self._conn.executemany('DELETE FROM passages WHERE id = ?', removed)
+            if commit:
+                self._conn.commit()
+            return len(removed)
+
+    def train(self, nlist=None, iterations=None, seed=0):
+        """用当前全部向量训练 IVF 索引，nlist 默认取 4*sqrt(n)"""
+        with self._lock:
+            rows = np.array(sorted(self._id_of), dtype=np.int64)
+            if len(rows) < INDEX_CONFIG['min_train_size']:
+                logger.info(f"向量数 {len(rows)} 少于 {INDEX_CONFIG['min_train_size']}，不训练索引")
+                return
+            nlist = nlist or int(4 * np.sqrt(len(rows)))
+            data = self.vectors[rows].astype(np.float32)
+            self.centroids = spherical_kmeans(data, min(nlist, len(rows)),
+                                              iterations or INDEX_CONFIG['kmeans_iterations'], seed)
+            labels = assign_clusters(data, self.centroids)
+            self._cluster_of = {int(row): int(label) for row, label in zip(rows, labels)}
+            self._lists = {}
+            for row, label in self._cluster_of.items():
+                self._lists.setdefault(label, set()).add(row)
+            self._list_arrays = {}
+            self._conn.executemany('UPDATE passages SET cluster = ? WHERE row = ?',
+                                   [(int(label), int(row)) for row, label in zip(rows, labels)])
+            self._conn.commit()
+            np.save(self._centroids_path, self.centroids)
+            logger.info(f"索引训练完成: {len(rows)} 个向量，{len(self.centroids)} 个簇")
+
+    def _rows_in(self, cluster):
+        array = self._list_arrays.get(cluster)
+        if array is None:
+            array = np.fromiter(sorted(self._lists.get(cluster, ())), dtype=np.int64)
+            self._list_arrays[cluster] = array
+        return array
+
+    def search(self, queries, k=10, nprobe=None, exact=False):
+        """
+        查询与每个 query 最相似的 k 个段落，返回 [[(id, 相似度), ...], ...]；
+        exact=True 或未训练索引时与全部向量比较
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = nprobe or INDEX_CONFIG['nprobe']
+        with self._lock:
+            use_index = self.centroids is not None and not exact
+            if not use_index:
+                all_rows = np.fromiter(sorted(self._id_of), dtype=np.int64)
+                all_vectors = self.vectors[all_rows].astype(np.float32)
+            else:
+                probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+            results = []
+            for i, query in enumerate(queries):
+                if use_index:
+                    rows = np.concatenate([self._rows_in(int(c)) for c in probes[i]])
+                    candidates = self.vectors[rows].astype(np.float32)
+                else:
+                    rows, candidates = all_rows, all_vectors
+                if len(rows) == 0:
+                    results.append([])
+                    continue
+                scores = candidates @ query
+                top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+                results.append([(self._id_of[int(rows[j])], float(scores[j])) for j in top])
+            return results
+
+    def meta(self, passage_id):
+        with self._lock:
+            row = self._conn.execute('SELECT meta FROM passages WHERE id = ?', (passage_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        with self._lock:
+            self.vectors.flush()
+            self._conn.close()
+
+
+def parse_list_field(value):
+    """相关文章等字段以 Python 字面量或 JSON 形式保存的列表"""
+    if not isinstance(value, str) or not value.strip():
+        return []
+    try:
+        parsed = load_field(value)
+    except ValueError:
+        return [value]
+    return parsed if isinstance(parsed, list) else [parsed]
+
+
+def project_passages(row):
+    """把一个项目拆分为多个段落，返回 [(段落 id, 文本, 附加信息)]"""
+    name = row['项目名称']
+    passages = []
+    for field in PASSAGE_FIELDS:
+        for index, item in enumerate(parse_list_field(row.get(field, ''))):
+            if isinstance(item, dict):
+                text, title = item.get('content', ''), item.get('title', '')
+            else:
+                text, title = str(item), ''
+            text = text.strip()
+            if text:
+                meta = {'项目名称': name, '字段': field, '标题': title}
+                passages.append((f"{name}#{field}#{index}", text, meta))
+    return passages
+
+
+def load_project_rows(csv_pattern='merged_web_items/*.csv'):
+    """读取项目数据（默认为合并后的官网数据；使用 final_dataset.csv 时还会包含历史渊源）"""
+    frames = [pd.read_csv(path, dtype=str).fillna('') for path in sorted(glob.glob(csv_pattern))]
+    if not frames:
+        return []
+    df = pd.concat(frames, ignore_index=True).drop_duplicates('项目名称')
+    return df.to_dict(orient='records')
+
+
+def build_project_store(rows=None, store=None, encoder=None, batch_size=256):
+    """
+    增量构建项目文本向量库：新增或内容变化的段落重新编码，已不存在的段落删除，然后重新训练索引。
+    返回 (新增/更新数, 删除数)
+    """
+    from bert_similarity import EmbeddingCache, TextEncoder
+
+    rows = load_project_rows() if rows is None else rows
+    encoder = encoder or TextEncoder(cache=EmbeddingCache())
+    if store is None:
+        store = VectorStore(dim=encoder.model.config.hidden_size)
+
+    existing = store.text_hashes()
+    passages = [passage for row in rows for passage in project_passages(row)]
+    current_ids = {passage_id for passage_id, _, _ in passages}
+    changed = [(pid, text, meta) for pid, text, meta in passages if existing.get(pid) != text_hash(text)]
+
+    removed = store.delete([pid for pid in existing if pid not in current_ids])
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        vectors = encoder.encode([text for _, text, _ in batch])
+        store.add([pid for pid, _, _ in batch], vectors, [meta for _, _, meta in batch],
+                  [text_hash(text) for _, text, _ in batch])
+    # 少量增删时新向量已分配到最近的簇，变化较大或尚未训练时才重新训练索引
+    if store.centroids is None or len(changed) + removed > 0.2 * len(store):
+        store.train()
+    logger.info(f"向量库共 {len(store)} 个段落，本次新增/更新 {len(changed)} 个，删除 {removed} 个")
+    return len(changed), removed
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    build_project_store()
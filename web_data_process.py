@@ -1,283 +1,223 @@
+import argparse
+import asyncio
 import csv
-import json
 import pandas as pd
-import requests
 from tqdm import tqdm
-import time
-import os
+from deepseek_client import DeepSeekClient, MAX_LENGTH, stream_ordered
+from summary_cache import SummaryCache
+from deepseek_batch import BatchClient, finish_batch_pass
+from text_cleaner import TextCleaner
+from field_parser import dump_field, parse_field
 
 '''
     格式化的非遗项目_web文件，将其中的申报地区、传承人信息以及文章详情格式化成字符串形式方便后续QA数据集的制作
     顺便在这里把数据清洗做了
+    不依赖 API 的整理由 format_columns 按列完成（字段由 field_parser 解析），便于把需要总结的文本整列交给
+    text_cleaner 一次清洗；各字段仍是逐个取值解析、拼接，耗时与原先逐行处理相当。与原实现的整理结果是否一致
+    由 benchmarks/bench_web_format.py 检查；输出中的列表字段写成标准 JSON
+    官网描述和相关文章先经过 text_cleaner 的本地清洗，仍超过 MAX_LENGTH 的才通过 deepseek_client 并发请求总结
+    （较短的合并请求），结果按原顺序逐行写入输出文件
 '''
 
-# 需要额外处理的表项
-special_item = [
-    "孟姜女传说", "格萨（斯）尔", "江格尔", "苏东坡传说", "蒙古包营造技艺", "瑶族服饰", "苗族鼓藏节", "蒙古族服饰",
-    "藏族服饰",  "上海港码头号子", "古琴艺术", "大铜器", "蒙古族四胡音乐", "长江峡江号子", "土家族撒叶儿嗬", "苗族芦笙舞",
-    "萨吾尔登", "二人台", "淮北梆子戏", "茂腔", "豫剧", "黄梅戏", "岳家拳", "蒙古族搏克",
-    "螳螂拳", "蒙古族刺绣", "麦秆剪贴", "乐亭大鼓", "含岔曲", "山东落子", "西河大鼓", "鼓盆歌"
-]
-
-# -1去除开头，1去除结尾
-flag = [
-    1, 1, 1, 1, 1, 1, 1, 1,
-    1, -1, 1, 1, 1, 1, 1, 1,
-    1, 1, 1, 1, 1, 1, 1, 1,
-    1, 1, 1, 1, 1, 1, 1, 1
-]
-
-# 配置 DeepSeek API
-DEEPSEEK_API_KEY = os.getenv("DeepSeek_API_KEY")  # 替换为你的 DeepSeek API Key
-DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
-MAX_LENGTH = 1096  # 判断是否需要压缩的阈值
-MAX_TOKENS = 1024   # 压缩后的最大字符数
-
-# 设置请求头
-HEADERS = {
-    "Content-Type": "application/json",
-    "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
+# 需要额外处理的表项：项目名称 -> 官网描述中多余的 nan 所在位置（-1 去除开头，1 去除结尾）
+SPECIAL_ITEMS = {
+    "孟姜女传说": 1, "格萨（斯）尔": 1, "江格尔": 1, "苏东坡传说": 1, "蒙古包营造技艺": 1, "瑶族服饰": 1,
+    "苗族鼓藏节": 1, "蒙古族服饰": 1, "藏族服饰": 1, "上海港码头号子": -1, "古琴艺术": 1, "大铜器": 1,
+    "蒙古族四胡音乐": 1, "长江峡江号子": 1, "土家族撒叶儿嗬": 1, "苗族芦笙舞": 1, "萨吾尔登": 1, "二人台": 1,
+    "淮北梆子戏": 1, "茂腔": 1, "豫剧": 1, "黄梅戏": 1, "岳家拳": 1, "蒙古族搏克": 1,
+    "螳螂拳": 1, "蒙古族刺绣": 1, "麦秆剪贴": 1, "乐亭大鼓": 1, "含岔曲": 1, "山东落子": 1, "西河大鼓": 1, "鼓盆歌": 1
 }
 
-# 摘要提示词
-REQUEST_BODY_TEMPLATE = {
-    "model": "deepseek-reasoner",
-    "messages": [
-        {
-            "role": "user",
-            "content": ""
-        }
-    ],
-    "temperature": 0.7,
-    "top_p": 0.95,
-    "max_tokens": MAX_TOKENS
-}
+# 官网数据中需要改名的项目
+PROJECT_NAME_FIXES = {"斯": "格萨（斯）尔"}
 
-SUMMARIZE_PROMPT = "请用中文对以下内容进行专业、准确的总结，保留关键信息，并确保总字数不超过1024个字符（注意，你只需要输出总结后的内容，不要输出任何无关文字）：\n\n"
+# 传承人信息中依次拼接的字段：(字段名, 前缀)，值为空的字段跳过；hometown 为籍贯
+PERSON_FIELDS = [('name', ''), ('gender', '，'), ('ethnicity', '，'), ('hometown', '，籍贯：'), ('birth_date', '，出生日期：')]
 
-def summarize_text(type: str, text: str, retries=3, delay=5) -> str:
+async def summarize_text(client, cleaner, type: str, text: str) -> str:
     if not isinstance(text, str) or len(text.strip()) == 0:
         return text
 
-    if type != "相关文章" and len(text) <= MAX_LENGTH:
+    # 原先相关文章无论长短都会请求总结，清洗后不超过预算的不再请求；不需要请求的官网描述原样保留
+    text, over_budget = cleaner.within_budget(text, article=type == "相关文章")
+    if not over_budget:
         return text
 
-    payload = REQUEST_BODY_TEMPLATE.copy()
-    payload["messages"][0]["content"] = SUMMARIZE_PROMPT + text[:4096]  # 添加长度限制
-    timeout = 0
-
-    for attempt in range(retries):
-        timeout += 180
-        try:
-            response = requests.post(DEEPSEEK_API_URL, headers=HEADERS, json=payload, timeout=timeout)
-            
-            # 检查HTTP状态码
-            if response.status_code != 200:
-                print(f"HTTP Error {response.status_code}: {response.text}")
-                continue
-                
-            result = response.json()
-            
-            # 检查API响应结构
-            if 'choices' not in result or len(result['choices']) == 0:
-                print(f"Invalid API response: {result}")
-                continue
-                
-            print(result['choices'][0]['message']['content'].strip())
-            return result['choices'][0]['message']['content'].strip()
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed on attempt {attempt + 1}: {e}")
-            time.sleep(delay * (attempt + 1))  # 指数退避
-        except KeyError as e:
-            print(f"Key error in response: {e}")
-            break
-    print(text[:MAX_TOKENS])
-    return text[:MAX_TOKENS]  # 失败时返回截断文本
-
-def process_region(region_str):
-    """处理申报地区或单位字段"""
-    try:
-        regions = json.loads(region_str.replace("'", '"'))
-        if isinstance(regions, list):
-            return '、'.join(regions), len(regions)
-        return region_str, 1
-    except (json.JSONDecodeError, TypeError):
-        return region_str, 1
-
-def process_description(project_name, desc_str):
-    """处理官网描述字段，确保数组元素为字符串，过滤空字符串和单引号"""
-    try:
-        if project_name in special_item:
-            if flag[special_item.index(project_name)] == -1:
-                desc_str = desc_str.replace('nan, ', '') 
-            else:
-                desc_str = desc_str.replace(', nan', '')
-        # 替换单引号为双引号并尝试解析JSON
-        desc_data = json.loads(desc_str.replace("'", '"'))
-        if isinstance(desc_data, list):
-            filtered = [
-                item for item in desc_data
-                if isinstance(item, str)
-            ]
-            # API 总结
-            filtered = [summarize_text("官网描述", item) for item in filtered]
-            if len(filtered) == 1:
-                return filtered[0]
-            elif len(filtered) > 1:
-                return filtered
-            else:
-                return ''
-        elif isinstance(desc_data, str):
-            return desc_data.strip()
-        else:
-            return ''
-    except (json.JSONDecodeError, TypeError):
-        # 如果解析失败，返回原始字符串或空
-        return desc_str if isinstance(desc_str, str) else ''
-    
-def process_person_info(person_data, region_str, regions_count):
-    """处理传承人信息字段，返回传承人列表"""
-    processed_people = []
-    
+    return await client.summarize_auto(text)
+
+def parse_column(series):
+    """整列解析，无法解析的取值为 None；相同的取值由 field_parser 缓存，只解析一次"""
+    return pd.Series([parse_field(value) for value in series.tolist()], index=series.index, dtype=object)
+
+def format_regions(raw):
+    """申报地区或单位：列表用顿号连接，返回 (整理后的字符串, 地区数)；无法解析的保留原文、地区数记为 1"""
+    parsed = parse_column(raw)
+    joined = parsed.where(parsed.map(lambda value: isinstance(value, list))).str.join('、')
+    valid = joined.notna()
+    return joined.where(valid, raw), parsed.str.len().where(valid, 1).astype(int)
+
+def person_groups(person_data, region_str, regions_count):
+    """
+    把一行的传承人整理为 [(籍贯, [传承人, ...]), ...]：单地区时籍贯为申报地区，
+    多地区时传承人按 {'position': 地区, 'person': [...]} 分组，籍贯为 position
+    """
+    if not isinstance(person_data, list):
+        return []
     if regions_count == 1:
-        # 单地区处理方式
-        for person in person_data:
-            if not isinstance(person, dict):
-                continue
-            
-            # 提取字段（过滤空值）
-            fields = []
-            name = person.get('name', '')
-            gender = person.get('gender', '')
-            ethnicity = person.get('ethnicity', '')
-            birth_date = person.get('birth_date', '')
-            
-            if not name:  # 如果姓名为空，跳过
-                continue
-            
-            # 构建有效字段列表
-            fields.append(name)
-            if gender:
-                fields.append(gender)
-            if ethnicity:
-                fields.append(ethnicity)
-            
-            # 籍贯字段
-            if region_str:
-                fields.append(f"籍贯：{region_str}")
-            
-            # 出生日期字段
-            if birth_date:
-                fields.append(f"出生日期：{birth_date}")
-            
-            # 拼接结果（用中文逗号分隔）
-            processed_people.append("，".join(fields))
-    else:
-        # 多地区处理方式
-        for entry in person_data:
-            if not isinstance(entry, dict) or 'position' not in entry:
-                continue
-            position = entry['position']
-            people_list = entry.get('person', [])
-            
-            for person in people_list:
-                if not isinstance(person, dict):
-                    continue
-                
-                # 提取字段（过滤空值）
-                fields = []
-                name = person.get('name', '')
-                gender = person.get('gender', '')
-                ethnicity = person.get('ethnicity', '')
-                birth_date = person.get('birth_date', '')
-                
-                if not name:
-                    continue
-                
-                # 构建有效字段列表
-                fields.append(name)
-                if gender:
-                    fields.append(gender)
-                if ethnicity:
-                    fields.append(ethnicity)
-                
-                # 籍贯字段（从position获取）
-                if position:
-                    fields.append(f"籍贯：{position}")
-                
-                # 出生日期字段
-                if birth_date:
-                    fields.append(f"出生日期：{birth_date}")
-                
-                # 拼接结果（用中文逗号分隔）
-                processed_people.append("，".join(fields))
-    
-    return processed_people
-
-def process_articles(articles_str):
-    """处理相关文章字段，确保数组元素为字典"""
-    try:
-        articles = json.loads(articles_str.replace("'", '"'))
-        if not isinstance(articles, list):
-            articles = [articles]
-        if len(articles) == 0:
+        return [(region_str, person_data)]
+    return [(entry['position'], entry.get('person', [])) for entry in person_data
+            if isinstance(entry, dict) and 'position' in entry]
+
+def format_person(person, hometown):
+    """单个传承人的非空字段用中文逗号拼接"""
+    fields = dict(person, hometown=hometown)
+    return ''.join(f"{prefix}{fields[field]}" for field, prefix in PERSON_FIELDS if fields.get(field))
+
+def format_people(people, regions, counts):
+    """传承人信息：单个不加序号，多个分行加序号；没有姓名的跳过"""
+    def convert(person_data, region_str, regions_count):
+        lines = [format_person(person, hometown)
+                 for hometown, persons in person_groups(person_data, region_str, regions_count)
+                 for person in persons if isinstance(person, dict) and person.get('name')]
+        if len(lines) > 1:
+            return '\n'.join(f"{i + 1}. {line}" for i, line in enumerate(lines))
+        return lines[0] if lines else ''
+    return pd.Series([convert(*values) for values in zip(parse_column(people), regions, counts)],
+                     index=people.index, dtype=object)
+
+def strip_nan(names, descriptions):
+    """特殊项目的官网描述里有多余的 nan，按 SPECIAL_ITEMS 去掉开头或结尾的一个"""
+    position = names.map(SPECIAL_ITEMS)
+    descriptions = descriptions.copy()
+    for value, pattern in ((-1, 'nan, '), (1, ', nan')):
+        selected = position == value
+        descriptions[selected] = descriptions[selected].str.replace(pattern, '', regex=False)
+    return descriptions
+
+def format_descriptions(names, raw):
+    """
+    官网描述：列表中的字符串元素留给 process_row 总结（返回列表），字符串去除首尾空白；
+    无法解析的保留原文，其他取值为空字符串
+    """
+    def convert(parsed, original):
+        if isinstance(parsed, list):
+            return [item for item in parsed if isinstance(item, str)]
+        if isinstance(parsed, str):
+            return parsed.strip()
+        return original if parsed is None else ''
+    return pd.Series([convert(parsed, original) for parsed, original in zip(parse_column(strip_nan(names, raw)), raw)],
+                     index=raw.index, dtype=object)
+
+def article_texts(articles):
+    """把文章列表整理为 "标题\n正文" 列表"""
+    processed = []
+    for article in articles:
+        if isinstance(article, dict):
+            title = article.get('title', '')
+            content = article.get('content', '')
+            if title or content:  # 只有标题或内容不为空才保留
+                processed.append(f"{title}\n{content}")
+    return processed
+
+def format_articles(raw):
+    """相关文章：整理为 "标题\n正文" 列表留给 process_row 总结；无法解析或没有文章时为空字符串"""
+    def convert(parsed):
+        if parsed is None or parsed == []:
             return ''
-        processed = []
-        for article in articles:
-            if isinstance(article, dict):
-                title = article.get('title', '')
-                content = article.get('content', '')
-                if title or content:  # 只有标题或内容不为空才保留
-                    processed.append(f"{title}\n{content}")
-        processed = [summarize_text("相关文章", item) for item in processed]
-        return processed
-    except (json.JSONDecodeError, TypeError):
-        return ''
-
-def main():
-    with open('非遗项目_web.csv', 'r', encoding='utf-8') as infile, \
-         open('非遗项目_web_clean.csv', 'w', encoding='utf-8-sig', newline='') as outfile:
-        
-        reader = csv.DictReader(infile)
-        fieldnames = reader.fieldnames
-        
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+        return article_texts(parsed if isinstance(parsed, list) else [parsed])
+    return pd.Series([convert(parsed) for parsed in parse_column(raw)], index=raw.index, dtype=object)
+
+def read_table(input_file):
+    """读取 CSV，所有字段保留为字符串（空值为空字符串）；使用 object 列，逐个取值时比 str 列快得多"""
+    with open(input_file, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        return pd.DataFrame(list(reader), columns=header, dtype=object)
+
+def format_columns(df):
+    """
+    不依赖 API 的整理按列完成：各列逐个取值解析，特殊项目查字典。
+    官网描述和相关文章中需要总结的部分整理为文本列表，由 process_row 逐行请求总结
+    """
+    df = df.copy()
+    df['项目名称'] = df['项目名称'].replace(PROJECT_NAME_FIXES)
+    df['申报地区或单位'], regions_count = format_regions(df['申报地区或单位'])
+    df['传承人信息'] = format_people(df['传承人信息'], df['申报地区或单位'], regions_count)
+    df['官网描述'] = format_descriptions(df['项目名称'], df['官网描述'])
+    df['相关文章'] = format_articles(df['相关文章'])
+    return df
+
+def to_records(df):
+    """逐行的 dict 列表，比 DataFrame.to_dict('records') 快，取值保持原样"""
+    columns = list(df.columns)
+    return [dict(zip(columns, values)) for values in zip(*(df[column].tolist() for column in columns))]
+
+def collect_texts(df, column):
+    """收集一列（官网描述或相关文章）中的全部文本，供 TextCleaner.prepare 一次清洗"""
+    texts = df[column]
+    return texts[texts.map(lambda value: isinstance(value, list))].explode().dropna()
+
+async def summarize_items(client, cleaner, type, items):
+    if not isinstance(items, list):
+        return items
+    return list(await asyncio.gather(*[summarize_text(client, cleaner, type, item) for item in items]))
+
+async def process_row(client, cleaner, row):
+    """format_columns 已整理好其他字段，这里同时请求总结官网描述和相关文章"""
+    descriptions, row['相关文章'] = await asyncio.gather(
+        summarize_items(client, cleaner, "官网描述", row['官网描述']),
+        summarize_items(client, cleaner, "相关文章", row['相关文章'])
+    )
+    # 官网描述只有一段时直接保存字符串，多段和相关文章写成 JSON 数组
+    if isinstance(descriptions, list) and len(descriptions) <= 1:
+        descriptions = descriptions[0] if descriptions else ''
+    row['官网描述'] = dump_field(descriptions)
+    row['相关文章'] = dump_field(row['相关文章'])
+    return row
+
+async def process_file(input_file, output_file, concurrency=None, cache=None, client=None, cleaner=None):
+    df = read_table(input_file)
+    table = format_columns(df)
+    cleaner = cleaner or TextCleaner(MAX_LENGTH)
+    cleaner.prepare(collect_texts(table, '官网描述'))
+    cleaner.prepare(collect_texts(table, '相关文章'), article=True)
+    rows = to_records(table)
+
+    with open(output_file, 'w', encoding='utf-8-sig', newline='') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=list(df.columns))
         writer.writeheader()
 
-        for row in reader:
-            # 处理申报地区或单位
-            region_str, regions_count = process_region(row['申报地区或单位'])
-            row['申报地区或单位'] = region_str
-
-            # 处理传承人信息
-            try:
-                person_data = json.loads(row['传承人信息'].replace("'", '"')) if row['传承人信息'] else []
-            except json.JSONDecodeError:
-                person_data = []
-                
-            processed_people = process_person_info(person_data, region_str, regions_count)
-
-            if row["项目名称"] == "斯":
-                row["项目名称"] = "格萨（斯）尔"
+        async with client or DeepSeekClient(concurrency=concurrency, cache=cache) as client:
+            progress = tqdm(total=len(rows), desc="Processing Rows")
 
-            # 处理官网描述（新增）
-            row['官网描述'] = process_description(row["项目名称"], row['官网描述'])
-
-            # 处理相关文章（新增）
-            row['相关文章'] = process_articles(row['相关文章'])
-
-            # 处理传承人信息：单个不加序号，多个分行加序号
-            if processed_people:
-                if len(processed_people) > 1:
-                    processed_people = [f"{i+1}. {person}" for i, person in enumerate(processed_people)]
-                    row['传承人信息'] = '\n'.join(processed_people)
-                else:
-                    row['传承人信息'] = processed_people[0]
-                writer.writerow(row)
-            else:
-                row['传承人信息'] = ''
+            def write_row(row):
                 writer.writerow(row)
+                progress.update(1)
+
+            await stream_ordered(rows, lambda row: process_row(client, cleaner, row), write_row,
+                                 window=client.config['row_window'])
+            progress.close()
+        return client.stats
+
+def main(input_file='非遗项目_web.csv', output_file='非遗项目_web_clean.csv', concurrency=None, batch=False):
+    cache = SummaryCache()
+    cleaner = TextCleaner(MAX_LENGTH)
+    if batch:
+        # 批处理模式：结果先写入临时文件，所有总结都有结果时才替换输出文件
+        client = BatchClient(cache=cache)
+        partial_file = f'{output_file}.partial'
+        stats = asyncio.run(process_file(input_file, partial_file, client=client, cleaner=cleaner))
+        finish_batch_pass(client, output_file, partial_file)
+    else:
+        stats = asyncio.run(process_file(input_file, output_file, concurrency, cache, cleaner=cleaner))
+    print(cleaner.report())
+    print(f"API 请求统计: {stats}")
+    print(f"总结缓存: 命中 {cache.stats['hits']} 次，未命中 {cache.stats['misses']} 次，"
+          f"命中率 {cache.hit_rate():.1%}，新写入 {cache.stats['stored']} 条")
+    cache.close()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='官网数据清洗')
+    parser.add_argument('--batch', action='store_true', help='离线批处理模式，见 deepseek_batch.py')
+    args = parser.parse_args()
+    main(batch=args.batch)